@@ -0,0 +1,130 @@
+import hashlib
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .nonce_manager import NonceManager
+
+LOCAL_ORACLE = "0x000000000000000000000000000000000000c0de"
+
+
+class LocalTrustFabric:
+    """
+    In-process stand-in for TrustFabricClient (same methods, contract state held in
+    memory) for running the trust services and their publishers without a chain.
+    `fail_rate` in [0, 1) makes that share of sends fail before reaching the "node",
+    mimicking a flaky RPC (update_trust returns None).
+
+    Transactions go through the same NonceManager as the real client. The stand-in
+    keeps per-account nonces like a node's mempool: a nonce below the account's
+    count is rejected ("nonce too low"), a second transaction at a queued nonce is
+    rejected ("replacement transaction underpriced"), and transactions above a
+    missing nonce wait until it arrives. `drop_rate` makes that share of accepted
+    transactions vanish silently, leaving the gaps fill_nonce_gaps repairs.
+    """
+
+    def __init__(self, fail_rate: float = 0.0, latency: float = 0.0, drop_rate: float = 0.0):
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.drop_rate = drop_rate
+        self.records: Dict[str, Tuple[int, int, int]] = {}
+        self.identities: List[str] = []
+        self.tx_log: List[Tuple[str, str]] = []
+        self.address = LOCAL_ORACLE
+        self.account_nonces: Dict[str, int] = {}
+        self.queued: Dict[str, Dict[int, tuple]] = {}
+        self._calls = itertools.count()
+        self._sends = itertools.count()
+        self._lock = threading.Lock()
+        self.nonces = NonceManager(self.get_transaction_count, self.address)
+
+    def _tx_hash(self, *parts) -> str:
+        return "0x" + hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    # --- node side --- #
+    def get_transaction_count(self, address: str, block_identifier: str = "latest") -> int:
+        """Mined count; "pending" is the same since contiguous transactions mine at once."""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            return self.account_nonces.get(address, 0)
+
+    def send_raw_transaction(self, raw: tuple) -> str:
+        """raw = (sender, nonce, method, *args), as built by _sign."""
+        if self.latency:
+            time.sleep(self.latency)
+        sender, nonce = raw[0], raw[1]
+        with self._lock:
+            call = next(self._calls)
+            if self.fail_rate and (call * 0.6180339887) % 1.0 < self.fail_rate:
+                raise ConnectionError("simulated RPC failure")
+            mined = self.account_nonces.get(sender, 0)
+            queue = self.queued.setdefault(sender, {})
+            if nonce < mined:
+                raise ValueError(f"nonce too low: next nonce {mined}, tx nonce {nonce}")
+            if nonce in queue:
+                if queue[nonce] == raw:
+                    raise ValueError("already known")
+                raise ValueError("replacement transaction underpriced")
+            tx_hash = self._tx_hash(*raw)
+            send = next(self._sends)
+            if self.drop_rate and (send * 0.7548776662) % 1.0 < self.drop_rate:
+                return tx_hash
+            queue[nonce] = raw
+            while mined in queue:
+                self._apply(queue.pop(mined))
+                mined += 1
+            self.account_nonces[sender] = mined
+            return tx_hash
+
+    def _apply(self, raw: tuple):
+        method, args = raw[2], raw[3:]
+        if method == "updateTrust":
+            identity_id, score, entropy = args
+            if identity_id not in self.records:
+                self.identities.append(identity_id)
+            self.records[identity_id] = (score, entropy, int(time.time()))
+            self.tx_log.append((self._tx_hash(*raw), identity_id))
+
+    # --- client side --- #
+    def _sign(self, nonce: int, method: str, *args) -> tuple:
+        return (self.address, nonce, method, *args)
+
+    def _update_signer(self, identity_id: str, score: float, entropy: float) -> Callable[[int], tuple]:
+        return lambda nonce: self._sign(nonce, "updateTrust", identity_id, int(score * 1e6), int(entropy * 1e6))
+
+    def update_trust(self, identity_id: str, score: float, entropy: float) -> Optional[str]:
+        try:
+            return self.nonces.submit(self._update_signer(identity_id, score, entropy), self.send_raw_transaction)
+        except Exception as e:
+            print(f"[LocalTrustFabric] Error: {e}")
+            return None
+
+    def update_trust_many(self, updates: Sequence[Tuple[str, float, float]]) -> List[Optional[str]]:
+        """Pipelined update_trust: one tx hash (or None on failure) per update."""
+        results = self.nonces.submit_many(
+            [self._update_signer(*upd) for upd in updates],
+            self.send_raw_transaction,
+        )
+        return [None if isinstance(r, Exception) else r for r in results]
+
+    def fill_nonce_gaps(self) -> int:
+        return self.nonces.fill_gaps(self.send_raw_transaction, lambda nonce: self._sign(nonce, "noop"))
+
+    def get_trust(self, identity_id: str):
+        return self.records.get(identity_id, (0, 0, 0))
+
+    def poll_trust_updates(self, from_block: Optional[int] = None) -> Tuple[List[str], Optional[int]]:
+        """Same contract as TrustFabricClient; the cursor is a position in tx_log."""
+        with self._lock:
+            end = len(self.tx_log)
+            if from_block is None:
+                return [], end
+            return [identity_id for _, identity_id in self.tx_log[from_block:end]], end
+
+    def get_all_identities(self):
+        return list(self.identities)
+
+    def rank_identities(self):
+        return sorted(((i, self.records[i][0]) for i in self.identities), key=lambda kv: kv[1], reverse=True)
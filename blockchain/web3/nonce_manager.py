@@ -0,0 +1,227 @@
+"""
+Local nonce tracking for an account that sends many transactions.
+
+Fetching get_transaction_count before every transaction costs a round trip per send,
+and concurrent senders that read the same count collide on one nonce. NonceManager
+reads the node's pending count once and then hands nonces out from memory:
+
+- allocate() reserves the next nonce (released nonces are reused first, lowest first);
+- sent(nonce, raw) records a transaction the node accepted, keeping the signed bytes
+  until the nonce is mined so it can be rebroadcast;
+- release(nonce) returns a nonce whose transaction never reached the node.
+
+`submit` wraps that cycle for one transaction and `submit_many` signs a batch and
+sends it back to back without waiting for receipts, so many transactions are in
+flight at once. A "nonce too low" / "replacement underpriced" / "already known"
+rejection means the nonce is taken on the node: the manager resyncs and retries
+with a fresh one.
+
+Gap detection: the node only mines an account's nonces in sequence, so a dropped
+transaction stalls every later one. `gaps()` compares the node's pending count
+with the highest nonce sent and returns the missing nonces; `fill_gaps` rebroadcasts
+their signed bytes, or a no-op transaction where none were kept.
+"""
+
+from __future__ import annotations
+import heapq
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+NONCE_CONFLICT_MARKERS = (
+    "nonce too low",
+    "replacement transaction underpriced",
+    "already known",
+    "known transaction",
+)
+
+
+def is_nonce_conflict(exc: BaseException) -> bool:
+    """True if the node rejected a transaction because its nonce is already used."""
+    message = str(exc).lower()
+    return any(marker in message for marker in NONCE_CONFLICT_MARKERS)
+
+
+class NonceManager:
+    def __init__(
+        self,
+        get_transaction_count: Callable[[str, str], int],
+        address: str,
+    ):
+        self.address = address
+        self._count = get_transaction_count
+        self._next: Optional[int] = None
+        self._free: List[int] = []
+        self._inflight: Set[int] = set()
+        self._sent: Dict[int, Any] = {}
+        self._lock = threading.Lock()
+        self.resyncs = 0
+
+    def _sync_locked(self) -> int:
+        mined = self._count(self.address, "latest")
+        pending = max(self._count(self.address, "pending"), mined)
+        for nonce in [n for n in self._sent if n < mined]:
+            del self._sent[nonce]
+        if self._next is None or pending > self._next:
+            # another sender moved the account past us
+            self._next = pending
+        # released nonces below the pending count were used by someone else
+        self._free = [n for n in self._free if n >= pending]
+        heapq.heapify(self._free)
+        return pending
+
+    def allocate(self) -> int:
+        with self._lock:
+            if self._next is None:
+                self._sync_locked()
+            if self._free:
+                nonce = heapq.heappop(self._free)
+            else:
+                nonce = self._next
+                self._next += 1
+            self._inflight.add(nonce)
+            return nonce
+
+    def sent(
+        self,
+        nonce: int,
+        raw: Any = None,
+    ):
+        with self._lock:
+            self._inflight.discard(nonce)
+            self._sent[nonce] = raw
+
+    def release(
+        self,
+        nonce: int,
+    ):
+        """The transaction for `nonce` never reached the node; hand the nonce out again."""
+        with self._lock:
+            self._inflight.discard(nonce)
+            if nonce not in self._sent:
+                heapq.heappush(self._free, nonce)
+
+    def discard(
+        self,
+        nonce: int,
+    ):
+        """The node already holds a transaction at `nonce`; never hand it out again."""
+        with self._lock:
+            self._inflight.discard(nonce)
+
+    def resync(self) -> int:
+        """Re-read the node's counts; returns the pending count."""
+        with self._lock:
+            self.resyncs += 1
+            return self._sync_locked()
+
+    def pending(self) -> int:
+        """Transactions sent and not yet seen mined."""
+        with self._lock:
+            return len(self._sent) + len(self._inflight)
+
+    def gaps(self) -> List[int]:
+        """Nonces the node is missing below the highest one sent, lowest first."""
+        with self._lock:
+            pending = self._sync_locked()
+            if not self._sent or max(self._sent) < pending:
+                return []
+            # sent nonces in the range may be queued behind the gap or dropped with it;
+            # rebroadcasting a queued one is harmless ("already known")
+            return [n for n in range(pending, max(self._sent)) if n not in self._inflight]
+
+    def submit(
+        self,
+        sign: Callable[[int], Any],
+        send: Callable[[Any], Any],
+        retries: int = 3,
+    ):
+        """sign(nonce) -> raw, send(raw) -> tx hash; retried on nonce conflicts."""
+        for attempt in range(retries + 1):
+            nonce = self.allocate()
+            try:
+                raw = sign(nonce)
+                result = send(raw)
+            except Exception as exc:
+                if is_nonce_conflict(exc) and attempt < retries:
+                    self.discard(nonce)
+                    self.resync()
+                    continue
+                if is_nonce_conflict(exc):
+                    self.discard(nonce)
+                else:
+                    self.release(nonce)
+                raise
+            self.sent(nonce, raw)
+            return result
+
+    def submit_many(
+        self,
+        signs: Sequence[Callable[[int], Any]],
+        send: Callable[[Any], Any],
+        retries: int = 3,
+    ) -> List[Any]:
+        """
+        Sign every transaction first, then send them in nonce order without waiting
+        for receipts. Returns one tx hash or exception per entry.
+        """
+        nonces = [self.allocate() for _ in signs]
+        results: List[Any] = [None] * len(signs)
+        raws: List[Any] = [None] * len(signs)
+        for i, (nonce, sign) in enumerate(zip(nonces, signs)):
+            try:
+                raws[i] = sign(nonce)
+            except Exception as exc:
+                self.release(nonce)
+                results[i] = exc
+        for i, nonce in enumerate(nonces):
+            if results[i] is not None:
+                continue
+            try:
+                results[i] = send(raws[i])
+            except Exception as exc:
+                if not is_nonce_conflict(exc):
+                    self.release(nonce)
+                    results[i] = exc
+                    continue
+                self.discard(nonce)
+                self.resync()
+                try:
+                    results[i] = self.submit(signs[i], send, retries=retries - 1)
+                except Exception as retry_exc:
+                    results[i] = retry_exc
+                continue
+            self.sent(nonce, raws[i])
+        return results
+
+    def fill_gaps(
+        self,
+        send: Callable[[Any], Any],
+        sign_noop: Optional[Callable[[int], Any]] = None,
+    ) -> int:
+        """Rebroadcast (or no-op fill) every gap; returns how many were filled."""
+        filled = 0
+        for nonce in self.gaps():
+            with self._lock:
+                raw = self._sent.get(nonce)
+                noop = raw is None
+                if noop:
+                    if sign_noop is None or nonce in self._inflight:
+                        continue
+                    if nonce in self._free:
+                        self._free.remove(nonce)
+                        heapq.heapify(self._free)
+                    self._inflight.add(nonce)
+            try:
+                if noop:
+                    raw = sign_noop(nonce)
+                send(raw)
+                filled += 1
+            except Exception as exc:
+                if not is_nonce_conflict(exc):
+                    print(f"[NonceManager] Could not fill nonce {nonce}: {exc}")
+                    if noop:
+                        self.release(nonce)
+                    continue
+                # the node already has it (queued behind the gap, or taken by another sender)
+            self.sent(nonce, raw)
+        return filled
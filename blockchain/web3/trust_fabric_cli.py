@@ -1,13 +1,16 @@
 import json, os
 from web3 import Web3
 from eth_account import Account
-from typing import Optional
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .nonce_manager import NonceManager
 
 class TrustFabricClient:
     def __init__(self, rpc_url: str, private_key: Optional[str], contract_addr: Optional[str], abi_path: str):
         self.w3 = Web3(Web3.HTTPProvider(rpc_url))
         self.oracle = None
         self.contract = None
+        self.nonces: Optional[NonceManager] = None
         if private_key and private_key.strip() and contract_addr and contract_addr.strip():
             try:
                 # Normalize 0x prefix
@@ -19,18 +22,14 @@ class TrustFabricClient:
                     abi = json.load(f)
                 addr = Web3.to_checksum_address(contract_addr)
                 self.contract = self.w3.eth.contract(address=addr, abi=abi)
+                self.nonces = NonceManager(self.w3.eth.get_transaction_count, self.oracle.address)
             except Exception as e:
                 print(f"[TrustFabricClient] Disabled blockchain client due to config error: {e}")
                 self.oracle = None
                 self.contract = None
 
-    def update_trust(self, identity_id: str, score: float, entropy: float) -> Optional[str]:
-        """Push trust score to chain. Returns tx hash (hex)."""
-        try:
-            if not self.oracle or not self.contract:
-                # Blockchain not configured; act as no-op
-                return None
-            nonce = self.w3.eth.get_transaction_count(self.oracle.address)
+    def _update_signer(self, identity_id: str, score: float, entropy: float) -> Callable[[int], bytes]:
+        def sign(nonce: int) -> bytes:
             tx = self.contract.functions.updateTrust(
                 identity_id,
                 int(score * 1e6),
@@ -41,18 +40,73 @@ class TrustFabricClient:
                 "gas": 200_000,
                 "gasPrice": self.w3.to_wei("5", "gwei"),
             })
-            signed = self.oracle.sign_transaction(tx)
-            tx_hash = self.w3.eth.send_raw_transaction(signed.rawTransaction)
-            return tx_hash.hex()
+            return self.oracle.sign_transaction(tx).raw_transaction
+        return sign
+
+    def _send(self, raw: bytes) -> str:
+        return self.w3.eth.send_raw_transaction(raw).hex()
+
+    def update_trust(self, identity_id: str, score: float, entropy: float) -> Optional[str]:
+        """Push trust score to chain. Returns tx hash (hex)."""
+        try:
+            if not self.oracle or not self.contract:
+                # Blockchain not configured; act as no-op
+                return None
+            return self.nonces.submit(self._update_signer(identity_id, score, entropy), self._send)
         except Exception as e:
             print(f"[TrustFabricClient] Error: {e}")
             return None
 
+    def update_trust_many(self, updates: Sequence[Tuple[str, float, float]]) -> List[Optional[str]]:
+        """
+        Pipelined update_trust: signs one transaction per (identity_id, score, entropy)
+        and sends them back to back without waiting for receipts. Returns a tx hash
+        (or None on failure) per update.
+        """
+        if not self.oracle or not self.contract:
+            return [None] * len(updates)
+        results = self.nonces.submit_many([self._update_signer(*upd) for upd in updates], self._send)
+        for (identity_id, _, _), result in zip(updates, results):
+            if isinstance(result, Exception):
+                print(f"[TrustFabricClient] Error for {identity_id}: {result}")
+        return [None if isinstance(r, Exception) else r for r in results]
+
+    def fill_nonce_gaps(self) -> int:
+        """Rebroadcast dropped transactions (or send 0-value self-transfers) so later ones can mine."""
+        if not self.nonces:
+            return 0
+
+        def sign_noop(nonce: int) -> bytes:
+            tx = {
+                "to": self.oracle.address,
+                "value": 0,
+                "nonce": nonce,
+                "gas": 21_000,
+                "gasPrice": self.w3.to_wei("5", "gwei"),
+                "chainId": self.w3.eth.chain_id,
+            }
+            return self.oracle.sign_transaction(tx).raw_transaction
+
+        return self.nonces.fill_gaps(self._send, sign_noop)
+
     def get_trust(self, identity_id: str):
         if not self.contract:
             return None
         return self.contract.functions.getTrust(identity_id).call()
 
+    def poll_trust_updates(self, from_block: Optional[int] = None) -> Tuple[List[str], Optional[int]]:
+        """
+        Identity ids from TrustUpdated events since `from_block`, plus the block to
+        poll from next. The first call (from_block=None) only establishes the cursor.
+        """
+        if not self.contract:
+            return [], from_block
+        latest = self.w3.eth.block_number
+        if from_block is None or from_block > latest:
+            return [], latest + 1 if from_block is None else from_block
+        logs = self.contract.events.TrustUpdated().get_logs(from_block=from_block, to_block=latest)
+        return [log["args"]["identityId"] for log in logs], latest + 1
+
     def get_all_identities(self):
         if not self.contract:
             return []
@@ -1,10 +1,185 @@
+import json
 import math
-from typing import Dict, List
+import os
+import struct
+import threading
+import time
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .rank_index import RankIndex
+
+# snapshot layout: magic, u32 header length, JSON header, zero pad to 8 bytes, then
+# score/entropy/updated float64 columns of length n and the NUL-joined utf-8 ids
+SNAPSHOT_MAGIC = b"DTE1"
+
+
+class _RankKeyColumn(MutableMapping):
+    """
+    The engine's rank-key column seen as the id -> key mapping RankIndex keeps;
+    NaN marks a slot the index does not hold yet.
+    """
+
+    def __init__(self, engine: "DynamicTrustEngine"):
+        self._engine = engine
+
+    def __getitem__(self, identity_id: str) -> float:
+        key = self._engine._rank_key[self._engine._index[identity_id]]
+        if math.isnan(key):
+            raise KeyError(identity_id)
+        return float(key)
+
+    def __setitem__(self, identity_id: str, key: float):
+        self._engine._rank_key[self._engine._index[identity_id]] = key
+
+    def __delitem__(self, identity_id: str):
+        self[identity_id]
+        self._engine._rank_key[self._engine._index[identity_id]] = np.nan
+
+    def __iter__(self) -> Iterator[str]:
+        engine = self._engine
+        n = len(engine._ids)
+        return (engine._ids[k] for k in np.flatnonzero(~np.isnan(engine._rank_key[:n])).tolist())
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(~np.isnan(self._engine._rank_key[:len(self._engine._ids)])))
+
+    def update(self, other=(), **kwargs):
+        pairs = list(other.items() if isinstance(other, Mapping) else other) + list(kwargs.items())
+        if pairs:
+            index = self._engine._index
+            slots = np.fromiter((index[i] for i, _ in pairs), dtype=np.int64, count=len(pairs))
+            self._engine._rank_key[slots] = [k for _, k in pairs]
+
+    def clear(self):
+        self._engine._rank_key[:] = np.nan
+
 
 class DynamicTrustEngine:
-    def __init__(self, decay: float = 0.9):
+    """
+    Trust scores held column-wise: an id -> slot index plus contiguous float64
+    arrays for score, entropy and last update time, grown by doubling. Column
+    scans (rank_identities) use argpartition for top-k and the whole state
+    dumps/loads as arrays. `ranking` is an order-statistics index kept in step
+    with every update, backing top / bottom / rank_of / count_below.
+    If `journal` is set, every update is also handed to journal.append(ids,
+    scores, entropies, updated) so it can be replayed on top of a snapshot; if
+    `event_log` is set, the raw inputs go to event_log.append(ids, agreement,
+    biometric, witness, ts) for re-deriving scores under other parameters.
+
+    With `half_life` (seconds) scores also decay with time: the stored score is
+    the value at its last update and reads apply exp(-rate * age) lazily. Since
+    every identity decays at the same rate, order is preserved by the key
+    log(score) + rate * (updated - epoch), which is what `ranking` holds; the
+    current time only enters when a key is turned back into a score, so ranking
+    stays exact without ever sweeping the population.
+
+    Writers (slot allocation, growth, column writes) hold `_lock`: the calculator
+    calls the engine from FastAPI's threadpool, and unlike a plain dict a slot
+    handed out by len(_ids) or a column swapped by _reserve is not GIL-atomic.
+
+    `ranking` keeps the key each identity was indexed under in the engine's
+    `_rank_key` column (8 B/identity) instead of a dict of its own, so a score is
+    not held twice. Measured with tracemalloc at 200k identities the whole engine
+    takes ~200 B/identity (~230 B while the index kept its own dict). The old
+    score and last-updated dicts took ~125 B but had no rank index; the
+    SortedList's (key, id) tuples, ~90 B/identity, are most of the difference.
+    """
+
+    def __init__(self, decay: float = 0.9, capacity: int = 1024, half_life: Optional[float] = None):
         self.decay = decay
-        self._scores: Dict[str, float] = {}
+        self.half_life = half_life
+        self._rate = math.log(2) / half_life if half_life else 0.0
+        self.epoch = time.time()
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._score = np.zeros(capacity, dtype=np.float64)
+        self._entropy_col = np.zeros(capacity, dtype=np.float64)
+        self._updated = np.zeros(capacity, dtype=np.float64)
+        self._rank_key = np.full(capacity, np.nan)
+        self.ranking = RankIndex(scores=_RankKeyColumn(self))
+        self.journal = None
+        self.event_log = None
+        self.snapshot_meta: Dict = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _reserve(self, n: int):
+        cap = self._score.size
+        if n <= cap:
+            return
+        new_cap = max(n, cap * 2)
+        for name in ("_score", "_entropy_col", "_updated"):
+            old = getattr(self, name)
+            grown = np.zeros(new_cap, dtype=np.float64)
+            grown[:old.size] = old
+            setattr(self, name, grown)
+        grown = np.full(new_cap, np.nan)
+        grown[:cap] = self._rank_key[:cap]
+        self._rank_key = grown
+
+    def _slot(self, identity_id: str) -> int:
+        slot = self._index.get(identity_id)
+        if slot is None:
+            with self._lock:
+                slot = self._index.get(identity_id)
+                if slot is None:
+                    slot = len(self._ids)
+                    self._reserve(slot + 1)
+                    self._index[identity_id] = slot
+                    self._ids.append(identity_id)
+                    self._score[slot] = np.nan
+        return slot
+
+    def _slots(self, identity_ids: Sequence[str]) -> np.ndarray:
+        """Slot per id (allocating new identities, score NaN)."""
+        index = self._index
+        with self._lock:
+            new_ids = [i for i in dict.fromkeys(identity_ids) if i not in index]
+            if new_ids:
+                start = len(self._ids)
+                self._reserve(start + len(new_ids))
+                index.update(zip(new_ids, range(start, start + len(new_ids))))
+                self._ids.extend(new_ids)
+                self._score[start:start + len(new_ids)] = np.nan
+        return np.fromiter((index[i] for i in identity_ids), dtype=np.int64, count=len(identity_ids))
+
+    # --- time decay --- #
+    def _rank_keys(self, scores, updated) -> np.ndarray:
+        scores = np.asarray(scores, dtype=np.float64)
+        if not self._rate:
+            return scores
+        with np.errstate(divide="ignore"):
+            return np.log(scores) + self._rate * (np.asarray(updated, dtype=np.float64) - self.epoch)
+
+    def _key_to_score(self, key: float, now: float) -> float:
+        if not self._rate:
+            return key
+        return math.exp(key - self._rate * (now - self.epoch))
+
+    def _score_to_key(self, score: float, now: float) -> float:
+        if not self._rate:
+            return score
+        return math.log(score) + self._rate * (now - self.epoch) if score > 0 else -math.inf
+
+    def _decayed(self, slots, now: float) -> np.ndarray:
+        """Stored scores of `slots` decayed to `now`."""
+        col = self._score[slots]
+        if not self._rate:
+            return col
+        return col * np.exp(-self._rate * (now - self._updated[slots]))
+
+    def set_half_life(self, half_life: Optional[float]):
+        """Switch decay mode; rank keys are rebuilt from the stored columns."""
+        with self._lock:
+            self.half_life = half_life
+            self._rate = math.log(2) / half_life if half_life else 0.0
+            n = len(self._ids)
+            self.ranking.rebuild(self._ids, self._rank_keys(self._score[:n], self._updated[:n]))
 
     def _entropy(self, values: List[float]) -> float:
         """
@@ -28,14 +203,238 @@ class DynamicTrustEngine:
         entropy_factor = 1.0 - (0.1 * entropy)
         new_score = base_score * (0.7 + 0.3 * entropy_factor)
 
-        prev = self._scores.get(identity_id, new_score)
-        updated = (self.decay * prev) + ((1 - self.decay) * new_score)
+        with self._lock:
+            now = time.time()
+            slot = self._slot(identity_id)
+            prev = float(self._decayed(slot, now))
+            if math.isnan(prev):
+                prev = new_score
+            updated = (self.decay * prev) + ((1 - self.decay) * new_score)
 
-        self._scores[identity_id] = updated
+            self._score[slot] = updated
+            self._entropy_col[slot] = entropy
+            self._updated[slot] = now
+            self.ranking.update(identity_id, self._score_to_key(updated, now))
+            if self.journal is not None:
+                self.journal.append([identity_id], [updated], [entropy], [now])
+            if self.event_log is not None:
+                self.event_log.append([identity_id], [agreement], [biometric], [witness], [now])
         return updated, entropy
 
-    def get_trust(self, identity_id: str) -> float:
-        return self._scores.get(identity_id, 0.0)
+    @staticmethod
+    def _entropy_batch(values: np.ndarray) -> np.ndarray:
+        """
+        Row-wise version of _entropy for an (n, k) array.
+        """
+        total = values.sum(axis=1, keepdims=True)
+        safe_total = np.where(total == 0, 1.0, total)
+        probs = values / safe_total
+        with np.errstate(divide="ignore", invalid="ignore"):
+            terms = np.where(probs > 0, probs * np.log2(np.where(probs > 0, probs, 1.0)), 0.0)
+        entropy = -terms.sum(axis=1) / math.log2(values.shape[1])
+        return np.where(total[:, 0] == 0, 1.0, entropy)
+
+    def update_many(
+        self,
+        identity_ids: Sequence[str],
+        agreement: Sequence[float],
+        biometric: Sequence[float],
+        witness: Sequence[float],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batched update_trust: same scores as calling update_trust item by item, in order
+        (an id repeated within the batch decays through each of its updates in turn).
+        Returns (scores, entropies) arrays aligned with the inputs.
+        """
+        a = np.asarray(agreement, dtype=np.float64)
+        b = np.asarray(biometric, dtype=np.float64)
+        w = np.asarray(witness, dtype=np.float64)
+        n = a.size
+        if n == 0:
+            return np.empty(0), np.empty(0)
+
+        base_score = (0.5 * a) + (0.3 * b) + (0.2 * w)
+        entropy = self._entropy_batch(np.stack([a, b, w], axis=1))
+        entropy_factor = 1.0 - (0.1 * entropy)
+        new_score = base_score * (0.7 + 0.3 * entropy_factor)
+
+        with self._lock:
+            # map ids to slots; new identities start with a NaN score
+            slot = self._slots(identity_ids)
+            now = time.time()
+            if self._rate:
+                # bring each touched identity's score to `now` once; repeats then chain as usual
+                touched = np.unique(slot)
+                self._score[touched] = self._decayed(touched, now)
+                self._updated[touched] = now
+            state = self._score
+
+            # occurrence rank of each item within its id; rank r items are independent
+            order = np.argsort(slot, kind="stable")
+            sorted_slots = slot[order]
+            starts = np.flatnonzero(np.r_[True, sorted_slots[1:] != sorted_slots[:-1]])
+            counts = np.diff(np.r_[starts, n])
+            rank = np.empty(n, dtype=np.int64)
+            rank[order] = np.arange(n) - np.repeat(starts, counts)
+
+            by_rank = np.argsort(rank, kind="stable")
+            bounds = np.searchsorted(rank[by_rank], np.arange(rank.max() + 2))
+            scores = np.empty(n, dtype=np.float64)
+            for r in range(rank.max() + 1):
+                idx = by_rank[bounds[r]:bounds[r + 1]]
+                s_idx = slot[idx]
+                prev = state[s_idx]
+                prev = np.where(np.isnan(prev), new_score[idx], prev)
+                updated = (self.decay * prev) + ((1 - self.decay) * new_score[idx])
+                state[s_idx] = updated
+                scores[idx] = updated
+
+            # for repeated ids the last occurrence wins, matching sequential updates
+            stamps = np.full(n, now)
+            self._entropy_col[slot] = entropy
+            self._updated[slot] = stamps
+            self.ranking.update_many(identity_ids, self._rank_keys(scores, stamps))
+            if self.journal is not None:
+                self.journal.append(identity_ids, scores, entropy, stamps)
+            if self.event_log is not None:
+                self.event_log.append(identity_ids, a, b, w, stamps)
+        return scores, entropy
+
+    def apply_state(
+        self,
+        identity_ids: Sequence[str],
+        scores: Sequence[float],
+        entropies: Sequence[float],
+        updated: Sequence[float],
+    ):
+        """Overwrite stored values as given (log replay); later entries for an id win."""
+        if not len(identity_ids):
+            return
+        with self._lock:
+            slot = self._slots(identity_ids)
+            self._score[slot] = scores
+            self._entropy_col[slot] = entropies
+            self._updated[slot] = updated
+            self.ranking.update_many(identity_ids, self._rank_keys(scores, updated))
+
+    def get_trust(self, identity_id: str, now: Optional[float] = None) -> float:
+        slot = self._index.get(identity_id)
+        if slot is None:
+            return 0.0
+        return float(self._decayed(slot, time.time() if now is None else now))
+
+    def get_entropy(self, identity_id: str) -> float:
+        slot = self._index.get(identity_id)
+        return 0.0 if slot is None else float(self._entropy_col[slot])
+
+    def last_updated(self, identity_id: str) -> Optional[float]:
+        slot = self._index.get(identity_id)
+        return None if slot is None else float(self._updated[slot])
+
+    def scores(self, now: Optional[float] = None) -> np.ndarray:
+        """Read-only current scores in slot order (a view of the column unless decaying)."""
+        n = len(self._ids)
+        if self._rate:
+            now = time.time() if now is None else now
+            view = self._score[:n] * np.exp(-self._rate * (now - self._updated[:n]))
+        else:
+            view = self._score[:n]
+        view.flags.writeable = False
+        return view
+
+    def _ranked_slots(self, top: Optional[int], descending: bool) -> np.ndarray:
+        col = self.scores()
+        keyed = -col if descending else col
+        n = col.size
+        if top is None or top >= n:
+            return np.argsort(keyed, kind="stable")
+        if top <= 0:
+            return np.empty(0, dtype=np.int64)
+        part = np.argpartition(keyed, top - 1)[:top]
+        return part[np.argsort(keyed[part], kind="stable")]
+
+    def rank_identities(self, top: Optional[int] = None):
+        """(identity_id, score) pairs by descending score from the columns; top=k is O(n + k log k)."""
+        ids, col = self._ids, self.scores()
+        return [(ids[i], float(col[i])) for i in self._ranked_slots(top, descending=True)]
+
+    def bottom_identities(self, k: int):
+        """(identity_id, score) pairs for the k lowest scores, ascending."""
+        ids, col = self._ids, self.scores()
+        return [(ids[i], float(col[i])) for i in self._ranked_slots(k, descending=False)]
+
+    # --- index-backed queries (O(log n [+ k]), decay applied to the k results only) --- #
+    def top(self, k: Optional[int] = None, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        now = time.time() if now is None else now
+        return [(i, self._key_to_score(key, now)) for i, key in self.ranking.top(k)]
+
+    def bottom(self, k: int, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        now = time.time() if now is None else now
+        return [(i, self._key_to_score(key, now)) for i, key in self.ranking.bottom(k)]
+
+    def rank_of(self, identity_id: str) -> Optional[int]:
+        return self.ranking.rank_of(identity_id)
+
+    def count_below(self, threshold: float, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return self.ranking.count_below(self._score_to_key(threshold, now))
+
+    def count_above(self, threshold: float, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return self.ranking.count_above(self._score_to_key(threshold, now))
+
+    def dump(self, path: str, meta: Optional[Dict] = None):
+        """
+        Write the whole store as one binary snapshot. The file is written next to
+        `path` and renamed over it, so readers only ever see a complete snapshot.
+        """
+        with self._lock:
+            n = len(self._ids)
+            blob = "\x00".join(self._ids).encode("utf-8")
+            cols = [np.array(col[:n]) for col in (self._score, self._entropy_col, self._updated)]
+        if n and blob.count(b"\x00") != n - 1:
+            raise ValueError("identity ids must not contain NUL characters")
+        header = json.dumps(dict(meta or {}, n=n, decay=self.decay, half_life=self.half_life, ids_bytes=len(blob))).encode("utf-8")
+        prefix = SNAPSHOT_MAGIC + struct.pack("<I", len(header)) + header
+        prefix += b"\x00" * (-len(prefix) % 8)
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(prefix)
+            for col in cols:
+                fh.write(col.tobytes())
+            fh.write(blob)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = False) -> "DynamicTrustEngine":
+        """
+        Load a dump() snapshot. With mmap=True the columns are copy-on-write maps of
+        the file (pages are read on first touch, writes stay private); they become
+        ordinary arrays the first time the store grows.
+        """
+        with open(path, "rb") as fh:
+            if fh.read(4) != SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a trust engine snapshot")
+            (header_len,) = struct.unpack("<I", fh.read(4))
+            header = json.loads(fh.read(header_len))
+            offset = 8 + header_len + (-(8 + header_len) % 8)
+            n = header["n"]
+            fh.seek(offset + 3 * 8 * n)
+            blob = fh.read(header["ids_bytes"])
 
-    def rank_identities(self):
-        return sorted(self._scores.items(), key=lambda kv: kv[1], reverse=True)
+        engine = cls(decay=header["decay"], capacity=max(n, 1), half_life=header.get("half_life"))
+        if n and mmap:
+            for k, name in enumerate(("_score", "_entropy_col", "_updated")):
+                setattr(engine, name, np.memmap(path, dtype=np.float64, mode="c", offset=offset + k * 8 * n, shape=(n,)))
+        elif n:
+            cols = np.fromfile(path, dtype=np.float64, count=3 * n, offset=offset).reshape(3, n)
+            engine._score[:n], engine._entropy_col[:n], engine._updated[:n] = cols
+        ids = blob.decode("utf-8").split("\x00") if n else []
+        engine._ids = ids
+        engine._index = dict(zip(ids, range(n)))
+        engine.ranking.rebuild(ids, engine._rank_keys(engine._score[:n], engine._updated[:n]))
+        engine.snapshot_meta = {k: v for k, v in header.items() if k not in ("n", "decay", "half_life", "ids_bytes")}
+        return engine
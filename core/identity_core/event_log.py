@@ -0,0 +1,264 @@
+"""
+Event-sourced trust inputs and vectorized replay.
+
+DynamicTrustEngine keeps only each identity's latest score; to re-derive scores
+under different weights, decay or half-life we keep the inputs instead:
+
+    ids.txt      one identity id per line; line number = id index (append-only)
+    events.bin   fixed-width little-endian records (EVENT_DTYPE), append-only
+
+Set `engine.event_log = TrustEventLog(directory)` and every update_trust /
+update_many call appends its raw (identity, agreement, biometric, witness, ts).
+Both files only grow; there is no built-in retention, so callers enable the log
+explicitly and archive or remove old directories themselves.
+
+`replay` memory-maps events.bin and recomputes every score in one chunked pass.
+Per identity the engine's recurrence s_k = d * s_{k-1} * exp(-r * dt) + (1 - d) * x_k
+(started from s = x_0) unrolls to a weighted sum in which every weight is
+d**(later events) * exp(-r * age) <= 1, so each chunk reduces with a sort and
+np.add.reduceat instead of a Python loop per event, and carries only one
+(score, ts) pair per identity into the next chunk.
+
+Usage:
+    python -m core.identity_core.event_log synth --dir /tmp/events --events 100000000 --identities 1000000
+    python -m core.identity_core.event_log replay --dir /tmp/events --decay 0.8 --weights 0.4 0.4 0.2 --top 10
+"""
+
+from __future__ import annotations
+import argparse
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .dynamic_trust import DynamicTrustEngine
+
+EVENT_DTYPE = np.dtype([
+    ("identity", "<u4"),
+    ("agreement", "<f8"),
+    ("biometric", "<f8"),
+    ("witness", "<f8"),
+    ("ts", "<f8"),
+])
+IDS_NAME = "ids.txt"
+EVENTS_NAME = "events.bin"
+
+
+@dataclass
+class TrustParams:
+    """Scoring parameters; the defaults are DynamicTrustEngine's."""
+    decay: float = 0.9
+    weights: Tuple[float, float, float] = (0.5, 0.3, 0.2)
+    entropy_share: float = 0.3
+    entropy_penalty: float = 0.1
+    half_life: Optional[float] = None
+
+    def new_scores(self, a: np.ndarray, b: np.ndarray, w: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        base_score = (self.weights[0] * a) + (self.weights[1] * b) + (self.weights[2] * w)
+        entropy = DynamicTrustEngine._entropy_batch(np.stack([a, b, w], axis=1))
+        entropy_factor = 1.0 - (self.entropy_penalty * entropy)
+        return base_score * ((1.0 - self.entropy_share) + self.entropy_share * entropy_factor), entropy
+
+
+class TrustEventLog:
+    def __init__(
+        self,
+        directory: str,
+        fsync: bool = False,
+    ):
+        self.directory = directory
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        ids_path = os.path.join(directory, IDS_NAME)
+        self._index: Dict[str, int] = {}
+        if os.path.exists(ids_path):
+            with open(ids_path, encoding="utf-8") as fh:
+                for line in fh:
+                    self._index.setdefault(line.rstrip("\n"), len(self._index))
+        self._ids_fh = open(ids_path, "a", encoding="utf-8")
+        events_path = os.path.join(directory, EVENTS_NAME)
+        # drop a torn trailing record so appends stay aligned
+        size = os.path.getsize(events_path) if os.path.exists(events_path) else 0
+        if size % EVENT_DTYPE.itemsize:
+            with open(events_path, "r+b") as fh:
+                fh.truncate(size - size % EVENT_DTYPE.itemsize)
+        self._events_fh = open(events_path, "ab")
+        self._lock = threading.Lock()
+
+    def _id_indexes(self, identity_ids: Sequence[str]) -> np.ndarray:
+        new_ids = [i for i in dict.fromkeys(identity_ids) if i not in self._index]
+        if new_ids:
+            if any("\n" in i for i in new_ids):
+                raise ValueError("identity ids must not contain newlines")
+            for i in new_ids:
+                self._index[i] = len(self._index)
+            # ids are durable before any event refers to them
+            self._ids_fh.write("".join(f"{i}\n" for i in new_ids))
+            self._ids_fh.flush()
+        index = self._index
+        return np.fromiter((index[i] for i in identity_ids), dtype=np.uint32, count=len(identity_ids))
+
+    def append(
+        self,
+        identity_ids: Sequence[str],
+        agreement: Sequence[float],
+        biometric: Sequence[float],
+        witness: Sequence[float],
+        ts: Sequence[float],
+    ):
+        with self._lock:
+            rec = np.empty(len(identity_ids), dtype=EVENT_DTYPE)
+            rec["identity"] = self._id_indexes(identity_ids)
+            rec["agreement"] = agreement
+            rec["biometric"] = biometric
+            rec["witness"] = witness
+            rec["ts"] = ts
+            self._events_fh.write(rec.tobytes())
+            self._events_fh.flush()
+            if self.fsync:
+                os.fsync(self._events_fh.fileno())
+
+    def close(self):
+        with self._lock:
+            self._ids_fh.close()
+            self._events_fh.close()
+
+
+def read_ids(directory: str) -> List[str]:
+    with open(os.path.join(directory, IDS_NAME), encoding="utf-8") as fh:
+        return fh.read().split("\n")[:-1]
+
+
+def open_events(directory: str) -> np.ndarray:
+    """events.bin as a read-only memmap (a torn trailing record is ignored)."""
+    path = os.path.join(directory, EVENTS_NAME)
+    count = os.path.getsize(path) // EVENT_DTYPE.itemsize if os.path.exists(path) else 0
+    if not count:
+        return np.empty(0, dtype=EVENT_DTYPE)
+    return np.memmap(path, dtype=EVENT_DTYPE, mode="r", shape=(count,))
+
+
+def replay(
+    directory: str,
+    params: Optional[TrustParams] = None,
+    chunk: int = 5_000_000,
+) -> DynamicTrustEngine:
+    """Recompute every identity's score from the event log under `params`."""
+    params = params or TrustParams()
+    ids = read_ids(directory)
+    events = open_events(directory)
+    n_ids = len(ids)
+    score = np.full(n_ids, np.nan)
+    updated = np.zeros(n_ids)
+    entropy_last = np.zeros(n_ids)
+    log_d = math.log(params.decay) if params.decay > 0 else -math.inf
+    rate = math.log(2) / params.half_life if params.half_life else 0.0
+
+    for start in range(0, len(events), chunk):
+        ev = np.asarray(events[start:start + chunk])
+        ident = ev["identity"].astype(np.int64)
+        x, ent = params.new_scores(ev["agreement"], ev["biometric"], ev["witness"])
+        ts = ev["ts"]
+
+        # group by identity, keeping log order inside each group
+        order = np.argsort(ident, kind="stable")
+        g_ident, g_x, g_ts = ident[order], x[order], ts[order]
+        starts = np.flatnonzero(np.r_[True, g_ident[1:] != g_ident[:-1]])
+        ends = np.r_[starts[1:], len(order)] - 1
+        counts = ends - starts + 1
+        owner = g_ident[starts]
+        pos = np.arange(len(order)) - np.repeat(starts, counts)
+        later = np.repeat(counts, counts) - 1 - pos
+        t_last = g_ts[ends]
+        age = np.repeat(t_last, counts) - g_ts
+
+        # s_last = prev * d**n * exp(-r * (t_last - t_prev)) + sum_j (1 - d) x_j d**later_j exp(-r * age_j)
+        with np.errstate(invalid="ignore"):
+            weight = np.exp(later * log_d - rate * age) if params.decay > 0 else (later == 0).astype(np.float64)
+        acc = np.add.reduceat((1 - params.decay) * g_x * weight, starts)
+        prev = score[owner]
+        fresh = np.isnan(prev)
+        # a new identity starts from its first measurement at its first timestamp
+        prev = np.where(fresh, g_x[starts], prev)
+        t_prev = np.where(fresh, g_ts[starts], updated[owner])
+        carry = prev * np.exp(counts * log_d - rate * (t_last - t_prev)) if params.decay > 0 else 0.0
+
+        score[owner] = carry + acc
+        updated[owner] = t_last
+        entropy_last[owner] = ent[order][ends]
+
+    engine = DynamicTrustEngine(decay=params.decay, capacity=max(n_ids, 1), half_life=params.half_life)
+    seen = np.flatnonzero(~np.isnan(score))
+    engine.apply_state([ids[k] for k in seen.tolist()], score[seen], entropy_last[seen], updated[seen])
+    return engine
+
+
+def synth(
+    directory: str,
+    events: int,
+    identities: int,
+    batch: int = 5_000_000,
+    seed: int = 0,
+):
+    """Write `events` random events over `identities` ids (benchmark fixture)."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, IDS_NAME), "w", encoding="utf-8") as fh:
+        fh.write("".join(f"id-{i}\n" for i in range(identities)))
+    rng = np.random.default_rng(seed)
+    # one event per millisecond, ending now
+    t0 = time.time() - events * 1e-3
+    with open(os.path.join(directory, EVENTS_NAME), "wb") as fh:
+        for start in range(0, events, batch):
+            n = min(batch, events - start)
+            rec = np.empty(n, dtype=EVENT_DTYPE)
+            rec["identity"] = rng.integers(0, identities, n)
+            rec["agreement"] = rng.random(n)
+            rec["biometric"] = rng.random(n)
+            rec["witness"] = rng.random(n)
+            rec["ts"] = t0 + (start + np.arange(n)) * 1e-3
+            fh.write(rec.tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trust event log tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_synth = sub.add_parser("synth", help="write a random event log")
+    p_synth.add_argument("--dir", required=True)
+    p_synth.add_argument("--events", type=int, default=10_000_000)
+    p_synth.add_argument("--identities", type=int, default=1_000_000)
+    p_replay = sub.add_parser("replay", help="recompute scores under new parameters")
+    p_replay.add_argument("--dir", required=True)
+    p_replay.add_argument("--decay", type=float, default=0.9)
+    p_replay.add_argument("--weights", type=float, nargs=3, default=[0.5, 0.3, 0.2])
+    p_replay.add_argument("--entropy-share", type=float, default=0.3)
+    p_replay.add_argument("--entropy-penalty", type=float, default=0.1)
+    p_replay.add_argument("--half-life", type=float, default=None)
+    p_replay.add_argument("--chunk", type=int, default=5_000_000)
+    p_replay.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.cmd == "synth":
+        synth(args.dir, args.events, args.identities)
+        return
+    params = TrustParams(
+        decay=args.decay,
+        weights=tuple(args.weights),
+        entropy_share=args.entropy_share,
+        entropy_penalty=args.entropy_penalty,
+        half_life=args.half_life,
+    )
+    n_events = len(open_events(args.dir))
+    t0 = time.perf_counter()
+    engine = replay(args.dir, params, chunk=args.chunk)
+    dt = time.perf_counter() - t0
+    print(f"replayed {n_events:,} events -> {len(engine):,} identities in {dt:.1f}s ({n_events / dt:,.0f} events/s)")
+    for identity_id, score in engine.top(args.top):
+        print(f"  {identity_id:<24} {score:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Order-statistics index over trust scores.
+
+Kept next to DynamicTrustEngine and updated on every score change, so ranking
+queries never re-sort the population: entries are (score, identity_id) pairs in
+a SortedList, giving O(log n) update, rank-of and count-below, and O(log n + k)
+top-k / bottom-k.
+
+Removing an entry needs the score it was inserted with. By default the index keeps
+those in its own id -> score dict; an owner that already holds per-id storage
+passes `scores`, a MutableMapping it backs (DynamicTrustEngine uses a float64
+column addressed through its id index), so each score is stored once.
+"""
+
+from __future__ import annotations
+import math
+import threading
+from itertools import islice
+from typing import Iterable, List, MutableMapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sortedcontainers import SortedList
+
+
+class RankIndex:
+    def __init__(
+        self,
+        scores: Optional[MutableMapping[str, float]] = None,
+    ):
+        # id -> score currently in _order; only written by the index, under _lock
+        self._scores: MutableMapping[str, float] = {} if scores is None else scores
+        self._order = SortedList()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, identity_id: str) -> bool:
+        return identity_id in self._scores
+
+    def update(
+        self,
+        identity_id: str,
+        score: float,
+    ):
+        score = float(score)
+        with self._lock:
+            prev = self._scores.get(identity_id)
+            if prev is not None:
+                self._order.remove((prev, identity_id))
+            self._scores[identity_id] = score
+            self._order.add((score, identity_id))
+
+    def update_many(
+        self,
+        identity_ids: Iterable[str],
+        scores: Iterable[float],
+    ):
+        """Apply a batch; later entries for an id win. Large batches rebuild in one sort."""
+        latest = dict(zip(identity_ids, map(float, scores)))
+        with self._lock:
+            if len(latest) * 4 > len(self._order):
+                kept = [(s, i) for s, i in self._order if i not in latest]
+                self._scores.update(latest)
+                self._order = SortedList(kept + [(s, i) for i, s in latest.items()])
+                return
+            for identity_id, score in latest.items():
+                prev = self._scores.get(identity_id)
+                if prev is not None:
+                    self._order.remove((prev, identity_id))
+                self._scores[identity_id] = score
+                self._order.add((score, identity_id))
+
+    def rebuild(
+        self,
+        identity_ids: Sequence[str],
+        scores: Sequence[float],
+    ):
+        """Replace the contents; ids must be unique (e.g. an engine's slot order)."""
+        col = np.asarray(scores, dtype=np.float64)
+        # pre-sorting by score leaves SortedList's sort only ties to settle
+        order = np.argsort(col, kind="stable")
+        pairs = list(zip(col[order].tolist(), [identity_ids[k] for k in order.tolist()]))
+        with self._lock:
+            self._scores.clear()
+            self._scores.update(zip(identity_ids, col.tolist()))
+            self._order = SortedList(pairs)
+
+    def top(
+        self,
+        k: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """Highest scores first."""
+        with self._lock:
+            stop = None if k is None else max(int(k), 0)
+            return [(i, s) for s, i in islice(self._order.islice(reverse=True), stop)]
+
+    def bottom(
+        self,
+        k: int,
+    ) -> List[Tuple[str, float]]:
+        """Lowest scores first."""
+        with self._lock:
+            return [(i, s) for s, i in self._order.islice(0, max(int(k), 0))]
+
+    def rank_of(
+        self,
+        identity_id: str,
+    ) -> Optional[int]:
+        """1-based position in descending order, or None if unknown."""
+        with self._lock:
+            score = self._scores.get(identity_id)
+            if score is None:
+                return None
+            return len(self._order) - self._order.index((score, identity_id))
+
+    def count_below(
+        self,
+        threshold: float,
+    ) -> int:
+        with self._lock:
+            # "" sorts before every id, so this counts scores strictly below threshold
+            return self._order.bisect_left((float(threshold), ""))
+
+    def count_above(
+        self,
+        threshold: float,
+    ) -> int:
+        with self._lock:
+            # everything sorting at or below (threshold, <any id>) is not above it
+            at_or_below = self._order.bisect_left((math.nextafter(float(threshold), math.inf), ""))
+            return len(self._order) - at_or_below
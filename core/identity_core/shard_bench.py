@@ -0,0 +1,101 @@
+"""
+Updates/sec of the trust engine versus shard count on one machine.
+
+For each shard count, `--threads` client threads hammer the engine for
+`--seconds`: single update_trust calls (the /compute-trust path) and, separately,
+update_many batches of `--batch` (the /bulk-update path). shards=0 is the plain
+in-process DynamicTrustEngine behind a lock, as the calculator uses it today.
+
+Usage:
+    python -m core.identity_core.shard_bench --shards 0 1 2 4 8 --threads 8 --seconds 5
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import random
+import threading
+import time
+
+import numpy as np
+
+from .dynamic_trust import DynamicTrustEngine
+from .sharded_trust import ShardedTrustEngine
+
+
+class _LockedEngine:
+    """The single-process baseline: one engine shared by the threadpool."""
+
+    def __init__(self):
+        self.engine = DynamicTrustEngine()
+        self._lock = threading.Lock()
+
+    def update_trust(self, *args):
+        with self._lock:
+            return self.engine.update_trust(*args)
+
+    def update_many(self, *args):
+        with self._lock:
+            return self.engine.update_many(*args)
+
+    def close(self):
+        pass
+
+
+def _drive(
+    engine,
+    threads: int,
+    seconds: float,
+    identities: int,
+    batch: int,
+) -> float:
+    """Run client threads for `seconds`; returns updates/sec."""
+    counts = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def client(t: int):
+        rng = random.Random(t)
+        n = 0
+        while time.perf_counter() < deadline:
+            if batch <= 1:
+                engine.update_trust(f"id-{rng.randrange(identities)}", rng.random(), rng.random(), rng.random())
+                n += 1
+            else:
+                ids = [f"id-{rng.randrange(identities)}" for _ in range(batch)]
+                engine.update_many(ids, *np.random.default_rng(t).random((3, batch)))
+                n += batch
+        counts[t] = n
+
+    workers = [threading.Thread(target=client, args=(t,)) for t in range(threads)]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sum(counts) / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded trust engine throughput")
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--identities", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"cpus={os.cpu_count()} threads={args.threads} identities={args.identities} ({args.seconds}s per cell)")
+    print(f"{'shards':>6} {'single upd/s':>14} {'batch upd/s':>14}")
+    for n in args.shards:
+        engine = _LockedEngine() if n == 0 else ShardedTrustEngine(n_shards=n)
+        try:
+            single = _drive(engine, args.threads, args.seconds, args.identities, 1)
+            batched = _drive(engine, args.threads, args.seconds, args.identities, args.batch)
+        finally:
+            engine.close()
+        label = "local" if n == 0 else str(n)
+        print(f"{label:>6} {single:>14,.0f} {batched:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
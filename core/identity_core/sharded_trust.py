@@ -0,0 +1,308 @@
+"""
+Sharded trust engine: N worker processes, each owning the DynamicTrustEngine for
+one partition of identities, behind a facade with the engine's interface.
+
+- Identities are placed with a consistent-hash ring (`vnodes` points per shard),
+  so adding a shard moves only ~1/N of them.
+- Requests travel over one duplex Pipe per shard. Calls to different shards run
+  concurrently (the caller thread waits on the pipe with the GIL released); batch
+  calls are split per shard, sent to all shards first and gathered after.
+- Cross-shard queries merge per-shard answers: top/bottom merge each shard's k
+  best, count_below sums, rank_of adds the owner's local rank to the other shards'
+  count of higher scores. All shards evaluate decay at the same `now`.
+- With `state_dir`, each shard restores from and checkpoints to
+  state_dir/shard-<i>. If the directory was written with a different shard count
+  or ring, the old shards are restored in this process and redistributed.
+"""
+
+from __future__ import annotations
+import bisect
+import hashlib
+import heapq
+import json
+import multiprocessing as mp
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .dynamic_trust import DynamicTrustEngine
+from .trust_checkpoint import TrustCheckpointer
+
+LAYOUT_FILE = "layout.json"
+
+
+class HashRing:
+    def __init__(
+        self,
+        n_shards: int,
+        vnodes: int = 64,
+    ):
+        self.n_shards = n_shards
+        self.vnodes = vnodes
+        points = sorted(
+            (self._hash(f"shard-{s}#{v}"), s) for s in range(n_shards) for v in range(vnodes)
+        )
+        self._points = [p for p, _ in points]
+        self._owners = [s for _, s in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def shard(self, identity_id: str) -> int:
+        i = bisect.bisect(self._points, self._hash(identity_id))
+        return self._owners[i % len(self._owners)]
+
+    def partition(self, identity_ids: Sequence[str]) -> Dict[int, np.ndarray]:
+        """Positions of `identity_ids` per owning shard (input order kept within a shard)."""
+        owners = np.fromiter((self.shard(i) for i in identity_ids), dtype=np.int64, count=len(identity_ids))
+        return {s: np.flatnonzero(owners == s) for s in np.unique(owners).tolist()}
+
+
+def _shard_main(
+    conn,
+    decay: float,
+    half_life: Optional[float],
+    state_dir: Optional[str],
+    checkpoint_interval: float,
+):
+    checkpointer = None
+    if state_dir:
+        engine = TrustCheckpointer.restore(state_dir, decay=decay, half_life=half_life)
+        checkpointer = TrustCheckpointer(engine, state_dir, interval=checkpoint_interval)
+        checkpointer.start()
+    else:
+        engine = DynamicTrustEngine(decay=decay, half_life=half_life)
+    # ready signal: the facade blocks until every shard has restored its state
+    conn.send((True, len(engine)))
+
+    while True:
+        op, args = conn.recv()
+        if op == "stop":
+            if checkpointer is not None:
+                checkpointer.stop(checkpoint=True)
+            conn.send((True, None))
+            return
+        try:
+            if op == "checkpoint":
+                result = checkpointer.checkpoint() if checkpointer is not None else None
+            elif op == "len":
+                result = len(engine)
+            else:
+                result = getattr(engine, op)(*args)
+            conn.send((True, result))
+        except Exception as exc:
+            conn.send((False, f"{type(exc).__name__}: {exc}"))
+
+
+class ShardedTrustEngine:
+    def __init__(
+        self,
+        n_shards: int = 4,
+        decay: float = 0.9,
+        half_life: Optional[float] = None,
+        state_dir: Optional[str] = None,
+        checkpoint_interval: float = 60.0,
+        vnodes: int = 64,
+    ):
+        self.n_shards = n_shards
+        self.decay = decay
+        self.half_life = half_life
+        self.ring = HashRing(n_shards, vnodes)
+        self.state_dir = state_dir
+
+        previous = self._stash_previous_layout() if state_dir else None
+
+        ctx = mp.get_context("spawn")
+        self._conns = []
+        self._procs = []
+        self._locks = [threading.Lock() for _ in range(n_shards)]
+        for s in range(n_shards):
+            parent, child = ctx.Pipe()
+            shard_dir = os.path.join(state_dir, f"shard-{s}") if state_dir else None
+            proc = ctx.Process(
+                target=_shard_main,
+                args=(child, decay, half_life, shard_dir, checkpoint_interval),
+                name=f"trust-shard-{s}",
+                daemon=True,
+            )
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+        for s, conn in enumerate(self._conns):
+            ok, result = conn.recv()
+            if not ok:
+                raise RuntimeError(f"trust shard {s} failed to start: {result}")
+
+        if state_dir:
+            if previous:
+                self._migrate(previous)
+            with open(os.path.join(state_dir, LAYOUT_FILE), "w") as fh:
+                json.dump({"shards": n_shards, "vnodes": vnodes}, fh)
+
+    # --- layout changes --- #
+    def _stash_previous_layout(self) -> Optional[str]:
+        os.makedirs(self.state_dir, exist_ok=True)
+        layout_path = os.path.join(self.state_dir, LAYOUT_FILE)
+        if not os.path.exists(layout_path):
+            return None
+        with open(layout_path) as fh:
+            layout = json.load(fh)
+        if layout == {"shards": self.n_shards, "vnodes": self.ring.vnodes}:
+            return None
+        previous = os.path.join(self.state_dir, "previous")
+        os.makedirs(previous, exist_ok=True)
+        for name in os.listdir(self.state_dir):
+            if name.startswith("shard-"):
+                os.replace(os.path.join(self.state_dir, name), os.path.join(previous, name))
+        print(f"ShardedTrustEngine: re-sharding {layout} -> {self.n_shards} shards")
+        return previous
+
+    def _migrate(
+        self,
+        previous: str,
+    ):
+        for name in sorted(os.listdir(previous)):
+            old = TrustCheckpointer.restore(os.path.join(previous, name), decay=self.decay, half_life=self.half_life)
+            n = len(old)
+            if n:
+                ids = old._ids
+                cols = (old._score[:n], old._entropy_col[:n], old._updated[:n])
+                self._scatter({
+                    s: ("apply_state", ([ids[k] for k in pos.tolist()], *(c[pos] for c in cols)))
+                    for s, pos in self.ring.partition(ids).items()
+                })
+        self._scatter({s: ("checkpoint", ()) for s in range(self.n_shards)})
+        shutil.rmtree(previous)
+
+    # --- transport --- #
+    def _call(
+        self,
+        shard: int,
+        op: str,
+        *args,
+    ):
+        with self._locks[shard]:
+            self._conns[shard].send((op, args))
+            ok, result = self._conns[shard].recv()
+        if not ok:
+            raise RuntimeError(f"trust shard {shard}: {result}")
+        return result
+
+    def _scatter(
+        self,
+        calls: Dict[int, Tuple[str, tuple]],
+    ) -> Dict[int, object]:
+        """Send every call before waiting on any, so shards work in parallel."""
+        shards = sorted(calls)
+        for s in shards:
+            self._locks[s].acquire()
+        try:
+            for s in shards:
+                op, args = calls[s]
+                self._conns[s].send((op, args))
+            replies = {s: self._conns[s].recv() for s in shards}
+        finally:
+            for s in shards:
+                self._locks[s].release()
+        for s, (ok, result) in replies.items():
+            if not ok:
+                raise RuntimeError(f"trust shard {s}: {result}")
+        return {s: result for s, (_, result) in replies.items()}
+
+    def _broadcast(
+        self,
+        op: str,
+        *args,
+    ) -> List[object]:
+        results = self._scatter({s: (op, args) for s in range(self.n_shards)})
+        return [results[s] for s in range(self.n_shards)]
+
+    # --- engine interface --- #
+    def __len__(self) -> int:
+        return sum(self._broadcast("len"))
+
+    def update_trust(self, identity_id: str, agreement: float, biometric: float, witness: float) -> Tuple[float, float]:
+        return self._call(self.ring.shard(identity_id), "update_trust", identity_id, agreement, biometric, witness)
+
+    def update_many(
+        self,
+        identity_ids: Sequence[str],
+        agreement: Sequence[float],
+        biometric: Sequence[float],
+        witness: Sequence[float],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        a = np.asarray(agreement, dtype=np.float64)
+        b = np.asarray(biometric, dtype=np.float64)
+        w = np.asarray(witness, dtype=np.float64)
+        parts = self.ring.partition(identity_ids)
+        results = self._scatter({
+            s: ("update_many", ([identity_ids[k] for k in pos.tolist()], a[pos], b[pos], w[pos]))
+            for s, pos in parts.items()
+        })
+        scores = np.empty(a.size, dtype=np.float64)
+        entropy = np.empty(a.size, dtype=np.float64)
+        for s, pos in parts.items():
+            scores[pos], entropy[pos] = results[s]
+        return scores, entropy
+
+    def get_trust(self, identity_id: str, now: Optional[float] = None) -> float:
+        return self._call(self.ring.shard(identity_id), "get_trust", identity_id, now)
+
+    def get_entropy(self, identity_id: str) -> float:
+        return self._call(self.ring.shard(identity_id), "get_entropy", identity_id)
+
+    def last_updated(self, identity_id: str) -> Optional[float]:
+        return self._call(self.ring.shard(identity_id), "last_updated", identity_id)
+
+    def top(self, k: Optional[int] = None, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        now = time.time() if now is None else now
+        merged = heapq.merge(*self._broadcast("top", k, now), key=lambda kv: kv[1], reverse=True)
+        return list(merged) if k is None else list(merged)[:max(int(k), 0)]
+
+    def bottom(self, k: int, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        now = time.time() if now is None else now
+        merged = heapq.merge(*self._broadcast("bottom", k, now), key=lambda kv: kv[1])
+        return list(merged)[:max(int(k), 0)]
+
+    def count_below(self, threshold: float, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return sum(self._broadcast("count_below", threshold, now))
+
+    def rank_of(self, identity_id: str) -> Optional[int]:
+        owner = self.ring.shard(identity_id)
+        local = self._call(owner, "rank_of", identity_id)
+        if local is None:
+            return None
+        now = time.time()
+        score = self._call(owner, "get_trust", identity_id, now)
+        others = self._scatter({s: ("count_above", (score, now)) for s in range(self.n_shards) if s != owner})
+        return local + sum(others.values())
+
+    def checkpoint(self):
+        self._broadcast("checkpoint")
+
+    def close(self):
+        """Stop every shard (each takes a final checkpoint when it has a state dir)."""
+        if not self._procs:
+            return
+        try:
+            self._broadcast("stop")
+        finally:
+            for proc in self._procs:
+                proc.join(timeout=10.0)
+            for conn in self._conns:
+                conn.close()
+            self._procs = []
+            self._conns = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
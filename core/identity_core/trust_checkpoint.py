@@ -0,0 +1,221 @@
+"""
+Checkpointing for DynamicTrustEngine: periodic binary snapshots plus an
+append-only update log, so a restart restores state from disk instead of walking
+the chain identity by identity.
+
+Directory layout:
+
+    engine.snap           latest snapshot (DynamicTrustEngine.dump, atomic rename)
+    updates-<gen>.log     updates journaled since generation <gen> started
+
+A checkpoint first rotates the log to a new generation, then snapshots, recording
+that generation in the snapshot header, then deletes older logs. Every update in
+an older log was applied before the snapshot was taken; updates in the current log
+may or may not be in it, but log records carry absolute values, so replaying them
+on top of the snapshot is idempotent.
+
+Log records are batches: "<III" (count, ids_bytes, crc32 of the body), then the
+score / entropy / updated float64 arrays and the NUL-joined ids. Replay stops at
+the first torn or corrupt record. Restore concatenates all covered logs and applies
+each identity's last record once.
+"""
+
+from __future__ import annotations
+import glob
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .dynamic_trust import DynamicTrustEngine
+
+RECORD_HEADER = struct.Struct("<III")
+SNAPSHOT_NAME = "engine.snap"
+LOG_PATTERN = re.compile(r"updates-(\d+)\.log$")
+
+
+class UpdateLog:
+    def __init__(
+        self,
+        path: str,
+        fsync: bool = False,
+    ):
+        self.path = path
+        self.fsync = fsync
+        self._fh = open(path, "ab")
+        self._lock = threading.Lock()
+
+    def append(
+        self,
+        identity_ids: Sequence[str],
+        scores: Sequence[float],
+        entropies: Sequence[float],
+        updated: Sequence[float],
+    ):
+        cols = np.array([scores, entropies, updated], dtype="<f8")
+        blob = "\x00".join(identity_ids).encode("utf-8")
+        body = cols.tobytes() + blob
+        record = RECORD_HEADER.pack(len(identity_ids), len(blob), zlib.crc32(body)) + body
+        with self._lock:
+            self._fh.write(record)
+            self._fh.flush()
+            if self.fsync:
+                os.fsync(self._fh.fileno())
+
+    def close(self):
+        with self._lock:
+            self._fh.close()
+
+    @staticmethod
+    def read(
+        path: str,
+    ) -> Tuple[List[str], List[np.ndarray]]:
+        """Every intact record in `path`: (ids, [3 x count arrays]) in log order."""
+        ids: List[str] = []
+        cols: List[np.ndarray] = []
+        with open(path, "rb") as fh:
+            data = fh.read()
+        pos = 0
+        while pos + RECORD_HEADER.size <= len(data):
+            count, ids_bytes, crc = RECORD_HEADER.unpack_from(data, pos)
+            start = pos + RECORD_HEADER.size
+            end = start + 24 * count + ids_bytes
+            body = data[start:end]
+            if end > len(data) or zlib.crc32(body) != crc:
+                print(f"UpdateLog: stopping replay of {path} at torn record (offset {pos})")
+                break
+            if count:
+                cols.append(np.frombuffer(body, dtype="<f8", count=3 * count).reshape(3, count))
+                ids.extend(body[24 * count:].decode("utf-8").split("\x00"))
+            pos = end
+        return ids, cols
+
+
+def _log_generations(directory: str):
+    gens = []
+    for path in glob.glob(os.path.join(directory, "updates-*.log")):
+        m = LOG_PATTERN.search(path)
+        if m:
+            gens.append(int(m.group(1)))
+    return sorted(gens)
+
+
+class TrustCheckpointer:
+    def __init__(
+        self,
+        engine: DynamicTrustEngine,
+        directory: str,
+        interval: float = 60.0,
+        fsync: bool = False,
+    ):
+        self.engine = engine
+        self.directory = directory
+        self.interval = interval
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        gens = _log_generations(directory)
+        self._gen = (gens[-1] + 1) if gens else 0
+        self._log: Optional[UpdateLog] = None
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._open_log()
+        engine.journal = self
+
+    @classmethod
+    def restore(
+        cls,
+        directory: str,
+        decay: float = 0.9,
+        mmap: bool = False,
+        half_life: Optional[float] = None,
+    ) -> DynamicTrustEngine:
+        """Snapshot (if any) plus every log generation it doesn't already cover."""
+        t0 = time.time()
+        snap = os.path.join(directory, SNAPSHOT_NAME)
+        if os.path.exists(snap):
+            engine = DynamicTrustEngine.load(snap, mmap=mmap)
+            first_gen = engine.snapshot_meta.get("log_gen", 0)
+            if engine.half_life != half_life:
+                engine.set_half_life(half_life)
+        else:
+            engine = DynamicTrustEngine(decay=decay, half_life=half_life)
+            first_gen = 0
+        ids: List[str] = []
+        cols: List[np.ndarray] = []
+        for gen in _log_generations(directory) if os.path.isdir(directory) else []:
+            if gen >= first_gen:
+                gen_ids, gen_cols = UpdateLog.read(os.path.join(directory, f"updates-{gen}.log"))
+                ids.extend(gen_ids)
+                cols.extend(gen_cols)
+        replayed = len(ids)
+        if ids:
+            # records hold absolute values, so only each identity's last one matters
+            last = dict(zip(ids, range(len(ids))))
+            pick = np.fromiter(last.values(), dtype=np.int64, count=len(last))
+            state = np.concatenate(cols, axis=1)[:, pick]
+            engine.apply_state(list(last), state[0], state[1], state[2])
+        print(f"TrustCheckpointer: restored {len(engine)} identities ({replayed} logged updates) in {time.time() - t0:.2f}s")
+        return engine
+
+    def _open_log(self):
+        self._log = UpdateLog(os.path.join(self.directory, f"updates-{self._gen}.log"), fsync=self.fsync)
+
+    def append(
+        self,
+        identity_ids: Sequence[str],
+        scores: Sequence[float],
+        entropies: Sequence[float],
+        updated: Sequence[float],
+    ):
+        """Engine journal hook; a record lands wholly in the old or the new generation."""
+        with self._log_lock:
+            self._log.append(identity_ids, scores, entropies, updated)
+
+    def checkpoint(self) -> str:
+        """Rotate the log, snapshot the engine, drop logs the snapshot covers."""
+        with self._lock:
+            with self._log_lock:
+                old_log = self._log
+                self._gen += 1
+                self._open_log()
+            old_log.close()
+            snap = os.path.join(self.directory, SNAPSHOT_NAME)
+            self.engine.dump(snap, meta={"log_gen": self._gen, "taken_at": time.time()})
+            for gen in _log_generations(self.directory):
+                if gen < self._gen:
+                    os.remove(os.path.join(self.directory, f"updates-{gen}.log"))
+        return snap
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.checkpoint()
+            except Exception as exc:
+                print(f"TrustCheckpointer: checkpoint failed: {exc}")
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="trust-checkpointer", daemon=True)
+        self._thread.start()
+
+    def stop(
+        self,
+        checkpoint: bool = True,
+    ):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        if checkpoint:
+            self.checkpoint()
+        self.engine.journal = None
+        self._log.close()
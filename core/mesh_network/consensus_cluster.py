@@ -11,13 +11,18 @@ This cluster is doing the following tasks as of now:
 
 from __future__ import annotations
 import json 
+import threading
 import time 
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from dataclasses import dataclass , asdict
-from typing import Dict, Iterable, List, Optional, Tuple
-from .quantum_oracle import QuantumOracle
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from .quantum_oracle import EntanglementOffer, QuantumOracle
 from .witness_valid import WitnessReport, WitnessValidator , CryptoHelpers
+from .tracing import tracer
+from .keystore import KeyPool, NodeKeyMap, NodeKeyStore
+from .hierarchical_agg import SubCoordinator, chunk, combine_partials
 from ..quantum_engine import EntangledShardsSystem, TemporalLockManager,BiometricEncoder, fidelity
-import secrets 
 
 @dataclass 
 class ClusterDecision:
@@ -25,6 +30,16 @@ class ClusterDecision:
     metrics: Dict
     raw_reports: List[Dict]
 
+@dataclass
+class PreparedRound:
+    """
+    Output of the offer/simulate stage, handed to the sign and validate stages.
+    """
+    offer: EntanglementOffer
+    shard_indxs: Tuple[int, ...]
+    locked_nodes: Set[int]
+    sample_list: List[str]
+
 class ConsensusCluster:
     """
     Orchestrates consensus rounds among shard nodes. Uses QuantumOracle for offers
@@ -34,7 +49,12 @@ class ConsensusCluster:
       self,
       n_shards : int,
       signing_method : str = 'ecdsa',
-      expected_tolerance:Optional[float]=0.9   
+      expected_tolerance:Optional[float]=0.9,
+      keystore : Optional[NodeKeyStore] = None,
+      key_pool : Optional[KeyPool] = None,
+      aggregation : str = 'flat',
+      fan_out : int = 32,
+      agg_workers : int = 4,
     ):
       self.n_shards = n_shards 
       self.oracle = QuantumOracle()
@@ -43,26 +63,34 @@ class ConsensusCluster:
          expected_tolerance=expected_tolerance
       )
       self.signing_method = signing_method.lower()
-      self.node_keys = {}
+      self.keystore = keystore
+      self.key_pool = key_pool
+      if aggregation not in ('flat', 'tree'):
+        raise ValueError("aggregation must be 'flat' or 'tree'")
+      self.aggregation = aggregation
+      self.fan_out = fan_out
+      self.sub_coordinators: Dict[str, SubCoordinator] = {}
+      # tree mode: sub-coordinators validate their groups concurrently
+      self.agg_workers = agg_workers
+      self._agg_pool: Optional[ThreadPoolExecutor] = None
+      self._agg_lock = threading.Lock()
       self.init_node_keys()
       self.lock_mgr: Optional[TemporalLockManager] = None
       self.encoder: Optional[BiometricEncoder] = None
-      self.validator = WitnessValidator(num_shards=n_shards, expected_tolerance=expected_tolerance)
     
     def init_node_keys(
       self
     ):
-      for i in range(self.n_shards):
-        node_id = f'node-{i}'
-        if self.signing_method == 'ecdsa' :
-          priv, pub = CryptoHelpers.gen_ecdsa_keypair()
-          self.node_keys[node_id] = {"priv": priv, "pub": pub}
-
-        elif self.signing_method == "hmac":
-          secret = secrets.token_bytes(32)
-          self.node_keys[node_id] = {"secret": secret}
-        else:
-          raise ValueError("Unsupported signing method: ecdsa or hmac")
+      """
+      Keys are resolved lazily on first use: loaded from the keystore if present,
+      otherwise taken from the pre-generation pool (or generated) and persisted.
+      """
+      self.node_keys = NodeKeyMap(
+        self.signing_method,
+        self.n_shards,
+        keystore=self.keystore,
+        pool=self.key_pool,
+      )
 
     def attatch_lock_manager(
       self,
@@ -102,11 +130,35 @@ class ConsensusCluster:
         simulate_nodes: bool = True,
         repetitions: int = 1024,
     ):
+        with tracer.span("round"):
+            prepared = self.prepare_round(
+                shard_indxs,
+                kind=kind,
+                ttl_seconds=ttl_seconds,
+                run_quick_verify=run_quick_verify,
+                simulate_nodes=simulate_nodes,
+                repetitions=repetitions,
+            )
+            reports = self.sign_round(prepared)
+            return self.finalize_round(prepared, reports)
+
+    def prepare_round(
+        self,
+        shard_indxs: Iterable[int],
+        kind: str = "ghz",
+        ttl_seconds: int = 30,
+        run_quick_verify: bool = False,
+        simulate_nodes: bool = True,
+        repetitions: int = 1024,
+    ) -> PreparedRound:
+        """
+        Stage 1 of a round: request the entanglement offer and simulate node measurements.
+        """
         shard_indxs = tuple(int(i) for i in shard_indxs)
-        offer = self.oracle.create_offer(shard_indxs, kind=kind, ttl_seconds=ttl_seconds, run_quick_verify=run_quick_verify, persist=True)
+        offer = self.oracle.create_offer(shard_indxs, kind=kind, ttl_sec=ttl_seconds, run_quick_verify=run_quick_verify, persist=True)
 
         # determine which nodes are locked at time of measurement
-        now = time.time()
+        now = datetime.now()
         locked_nodes = set()
         if self.lock_mgr is not None:
             for i in shard_indxs:
@@ -114,23 +166,36 @@ class ConsensusCluster:
                     locked_nodes.add(i)
 
         # Optionally use entanglement engine to obtain sample histogram
-        reports: List[Dict] = []
         sample_list: List[str] = []
         if simulate_nodes and EntangledShardsSystem is not None:
-            engine = EntangledShardsSystem(
-                num_shards=len(shard_indxs),
-                basis="Z",
-                repetitions=repetitions,
-                tamper=(),
-                depolarizing_prob=0.0,
-            )
-            result = engine.run()
+            with tracer.span("round.simulate", shards=len(shard_indxs)):
+                engine = EntangledShardsSystem(
+                    num_shards=len(shard_indxs),
+                    basis="Z",
+                    repetitions=repetitions,
+                    tamper=(),
+                    depolarizing_prob=0.0,
+                )
+                result = engine.run()
             hist = result.get("bitstring_histogram", {})
             for bitstr, count in hist.items():
                 sample_list.extend([bitstr] * min(count, 500))
             if not sample_list:
                 sample_list = ["0" * len(shard_indxs)] * 128
 
+        return PreparedRound(offer=offer, shard_indxs=shard_indxs, locked_nodes=locked_nodes, sample_list=sample_list)
+
+    def sign_round(
+        self,
+        prepared: PreparedRound,
+    ) -> List[Dict]:
+        """
+        Stage 2 of a round: build and sign one witness report per node.
+        """
+        shard_indxs = prepared.shard_indxs
+        sample_list = prepared.sample_list
+        reports: List[Dict] = []
+
         # create a report per node
         for i_idx, shard in enumerate(shard_indxs):
             node_id = f"node-{shard}"
@@ -142,18 +207,19 @@ class ConsensusCluster:
             if self.encoder is not None:
                 # simple: encode two nearby vectors and compute fidelity
                 # in real system you'd pass actual embeddings
-                live = [0.2 + 0.001 * shard] * min(2 ** self.encoder.num_qubits, 4)
-                ref = [0.2] * min(2 ** self.encoder.num_qubits, 4)
+                live = [0.2 + 0.001 * shard] * min(2 ** self.encoder.nqubits, 4)
+                ref = [0.2] * min(2 ** self.encoder.nqubits, 4)
                 try:
-                    s_live, _ = self.encoder.encode(live)
-                    s_ref, _ = self.encoder.encode(ref)
-                    biometric_fidelity = fidelity(s_live, s_ref)
+                    with tracer.span("round.biometric_encode"):
+                        s_live, _ = self.encoder.encode(live)
+                        s_ref, _ = self.encoder.encode(ref)
+                        biometric_fidelity = fidelity(s_live, s_ref)
                 except Exception as exc:
                     print("Biometric encode failed for %s: %s", node_id, exc)
                     biometric_fidelity = None
 
             # lock-awareness: if node is locked, we simulate it not participating (no tamper)
-            metadata = {"locked": (shard in locked_nodes)}
+            metadata = {"locked": (shard in prepared.locked_nodes)}
 
             report_dict = {
                 "node_id": node_id,
@@ -163,8 +229,21 @@ class ConsensusCluster:
                 "metadata": metadata,
             }
 
-            sig, pub_or_secret = self._node_sign(node_id, report_dict)
+            with tracer.span("round.sign"):
+                sig, pub_or_secret = self.node_sign(node_id, report_dict)
             reports.append({"report": report_dict, "signature": sig, "signer_pub": pub_or_secret})
+        return reports
+
+    def finalize_round(
+        self,
+        prepared: PreparedRound,
+        reports: List[Dict],
+    ) -> ClusterDecision:
+        """
+        Stage 3 of a round: validate the signed reports and aggregate a decision.
+        """
+        if self.aggregation == 'tree':
+            return self._finalize_round_tree(prepared, reports)
 
         # Validate all reports (verify signature first)
         validation_results = []
@@ -178,8 +257,71 @@ class ConsensusCluster:
             validation_results.append(vr)
             raw_reports.append(asdict(vr))
 
-        agg = self.validator.aggregate(validation_results)
+        with tracer.span("round.aggregate"):
+            agg = self.validator.agg(validation_results)
         achieved = agg["avg_agreement"] >= self.validator.expected_tolerance and agg["num_valid"] >= (len(validation_results) / 2.0)
 
+        offer = prepared.offer
         metrics = {"offer_id": offer.offer_id, "offer_meta": asdict(offer), "aggregate": agg}
         return ClusterDecision(achieved=bool(achieved), metrics=metrics, raw_reports=raw_reports)
+
+    def _sub_coordinator(
+        self,
+        idx: int,
+    ) -> SubCoordinator:
+        coordinator_id = f"sub-{idx}"
+        with self._agg_lock:
+            sub = self.sub_coordinators.get(coordinator_id)
+            if sub is None:
+                sub = SubCoordinator(
+                    coordinator_id,
+                    num_shards=self.validator.num_shards,
+                    expected_tolerance=self.validator.expected_tolerance,
+                    signing_method=self.signing_method,
+                )
+                self.sub_coordinators[coordinator_id] = sub
+            return sub
+
+    def _finalize_round_tree(
+        self,
+        prepared: PreparedRound,
+        reports: List[Dict],
+    ) -> ClusterDecision:
+        """
+        Tree mode: each sub-coordinator validates one group of reports and sends up a
+        signed partial; the root only verifies and combines fan_out partials.
+        Sub-coordinators run concurrently on the aggregation pool; their per-report
+        validation results are concatenated in report order into raw_reports.
+        """
+        groups = chunk(reports, self.fan_out)
+        subs = [self._sub_coordinator(idx) for idx in range(len(groups))]
+        with self._agg_lock:
+            if self._agg_pool is None:
+                self._agg_pool = ThreadPoolExecutor(max_workers=self.agg_workers, thread_name_prefix="sub-coordinator")
+        futures = [
+            self._agg_pool.submit(sub.validate_reports, group, self.signing_method)
+            for sub, group in zip(subs, groups)
+        ]
+        partials = []
+        raw_reports = []
+        for fut in futures:
+            partial, results = fut.result()
+            partials.append(partial)
+            raw_reports.extend(asdict(vr) for vr in results)
+
+        keys = {sub.coordinator_id: sub.verify_key for sub in subs}
+        agg = combine_partials(partials, self.signing_method, keys)
+        achieved = agg["avg_agreement"] >= self.validator.expected_tolerance and agg["num_valid"] >= (agg["num_reports"] / 2.0)
+
+        offer = prepared.offer
+        metrics = {"offer_id": offer.offer_id, "offer_meta": asdict(offer), "aggregate": agg, "partials": len(partials)}
+        return ClusterDecision(achieved=bool(achieved), metrics=metrics, raw_reports=raw_reports)
+
+    def shutdown(
+        self,
+        wait: bool = True,
+    ):
+        """Stop the aggregation pool and the oracle's background workers."""
+        if self._agg_pool is not None:
+            self._agg_pool.shutdown(wait=wait)
+        self.oracle.shutdown(wait=wait)
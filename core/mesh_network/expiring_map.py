@@ -0,0 +1,211 @@
+"""
+Expiring map
+
+A dict whose entries carry an absolute expiry time. Expirations are indexed in a
+min-heap, so sweeping out everything that has expired costs O(log n) per evicted
+entry instead of a scan over all keys. Overwritten or removed keys leave stale heap
+entries behind; they are skipped when popped and the heap is rebuilt once stale
+entries outnumber live ones, keeping the amortized cost O(log n).
+
+With `remember_expired` set, keys evicted by expiry are remembered for that many
+seconds past their deadline, so `expired(key)` can tell an expired key from one that
+was never set (the Oracle API answers 410 vs 404 on that). Keys removed by `pop`
+are not remembered.
+
+Used for oracle offers and nonces (core QuantumOracle and the Oracle API), which
+previously were only evicted when somebody happened to read them.
+"""
+
+from __future__ import annotations
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class ExpiringMap:
+    """
+    Thread-safe key -> value map with per-entry expiry and an optional sweeper thread.
+    `gauge` (e.g. a prometheus Gauge) is incremented/decremented as keys come and go.
+    `remember_expired` keeps expired keys around (without values) for `expired()`.
+    """
+
+    def __init__(
+        self,
+        gauge=None,
+        clock=time.time,
+        remember_expired: Optional[float] = None,
+    ):
+        self._data: Dict[Any, Tuple[Any, float]] = {}
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._gauge = gauge
+        self._clock = clock
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._remember = remember_expired
+        self._expired: Optional[ExpiringMap] = (
+            ExpiringMap(clock=clock) if remember_expired else None
+        )
+
+    def _gauge_add(
+        self,
+        delta: int,
+    ):
+        if self._gauge is not None and delta:
+            self._gauge.inc(delta)
+
+    def set(
+        self,
+        key,
+        value,
+        ttl: Optional[float] = None,
+        expires_at: Optional[float] = None,
+    ):
+        if expires_at is None:
+            if ttl is None:
+                raise ValueError("ttl or expires_at is required")
+            expires_at = self._clock() + ttl
+        with self._lock:
+            is_new = key not in self._data
+            self._data[key] = (value, expires_at)
+            heapq.heappush(self._heap, (expires_at, next(self._seq), key))
+            if len(self._heap) > 2 * len(self._data) + 64:
+                self._rebuild()
+        if is_new:
+            self._gauge_add(1)
+        if self._expired is not None:
+            self._expired.pop(key)
+
+    def _rebuild(self):
+        self._heap = [(exp, next(self._seq), k) for k, (_, exp) in self._data.items()]
+        heapq.heapify(self._heap)
+
+    def _live(
+        self,
+        key,
+        now: float,
+    ):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if now > entry[1]:
+            del self._data[key]
+            self._gauge_add(-1)
+            self._note_expired(key, entry[1])
+            return None
+        return entry
+
+    def _note_expired(
+        self,
+        key,
+        exp: float,
+    ):
+        """Record an expiry-evicted key in the expired set, if enabled."""
+        if self._expired is not None:
+            self._expired.set(key, True, expires_at=exp + self._remember)
+
+    def expired(
+        self,
+        key,
+    ) -> bool:
+        """True if `key` expired (and was not set again) within the last `remember_expired` seconds."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                return self._clock() > entry[1]
+        return self._expired is not None and key in self._expired
+
+    def get(
+        self,
+        key,
+        default=None,
+    ):
+        with self._lock:
+            entry = self._live(key, self._clock())
+        return default if entry is None else entry[0]
+
+    def expires_at(
+        self,
+        key,
+    ) -> Optional[float]:
+        with self._lock:
+            entry = self._live(key, self._clock())
+        return None if entry is None else entry[1]
+
+    def pop(
+        self,
+        key,
+        default=None,
+    ):
+        """Remove and return a live entry (atomic consume-once); expired entries return `default`."""
+        with self._lock:
+            entry = self._live(key, self._clock())
+            if entry is None:
+                return default
+            del self._data[key]
+        self._gauge_add(-1)
+        return entry[0]
+
+    def __contains__(
+        self,
+        key,
+    ) -> bool:
+        with self._lock:
+            return self._live(key, self._clock()) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def values(self) -> Iterator:
+        """Live values only; expired entries the sweeper has not reached yet are skipped."""
+        with self._lock:
+            now = self._clock()
+            items = [v for v, exp in self._data.values() if now <= exp]
+        return iter(items)
+
+    def sweep(
+        self,
+        now: Optional[float] = None,
+    ) -> int:
+        """Evict everything expired at `now`; returns the number of evicted entries."""
+        now = self._clock() if now is None else now
+        removed = 0
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] < now:
+                exp, _, key = heapq.heappop(heap)
+                entry = self._data.get(key)
+                # stale heap entry: key was removed or re-set with a later expiry
+                if entry is None or entry[1] != exp:
+                    continue
+                del self._data[key]
+                self._note_expired(key, exp)
+                removed += 1
+        self._gauge_add(-removed)
+        if self._expired is not None:
+            self._expired.sweep(now)
+        return removed
+
+    def start_sweeper(
+        self,
+        interval: float = 1.0,
+    ):
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.wait(interval):
+                self.sweep()
+
+        self._sweeper = threading.Thread(target=_run, name="expiring-map-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=2.0)
+            self._sweeper = None
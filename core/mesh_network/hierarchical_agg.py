@@ -0,0 +1,191 @@
+"""
+Hierarchical aggregation of witness reports
+
+Instead of one coordinator verifying every report of a round, reports are split
+across sub-coordinators (fan-out). Each sub-coordinator validates its subset and
+sends up a compact signed PartialAggregate: report count, valid count, and the
+agreement / trust sums. Intermediate tiers can merge partials the same way, and
+the root combines its children in O(fan-out) into the same shape returned by
+WitnessValidator.agg.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from .keystore import generate_key
+from .tracing import tracer
+from .witness_valid import CryptoHelpers, ValidationResult, WitnessValidator, json_bytes
+
+
+@dataclass
+class PartialAggregate:
+    coordinator_id: str
+    num_reports: int
+    num_valid: int
+    agreement_sum: float
+    trust_sum: float
+    signature: bytes = b""
+
+    def payload(self) -> bytes:
+        """Canonical bytes covered by the coordinator's signature."""
+        return json_bytes({
+            "coordinator_id": self.coordinator_id,
+            "num_reports": self.num_reports,
+            "num_valid": self.num_valid,
+            "agreement_sum": self.agreement_sum,
+            "trust_sum": self.trust_sum,
+        })
+
+
+def verify_partial(
+    partial: PartialAggregate,
+    method: str,
+    pub_or_secret: bytes,
+) -> bool:
+    msg = partial.payload()
+    if method == "ecdsa":
+        return CryptoHelpers.verify_ecdsa(pub_or_secret, partial.signature, msg)
+    if method == "hmac":
+        return CryptoHelpers.verify_hmac(pub_or_secret, partial.signature, msg)
+    raise ValueError("Unsupported method: choose 'ecdsa' or 'hmac'")
+
+
+def merge_partials(
+    coordinator_id: str,
+    partials: Iterable[PartialAggregate],
+) -> PartialAggregate:
+    """Sum partials into one unsigned partial."""
+    merged = PartialAggregate(coordinator_id, 0, 0, 0.0, 0.0)
+    for p in partials:
+        merged.num_reports += p.num_reports
+        merged.num_valid += p.num_valid
+        merged.agreement_sum += p.agreement_sum
+        merged.trust_sum += p.trust_sum
+    return merged
+
+
+def _verified(
+    partials: Sequence[PartialAggregate],
+    method: str,
+    coordinator_keys: Mapping[str, bytes],
+) -> List[PartialAggregate]:
+    accepted = []
+    for p in partials:
+        key = coordinator_keys.get(p.coordinator_id)
+        if key is None or not verify_partial(p, method, key):
+            print(f"Rejected partial aggregate from {p.coordinator_id}")
+            continue
+        accepted.append(p)
+    return accepted
+
+
+def combine_partials(
+    partials: Sequence[PartialAggregate],
+    method: str,
+    coordinator_keys: Mapping[str, bytes],
+) -> Dict:
+    """
+    Root step: verify each child's signature and combine.
+    Returns: { "avg_agreement": x, "avg_trust": y, "num_valid": n, "num_reports": m }
+    """
+    with tracer.span("round.combine_partials", fan_out=len(partials)):
+        total = merge_partials("root", _verified(partials, method, coordinator_keys))
+    if total.num_reports == 0:
+        return {"avg_agreement": 0.0, "avg_trust": 0.0, "num_valid": 0, "num_reports": 0}
+    return {
+        "avg_agreement": float(total.agreement_sum / total.num_reports),
+        "avg_trust": float(total.trust_sum / total.num_reports),
+        "num_valid": int(total.num_valid),
+        "num_reports": int(total.num_reports),
+    }
+
+
+class SubCoordinator:
+    """
+    Validates a subset of signed witness reports and signs the partial aggregate.
+    """
+
+    def __init__(
+        self,
+        coordinator_id: str,
+        num_shards: int,
+        expected_tolerance: float = 0.9,
+        signing_method: str = "ecdsa",
+        key_info: Optional[Dict] = None,
+    ):
+        self.coordinator_id = coordinator_id
+        self.signing_method = signing_method.lower()
+        self.validator = WitnessValidator(num_shards=num_shards, expected_tolerance=expected_tolerance)
+        self.key_info = key_info or generate_key(self.signing_method)
+
+    @property
+    def verify_key(self) -> bytes:
+        """Public key (ecdsa) or shared secret (hmac) the parent verifies with."""
+        if self.signing_method == "ecdsa":
+            return self.key_info["pub"]
+        return self.key_info["secret"]
+
+    def _sign(
+        self,
+        partial: PartialAggregate,
+    ) -> PartialAggregate:
+        msg = partial.payload()
+        if self.signing_method == "ecdsa":
+            partial.signature = CryptoHelpers.sign_ecdsa(self.key_info["priv"], msg)
+        else:
+            partial.signature = CryptoHelpers.sign_hmac(self.key_info["secret"], msg)
+        return partial
+
+    def aggregate_reports(
+        self,
+        signed_reports: Sequence[Dict],
+        method: str,
+    ) -> PartialAggregate:
+        """
+        Leaf tier: `signed_reports` use the {"report", "signature", "signer_pub"}
+        shape produced by ConsensusCluster.sign_round.
+        """
+        return self.validate_reports(signed_reports, method)[0]
+
+    def validate_reports(
+        self,
+        signed_reports: Sequence[Dict],
+        method: str,
+    ) -> Tuple[PartialAggregate, List[ValidationResult]]:
+        """Like aggregate_reports, also returning the per-report validation results."""
+        partial = PartialAggregate(self.coordinator_id, 0, 0, 0.0, 0.0)
+        results = []
+        for r in signed_reports:
+            vr = self.validator.validate_signed_report(r["report"], r["signature"], method, r["signer_pub"])
+            results.append(vr)
+            partial.num_reports += 1
+            partial.num_valid += int(vr.valid)
+            partial.agreement_sum += vr.agreement_rate
+            partial.trust_sum += vr.trust_score
+        return self._sign(partial), results
+
+    def aggregate_partials(
+        self,
+        partials: Sequence[PartialAggregate],
+        method: str,
+        coordinator_keys: Mapping[str, bytes],
+    ) -> PartialAggregate:
+        """Intermediate tier: verify children's partials, merge and re-sign."""
+        merged = merge_partials(self.coordinator_id, _verified(partials, method, coordinator_keys))
+        return self._sign(merged)
+
+
+def chunk(
+    items: Sequence,
+    fan_out: int,
+) -> List[Sequence]:
+    """Split `items` into at most `fan_out` contiguous, near-equal groups."""
+    fan_out = max(1, min(int(fan_out), len(items)))
+    size, extra = divmod(len(items), fan_out)
+    groups, start = [], 0
+    for i in range(fan_out):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(items[start:end])
+        start = end
+    return groups
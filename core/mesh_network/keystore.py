@@ -0,0 +1,330 @@
+"""
+Node keystore
+
+Keeps node signing keys (ECDSA private keys or HMAC secrets) across restarts so
+ConsensusCluster does not regenerate every key at construction time.
+
+- NodeKeyStore : SQLite file holding one row per (node_id, method). Key material is
+                 encrypted with AES-GCM under a scrypt-derived key when a passphrase
+                 is supplied (env NODE_KEYSTORE_PASSPHRASE by default). Without one
+                 keys are stored in plaintext and a warning is printed. The passphrase
+                 is checked against a sealed marker when the store is opened, so a
+                 wrong passphrase (or a passphrase on a plaintext store, or none on an
+                 encrypted one) fails there with ValueError instead of on first sign.
+- KeyPool      : optional background thread that pre-generates fresh keys so nodes
+                 seen for the first time don't pay key generation inline.
+- NodeKeyMap   : the mapping ConsensusCluster uses as `node_keys`; a key is only
+                 loaded (or generated and persisted) the first time a node signs.
+"""
+
+from __future__ import annotations
+import hashlib
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+from collections.abc import Mapping
+from typing import Dict, Iterator, Optional
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.serialization import Encoding, NoEncryption, PrivateFormat
+
+from .witness_valid import CryptoHelpers
+
+SIGNING_METHODS = ("ecdsa", "hmac")
+PASSPHRASE_CHECK = b"node-keystore-v1"
+
+
+def generate_key(
+    method: str,
+) -> Dict:
+    """Create fresh key material in the shape ConsensusCluster.node_sign expects."""
+    if method == "ecdsa":
+        priv, pub = CryptoHelpers.gen_ecdsa_keypair()
+        return {"priv": priv, "pub": pub}
+    if method == "hmac":
+        return {"secret": secrets.token_bytes(32)}
+    raise ValueError("Unsupported signing method: ecdsa or hmac")
+
+
+class NodeKeyStore:
+    """
+    SQLite-backed, optionally encrypted store of node keys.
+    """
+
+    def __init__(
+        self,
+        path: str = "node_keys.db",
+        passphrase: Optional[str] = None,
+    ):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS node_keys ("
+            " node_id TEXT NOT NULL, method TEXT NOT NULL, priv BLOB NOT NULL, pub BLOB,"
+            " PRIMARY KEY (node_id, method))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS keystore_meta (k TEXT PRIMARY KEY, v BLOB NOT NULL)")
+        self._conn.commit()
+
+        passphrase = passphrase if passphrase is not None else os.getenv("NODE_KEYSTORE_PASSPHRASE")
+        try:
+            self._aead = self._unlock(passphrase)
+        except Exception:
+            self._conn.close()
+            raise
+
+    def _meta(
+        self,
+        k: str,
+    ) -> Optional[bytes]:
+        row = self._conn.execute("SELECT v FROM keystore_meta WHERE k=?", (k,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _unlock(
+        self,
+        passphrase: Optional[str],
+    ) -> Optional[AESGCM]:
+        """Check `passphrase` against the store and return the cipher (None for plaintext)."""
+        # the salt is only written when a store is opened with a passphrase
+        encrypted = self._meta("salt") is not None
+        has_keys = self._conn.execute("SELECT 1 FROM node_keys LIMIT 1").fetchone() is not None
+        if not passphrase:
+            if encrypted:
+                raise ValueError(f"Keystore {self.path} is encrypted; set NODE_KEYSTORE_PASSPHRASE to open it")
+            print(f"[NodeKeyStore] WARNING: no passphrase set, node keys in {self.path} are stored in plaintext")
+            return None
+        if has_keys and not encrypted:
+            raise ValueError(f"Keystore {self.path} holds plaintext keys; open it without a passphrase")
+
+        aead = AESGCM(self._derive_key(passphrase))
+        check = self._meta("check")
+        try:
+            if check is not None:
+                aead.decrypt(check[:12], check[12:], b"check")
+            elif has_keys:
+                # store written before the marker existed: any row proves the passphrase
+                node_id, method, blob = self._conn.execute(
+                    "SELECT node_id, method, priv FROM node_keys LIMIT 1"
+                ).fetchone()
+                aead.decrypt(blob[:12], blob[12:], f"{node_id}|{method}".encode("utf-8"))
+        except InvalidTag:
+            raise ValueError(f"Wrong passphrase for keystore {self.path}") from None
+        if check is None:
+            nonce = secrets.token_bytes(12)
+            self._conn.execute(
+                "INSERT INTO keystore_meta (k, v) VALUES ('check', ?)",
+                (nonce + aead.encrypt(nonce, PASSPHRASE_CHECK, b"check"),),
+            )
+            self._conn.commit()
+        return aead
+
+    def _derive_key(
+        self,
+        passphrase: str,
+    ) -> bytes:
+        row = self._conn.execute("SELECT v FROM keystore_meta WHERE k='salt'").fetchone()
+        if row is None:
+            salt = secrets.token_bytes(16)
+            self._conn.execute("INSERT INTO keystore_meta (k, v) VALUES ('salt', ?)", (salt,))
+            self._conn.commit()
+        else:
+            salt = row[0]
+        return hashlib.scrypt(passphrase.encode("utf-8"), salt=salt, n=2 ** 14, r=8, p=1, dklen=32)
+
+    def _seal(
+        self,
+        data: bytes,
+        aad: bytes,
+    ) -> bytes:
+        if self._aead is None:
+            return data
+        nonce = secrets.token_bytes(12)
+        return nonce + self._aead.encrypt(nonce, data, aad)
+
+    def _open(
+        self,
+        blob: bytes,
+        aad: bytes,
+    ) -> bytes:
+        if self._aead is None:
+            return blob
+        return self._aead.decrypt(blob[:12], blob[12:], aad)
+
+    def load(
+        self,
+        node_id: str,
+        method: str,
+    ) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT priv, pub FROM node_keys WHERE node_id=? AND method=?", (node_id, method)
+            ).fetchone()
+        if row is None:
+            return None
+        secret = self._open(row[0], f"{node_id}|{method}".encode("utf-8"))
+        if method == "ecdsa":
+            priv = serialization.load_der_private_key(secret, password=None)
+            return {"priv": priv, "pub": row[1]}
+        return {"secret": secret}
+
+    def save(
+        self,
+        node_id: str,
+        method: str,
+        key_info: Dict,
+    ):
+        if method == "ecdsa":
+            secret = key_info["priv"].private_bytes(Encoding.DER, PrivateFormat.PKCS8, NoEncryption())
+            pub = key_info["pub"]
+        else:
+            secret = key_info["secret"]
+            pub = None
+        blob = self._seal(secret, f"{node_id}|{method}".encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO node_keys (node_id, method, priv, pub) VALUES (?, ?, ?, ?)",
+                (node_id, method, blob, pub),
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM node_keys").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class KeyPool:
+    """
+    Background pre-generation of fresh keys for nodes that have none yet.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        size: int = 64,
+        start: bool = True,
+    ):
+        if method not in SIGNING_METHODS:
+            raise ValueError("Unsupported signing method: ecdsa or hmac")
+        self.method = method
+        self._keys: "queue.Queue[Dict]" = queue.Queue(maxsize=size)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if start:
+            self.start()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._fill, name=f"keypool-{self.method}", daemon=True)
+        self._thread.start()
+
+    def _fill(self):
+        while not self._stop.is_set():
+            key = generate_key(self.method)
+            while not self._stop.is_set():
+                try:
+                    self._keys.put(key, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+    def take(self) -> Dict:
+        """Return a pre-generated key, or generate one inline if the pool is drained."""
+        try:
+            return self._keys.get_nowait()
+        except queue.Empty:
+            return generate_key(self.method)
+
+    def available(self) -> int:
+        return self._keys.qsize()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+
+class NodeKeyMap(Mapping):
+    """
+    Lazy `node_id -> key_info` mapping for node-0 .. node-(n-1).
+    """
+
+    def __init__(
+        self,
+        method: str,
+        n_nodes: int,
+        keystore: Optional[NodeKeyStore] = None,
+        pool: Optional[KeyPool] = None,
+    ):
+        if method not in SIGNING_METHODS:
+            raise ValueError("Unsupported signing method: ecdsa or hmac")
+        self.method = method
+        self.n_nodes = n_nodes
+        self.keystore = keystore
+        self.pool = pool
+        self._cache: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _valid_id(
+        self,
+        node_id: str,
+    ) -> bool:
+        prefix, _, idx = str(node_id).partition("node-")
+        return not prefix and idx.isdigit() and int(idx) < self.n_nodes
+
+    def __getitem__(
+        self,
+        node_id: str,
+    ) -> Dict:
+        key_info = self._cache.get(node_id)
+        if key_info is not None:
+            return key_info
+        if not self._valid_id(node_id):
+            raise KeyError(node_id)
+        with self._lock:
+            key_info = self._cache.get(node_id)
+            if key_info is not None:
+                return key_info
+            if self.keystore is not None:
+                key_info = self.keystore.load(node_id, self.method)
+            if key_info is None:
+                key_info = self.pool.take() if self.pool is not None else generate_key(self.method)
+                if self.keystore is not None:
+                    self.keystore.save(node_id, self.method, key_info)
+            self._cache[node_id] = key_info
+            return key_info
+
+    def __setitem__(
+        self,
+        node_id: str,
+        key_info: Dict,
+    ):
+        with self._lock:
+            self._cache[node_id] = key_info
+            if self.keystore is not None:
+                self.keystore.save(node_id, self.method, key_info)
+
+    def __contains__(
+        self,
+        node_id,
+    ) -> bool:
+        return self._valid_id(node_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return (f"node-{i}" for i in range(self.n_nodes))
+
+    def __len__(self) -> int:
+        return self.n_nodes
+
+    def loaded(self) -> int:
+        return len(self._cache)
@@ -0,0 +1,292 @@
+"""
+Append-only segmented offer ledger
+
+Offers are written once, as length-prefixed records (4-byte little-endian length +
+canonical JSON), into segment files that roll over at `max_segment_bytes`:
+
+    <dir>/00000000000000000000.log   records 0 .. k-1
+    <dir>/00000000000000000000.idx   sparse index: (record_no, byte_offset) every N records
+    <dir>/0000000000000000000k.log   ...
+
+Reading page N maps the segment holding its first record (mmap), seeks to the
+nearest sparse index entry and walks at most `index_interval` records forward, so
+deep pages cost the same as page 1. `read_range` returns the raw JSON bytes as
+written; `page` decodes them (one json.loads per record on the page, none for the
+records skipped to reach it). Closed segments older than a cut-off are dropped
+whole by `compact`.
+
+Single writer: one OfferLedger instance owns a directory. Opening it takes an
+exclusive lock on <dir>/LOCK (flock, so it holds across processes and across
+instances in one process) and raises RuntimeError if another ledger already has
+it. Several processes (e.g. `uvicorn --workers N`) need a directory each or a
+database instead.
+"""
+
+from __future__ import annotations
+import bisect
+import json
+try:
+    import fcntl
+except ImportError:  # non-POSIX: fall back to the in-process guard only
+    fcntl = None
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, List, Optional
+
+_LEN = struct.Struct("<I")
+_IDX = struct.Struct("<QQ")
+LOCK_NAME = "LOCK"
+
+# directories held by ledgers in this process (covers platforms without flock)
+_OPEN_DIRS = set()
+_OPEN_DIRS_LOCK = threading.Lock()
+
+
+def _encode(record: Dict) -> bytes:
+    return json.dumps(record, sort_keys=True, separators=(",", ":"), default=list).encode("utf-8")
+
+
+class _Segment:
+    def __init__(
+        self,
+        directory: str,
+        base: int,
+    ):
+        self.base = base
+        self.log_path = os.path.join(directory, f"{base:020d}.log")
+        self.idx_path = os.path.join(directory, f"{base:020d}.idx")
+        self.count = 0
+        self.size = 0
+        self.index: List[int] = []  # record numbers (relative) with a sparse entry
+        self.offsets: List[int] = []
+        self._map: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+
+    def view(self) -> Optional[mmap.mmap]:
+        # remap when the segment has grown since the last read
+        if self.size == 0:
+            return None
+        if self._map is None or self._mapped_size != self.size:
+            self.close_map()
+            with open(self.log_path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), self.size, access=mmap.ACCESS_READ)
+            self._mapped_size = self.size
+        return self._map
+
+    def close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class OfferLedger:
+    """
+    Durable, append-only ledger of offer records with O(1)-seek pagination.
+    Single writer: holds an exclusive lock on its directory until close().
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        index_interval: int = 64,
+        fsync: bool = False,
+    ):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.index_interval = index_interval
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._segments: List[_Segment] = []
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fh = self._acquire_dir(directory)
+        try:
+            self._load()
+            if not self._segments:
+                self._segments.append(_Segment(directory, 0))
+            self._active = open(self._segments[-1].log_path, "ab")
+            self._active_idx = open(self._segments[-1].idx_path, "ab")
+        except Exception:
+            self._release_dir()
+            raise
+
+    @staticmethod
+    def _acquire_dir(
+        directory: str,
+    ):
+        key = os.path.realpath(directory)
+        with _OPEN_DIRS_LOCK:
+            if key in _OPEN_DIRS:
+                raise RuntimeError(f"Offer ledger {directory} is already open in this process")
+            fh = open(os.path.join(directory, LOCK_NAME), "a+b")
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    fh.close()
+                    raise RuntimeError(
+                        f"Offer ledger {directory} is locked by another process; "
+                        "the ledger is single-writer"
+                    ) from None
+            _OPEN_DIRS.add(key)
+        return fh
+
+    def _release_dir(self):
+        with _OPEN_DIRS_LOCK:
+            _OPEN_DIRS.discard(os.path.realpath(self.directory))
+            # closing the file drops the flock
+            self._lock_fh.close()
+
+    # --- recovery --- #
+    def _load(self):
+        bases = sorted(int(name[:-4]) for name in os.listdir(self.directory) if name.endswith(".log"))
+        for base in bases:
+            seg = _Segment(self.directory, base)
+            self._recover(seg)
+            self._segments.append(seg)
+
+    def _recover(
+        self,
+        seg: _Segment,
+    ):
+        """Rebuild count/size/index for a segment, dropping a torn trailing record."""
+        size = os.path.getsize(seg.log_path)
+        if os.path.exists(seg.idx_path):
+            with open(seg.idx_path, "rb") as f:
+                raw = f.read()
+            for i in range(len(raw) // _IDX.size):
+                rec, off = _IDX.unpack_from(raw, i * _IDX.size)
+                if off >= size:
+                    break
+                seg.index.append(rec)
+                seg.offsets.append(off)
+        rec = seg.index[-1] if seg.index else 0
+        off = seg.offsets[-1] if seg.offsets else 0
+        with open(seg.log_path, "rb") as f:
+            f.seek(off)
+            while off + _LEN.size <= size:
+                (n,) = _LEN.unpack(f.read(_LEN.size))
+                if off + _LEN.size + n > size:
+                    break
+                f.seek(n, os.SEEK_CUR)
+                if rec % self.index_interval == 0 and (not seg.index or seg.index[-1] != rec):
+                    seg.index.append(rec)
+                    seg.offsets.append(off)
+                off += _LEN.size + n
+                rec += 1
+        if off != size:
+            with open(seg.log_path, "r+b") as f:
+                f.truncate(off)
+        seg.count = rec
+        seg.size = off
+        with open(seg.idx_path, "wb") as f:
+            f.write(b"".join(_IDX.pack(r, o) for r, o in zip(seg.index, seg.offsets)))
+
+    # --- writes --- #
+    def _roll(self):
+        last = self._segments[-1]
+        self._active.close()
+        self._active_idx.close()
+        seg = _Segment(self.directory, last.base + last.count)
+        self._segments.append(seg)
+        self._active = open(seg.log_path, "ab")
+        self._active_idx = open(seg.idx_path, "ab")
+
+    def append(
+        self,
+        record: Dict,
+    ) -> int:
+        """Append one record; returns its global record number."""
+        payload = _encode(record)
+        with self._lock:
+            seg = self._segments[-1]
+            if seg.size and seg.size + _LEN.size + len(payload) > self.max_segment_bytes:
+                self._roll()
+                seg = self._segments[-1]
+            if seg.count % self.index_interval == 0:
+                seg.index.append(seg.count)
+                seg.offsets.append(seg.size)
+                self._active_idx.write(_IDX.pack(seg.count, seg.size))
+                self._active_idx.flush()
+            self._active.write(_LEN.pack(len(payload)))
+            self._active.write(payload)
+            self._active.flush()
+            if self.fsync:
+                os.fsync(self._active.fileno())
+            seg.size += _LEN.size + len(payload)
+            seg.count += 1
+            return seg.base + seg.count - 1
+
+    # --- reads --- #
+    @property
+    def first(self) -> int:
+        return self._segments[0].base
+
+    def __len__(self) -> int:
+        last = self._segments[-1]
+        return last.base + last.count - self.first
+
+    def read_range(
+        self,
+        start: int,
+        limit: int,
+    ) -> List[bytes]:
+        """Raw JSON payloads of `limit` records starting at ledger position `start` (0 = oldest kept)."""
+        out: List[bytes] = []
+        with self._lock:
+            target = self.first + max(0, start)
+            bases = [s.base for s in self._segments]
+            si = bisect.bisect_right(bases, target) - 1
+            while si < len(self._segments) and len(out) < limit:
+                seg = self._segments[si]
+                rel = target - seg.base
+                buf = seg.view()
+                if buf is not None and rel < seg.count:
+                    ii = bisect.bisect_right(seg.index, rel) - 1
+                    rec, off = seg.index[ii], seg.offsets[ii]
+                    while rec < seg.count and len(out) < limit:
+                        (n,) = _LEN.unpack_from(buf, off)
+                        if rec >= rel:
+                            out.append(buf[off + _LEN.size: off + _LEN.size + n])
+                        off += _LEN.size + n
+                        rec += 1
+                si += 1
+                target = self._segments[si].base if si < len(self._segments) else target
+        return out
+
+    def page(
+        self,
+        page: int = 1,
+        page_size: int = 10,
+    ) -> List[Dict]:
+        page = max(1, int(page))
+        return [json.loads(raw) for raw in self.read_range((page - 1) * page_size, page_size)]
+
+    # --- retention --- #
+    def compact(
+        self,
+        max_age_sec: float,
+    ) -> int:
+        """Delete closed segments last written more than `max_age_sec` ago; returns records dropped."""
+        cutoff = time.time() - max_age_sec
+        dropped = 0
+        with self._lock:
+            while len(self._segments) > 1 and os.path.getmtime(self._segments[0].log_path) < cutoff:
+                seg = self._segments.pop(0)
+                seg.close_map()
+                os.remove(seg.log_path)
+                if os.path.exists(seg.idx_path):
+                    os.remove(seg.idx_path)
+                dropped += seg.count
+        return dropped
+
+    def close(self):
+        with self._lock:
+            for seg in self._segments:
+                seg.close_map()
+            self._active.close()
+            self._active_idx.close()
+        self._release_dir()
@@ -10,10 +10,23 @@ nonces - > A nonce is a random or pseudo-random, "number used once" in a cryptog
 communication or operation is unique and prevent replay attacks. 
 """
 from dataclasses import dataclass, asdict
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, Optional, Tuple
 import secrets
+import threading
 import time
-from ..quantum_engine.quantum_consensus import EntangledShardsSystem  
+from concurrent.futures import Future, ThreadPoolExecutor
+from ..quantum_engine.entanglement_sharding import EntangledShardsSystem
+from .tracing import tracer
+from .expiring_map import ExpiringMap
+from .offer_ledger import OfferLedger
+
+try:
+    from prometheus_client import Gauge
+    OFFERS_ACTIVE = Gauge("mesh_oracle_offers_active", "Live entanglement offers held by QuantumOracle")
+    NONCES_ACTIVE = Gauge("mesh_oracle_nonces_active", "Live challenge nonces held by QuantumOracle")
+except Exception:  # metrics are optional for the core package
+    OFFERS_ACTIVE = NONCES_ACTIVE = None
+
 @dataclass
 class EntanglementOffer : 
     """
@@ -28,17 +41,73 @@ class EntanglementOffer :
     verification_hint: Optional[Dict] = None  # optional small verification result
 
 
+def quick_verify(
+        num_shards : int,
+        repetitions : int = 128,
+) -> Dict:
+    """
+    Small density-matrix run used as an offer's verification hint.
+    """
+    try:
+        with tracer.span("oracle.quick_verify"):
+            engine = EntangledShardsSystem(
+                num_shards=num_shards,
+                basis="Z",
+                repetitions=repetitions,
+                tamper=(),
+                depolarizing_prob=0.0,
+            )
+            rep = engine.run()
+        return {
+            "agreement_rate": rep.get("agreement_rate"),
+            "sample_histogram": dict(list(rep.get("bitstring_histogram", {}).items())[:3]),
+        }
+    except Exception as exc:
+        print("Quick verify failed: %s", exc)
+        return {"error": str(exc)}
+
+
 class QuantumOracle:
     """
     Stores and issues entanglement offers and challenge nonces.
     """
 
     def __init__(
+            self,
+            sweep_interval : Optional[float] = None,
+            ledger_dir : Optional[str] = None,
+            verify_workers : int = 2,
+    ):
+        self.offers = ExpiringMap(gauge=OFFERS_ACTIVE)
+        self.nonces = ExpiringMap(gauge=NONCES_ACTIVE)
+        # in-memory by default; pass ledger_dir to keep offers on disk across restarts
+        self.ledger = OfferLedger(ledger_dir) if ledger_dir else []
+        # background quick-verify: one simulation per shard count in flight (quick_verify
+        # only depends on it), shared by every offer waiting on it; per-offer futures
+        # live as long as the offer
+        self.verify_workers = verify_workers
+        self._verify_pool: Optional[ThreadPoolExecutor] = None
+        self._verify_lock = threading.Lock()
+        self._verify_inflight: Dict[int, Future] = {}
+        self._verifications = ExpiringMap()
+        if sweep_interval is not None:
+            self.start_sweeper(sweep_interval)
+
+    def start_sweeper(
+            self,
+            interval : float = 1.0
+    ):
+        """Evict expired offers and nonces in the background instead of only on read."""
+        self.offers.start_sweeper(interval)
+        self.nonces.start_sweeper(interval)
+        self._verifications.start_sweeper(interval)
+
+    def stop_sweeper(
             self
     ):
-        self.offers = dict()
-        self.nonces = dict()
-        self.ledger: List[EntanglementOffer] = []  
+        self.offers.stop_sweeper()
+        self.nonces.stop_sweeper()
+        self._verifications.stop_sweeper()
     
     def create_offer(
             self,
@@ -47,6 +116,26 @@ class QuantumOracle:
             ttl_sec : int = 30,
             run_quick_verify : bool = False,
             persist: bool = True,
+            async_verify : bool = False,
+    ):
+        """
+        With run_quick_verify and async_verify the offer is returned straight away with
+        verification_hint={"status": "pending"}; the simulation runs on a worker pool and
+        replaces the hint on the stored offer when done (see await_verification). The
+        ledger record is then written once verification finishes, so it never holds the
+        pending hint.
+        """
+        with tracer.span("oracle.create_offer"):
+            return self._create_offer(shard_indxs, kind, ttl_sec, run_quick_verify, persist, async_verify)
+
+    def _create_offer(
+            self,
+            shard_indxs,
+            kind,
+            ttl_sec,
+            run_quick_verify,
+            persist,
+            async_verify=False,
     ):
         if len(shard_indxs) < 2:
             raise ValueError("At least 2 shard indices are required for entanglement.")
@@ -66,50 +155,36 @@ class QuantumOracle:
             verification_hint=int(ttl_sec)
         )
 
-        if run_quick_verify:
-
-            if EntangledShardsSystem is not None:
-                try:
-                    engine = EntangledShardsSystem(
-                        num_shards=len(shard_indxs),
-                        basis="Z",
-                        repetitions=128,
-                        tamper=(),
-                        depolarizing_prob=0.0,
-                    )
-                    rep = engine.run()
-                    offer.verification_hint = {
-                        "agreement_rate": rep.get("agreement_rate"),
-                        "sample_histogram": dict(list(rep.get("bitstring_histogram", {}).items())[:3]),
-                    }
-                except Exception as exc:
-                    print("Quick verify failed: %s", exc)
-                    offer.verification_hint = {"error": str(exc)}
+        pending = run_quick_verify and async_verify and EntangledShardsSystem is not None
+        if run_quick_verify and EntangledShardsSystem is not None and not async_verify:
+            offer.verification_hint = quick_verify(len(shard_indxs))
+        if pending:
+            offer.verification_hint = {"status": "pending"}
         # register in live offers
-        self._offers[offer_id] = offer
+        self.offers.set(offer_id, offer, expires_at=offer.created_at + ttl_sec)
 
-        # persist to ledger if requested
-        if persist:
-            self.ledger.append(offer)
-            print("Offer persisted to ledger: %s", offer_id)
+        if pending:
+            # persisted (if requested) by the verification callback, with the final hint
+            self._submit_verification(offer, persist)
+        elif persist:
+            self._persist(offer)
 
         print("Created entanglement offer %s for shards %s", offer_id, shard_indxs)
         return offer
 
+    def _persist(
+            self,
+            offer : EntanglementOffer
+    ):
+        self.ledger.append(asdict(offer) if isinstance(self.ledger, OfferLedger) else offer)
+        print("Offer persisted to ledger: %s", offer.offer_id)
+
     def get_offer(
             self,
             offer_id
     ):
-        offer = self.offers.get(offer_id)
-        if offer is None:
-            return None 
-
-        if time.time() - offer.created_at > offer.ttl_secs :
-            print(f'{offer_id} is expired, removing')
-            self.offers.pop(offer_id,None)
-            return None 
-
-        return offer 
+        # expired offers are dropped by the map itself
+        return self.offers.get(offer_id)
 
     def ls_offers(
             self,
@@ -121,6 +196,8 @@ class QuantumOracle:
             return {"page": page, "page_size": page_size, "total": 0, "offers": []}
         # clamp page
         page = max(1, int(page))
+        if isinstance(self.ledger, OfferLedger):
+            return {"page": page, "page_size": page_size, "total": total, "offers": self.ledger.page(page, page_size)}
         start = (page - 1) * page_size
         end = start + page_size
         slice_offers = self.ledger[start:end]
@@ -134,7 +211,7 @@ class QuantumOracle:
             ttl_secs
     ):
         n= secrets.token_hex(16)
-        self.nonces[n]= time.time() + ttl_secs
+        self.nonces.set(n, True, ttl=ttl_secs)
         print(f'Issued Nonce {n} valid for {ttl_secs}')
         return n 
 
@@ -142,12 +219,80 @@ class QuantumOracle:
             self,
             nonce
     ):
-        exp = self.nonces.get(nonce)
-        if exp is None:
-            return False 
-        
-        if time.time() >exp:
-            self.nonces.pop(nonce, None)
-            return False 
-        self.nonces.pop(nonce, None)
-        return True 
+        # consume-once: a live nonce is removed by the same call that checks it
+        return self.nonces.pop(nonce, False) 
+
+    def _submit_verification(
+            self,
+            offer : EntanglementOffer,
+            persist : bool = False,
+    ):
+        key = offer.expected_qubits
+        with self._verify_lock:
+            if self._verify_pool is None:
+                self._verify_pool = ThreadPoolExecutor(max_workers=self.verify_workers, thread_name_prefix="quick-verify")
+            shared = self._verify_inflight.get(key)
+            if shared is None:
+                shared = self._verify_pool.submit(quick_verify, offer.expected_qubits)
+                self._verify_inflight[key] = shared
+                shared.add_done_callback(lambda _f, key=key: self._verify_done(key, _f))
+
+        done: Future = Future()
+        self._verifications.set(offer.offer_id, done, expires_at=offer.created_at + offer.ttl_sec)
+
+        def _attach(fut : Future):
+            hint = fut.result()
+            offer.verification_hint = hint
+            if persist:
+                try:
+                    self._persist(offer)
+                except Exception as exc:
+                    print("Persisting offer %s failed: %s", offer.offer_id, exc)
+            done.set_result(hint)
+
+        shared.add_done_callback(_attach)
+
+    def _verify_done(
+            self,
+            key,
+            fut : Future
+    ):
+        with self._verify_lock:
+            if self._verify_inflight.get(key) is fut:
+                del self._verify_inflight[key]
+
+    def verification_status(
+            self,
+            offer_id
+    ) -> Optional[Dict]:
+        """Poll: current verification hint of a live offer ({"status": "pending"} until done)."""
+        offer = self.offers.get(offer_id)
+        return None if offer is None else offer.verification_hint
+
+    def await_verification(
+            self,
+            offer_id,
+            timeout : Optional[float] = None
+    ) -> Optional[Dict]:
+        """
+        Block until the offer's background verification finishes and return its hint.
+        Async callers can use asyncio.wrap_future(oracle.verification_future(offer_id)).
+        """
+        fut = self.verification_future(offer_id)
+        if fut is None:
+            return self.verification_status(offer_id)
+        return fut.result(timeout=timeout)
+
+    def verification_future(
+            self,
+            offer_id
+    ) -> Optional[Future]:
+        return self._verifications.get(offer_id)
+
+    def shutdown(
+            self,
+            wait : bool = True
+    ):
+        self.stop_sweeper()
+        if self._verify_pool is not None:
+            self._verify_pool.shutdown(wait=wait)
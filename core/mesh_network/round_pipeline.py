@@ -0,0 +1,142 @@
+"""
+Round pipeline
+
+Overlaps the stages of consecutive consensus rounds:
+- prepare  -> oracle offer + density-matrix simulation (ConsensusCluster.prepare_round)
+- sign     -> biometric encode + per-node signatures (ConsensusCluster.sign_round)
+- finalize -> signature verification + aggregation (ConsensusCluster.finalize_round)
+
+While round k is being signed and validated, round k+1 is already requesting its
+offer and simulating. At most `max_in_flight` rounds are submitted but not yet
+delivered; `submit` blocks once that depth is reached (backpressure), and
+decisions are always handed back in submission order.
+"""
+
+from __future__ import annotations
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, Iterable, Iterator, Optional
+
+from .consensus_cluster import ClusterDecision, ConsensusCluster
+
+
+class RoundPipeline:
+    """
+    Runs ConsensusCluster rounds as a bounded two-stage pipeline.
+    """
+
+    def __init__(
+        self,
+        cluster: ConsensusCluster,
+        max_in_flight: int = 4,
+        prepare_workers: int = 2,
+        finish_workers: int = 1,
+    ):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be >= 1")
+        self.cluster = cluster
+        self.max_in_flight = max_in_flight
+        self._prepare_pool = ThreadPoolExecutor(max_workers=prepare_workers, thread_name_prefix="round-prepare")
+        self._finish_pool = ThreadPoolExecutor(max_workers=finish_workers, thread_name_prefix="round-finish")
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._pending: Deque[Future] = deque()
+        self._closed = False
+
+    def submit(
+        self,
+        shard_indxs: Iterable[int],
+        timeout: Optional[float] = None,
+        **round_kwargs,
+    ) -> Future:
+        """
+        Queue a round. Blocks while `max_in_flight` rounds are undelivered.
+        Accepts the same keyword arguments as ConsensusCluster.start_round.
+        """
+        if self._closed:
+            raise RuntimeError("pipeline is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("round pipeline is full")
+
+        decision: Future = Future()
+        shard_indxs = tuple(int(i) for i in shard_indxs)
+        prepared = self._prepare_pool.submit(self.cluster.prepare_round, shard_indxs, **round_kwargs)
+
+        def _finish(prepared_round):
+            reports = self.cluster.sign_round(prepared_round)
+            return self.cluster.finalize_round(prepared_round, reports)
+
+        def _on_prepared(fut: Future):
+            exc = fut.exception()
+            if exc is not None:
+                decision.set_exception(exc)
+                return
+            try:
+                finished = self._finish_pool.submit(_finish, fut.result())
+            except RuntimeError as exc:
+                # close(wait=False) shut the finish pool while this round was preparing
+                decision.set_exception(exc)
+                return
+            finished.add_done_callback(_on_finished)
+
+        def _on_finished(fut: Future):
+            exc = fut.exception()
+            if exc is not None:
+                decision.set_exception(exc)
+            else:
+                decision.set_result(fut.result())
+
+        prepared.add_done_callback(_on_prepared)
+        self._pending.append(decision)
+        return decision
+
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    def next_decision(
+        self,
+        timeout: Optional[float] = None,
+    ) -> ClusterDecision:
+        """
+        Wait for and return the oldest undelivered round, freeing its slot.
+        Errors from any stage of that round are re-raised here.
+        """
+        if not self._pending:
+            raise LookupError("no rounds in flight")
+        fut = self._pending[0]
+        try:
+            return fut.result(timeout=timeout)
+        finally:
+            if fut.done():
+                self._pending.popleft()
+                self._slots.release()
+
+    def run(
+        self,
+        rounds: Iterable[Dict],
+    ) -> Iterator[ClusterDecision]:
+        """
+        Feed round specs (kwargs for start_round, must include `shard_indxs`) through
+        the pipeline and yield decisions in order, keeping it `max_in_flight` deep.
+        """
+        for spec in rounds:
+            spec = dict(spec)
+            if len(self._pending) >= self.max_in_flight:
+                yield self.next_decision()
+            self.submit(spec.pop("shard_indxs"), **spec)
+        while self._pending:
+            yield self.next_decision()
+
+    def close(
+        self,
+        wait: bool = True,
+    ):
+        self._closed = True
+        self._prepare_pool.shutdown(wait=wait)
+        self._finish_pool.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,131 @@
+"""
+Phase tracing for consensus rounds
+
+Every span is timed with perf_counter and observed into one Prometheus histogram
+(`consensus_phase_seconds`, labelled by phase) so slow rounds can be broken down
+into oracle offer, simulation, biometric encode, sign, verify and aggregate.
+
+Optionally the last N spans are kept in an in-process ring buffer that can be
+dumped as JSON for ad-hoc inspection:
+
+    tracer.enable_ring(4096)
+    cluster.start_round([0, 1, 2])
+    print(tracer.dump_json())
+
+Recording a span is a histogram observe plus (when enabled) a deque append, so it
+is cheap enough to leave on in production.
+"""
+
+from __future__ import annotations
+import json
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+try:
+    from prometheus_client import Histogram
+except Exception:  # metrics are optional for the core package
+    Histogram = None
+
+PHASE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PHASE_SECONDS = (
+    Histogram("consensus_phase_seconds", "Time spent per consensus round phase", ["phase"], buckets=PHASE_BUCKETS)
+    if Histogram is not None
+    else None
+)
+
+
+class _Span:
+    __slots__ = ("tracer", "phase", "attrs", "start")
+
+    def __init__(self, tracer, phase, attrs):
+        self.tracer = tracer
+        self.phase = phase
+        self.attrs = attrs
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        self.tracer.record(self.phase, duration, self.attrs, error=exc_type is not None)
+        return False
+
+
+class Tracer:
+    """
+    Times named phases into Prometheus and an optional ring buffer of recent spans.
+    """
+
+    def __init__(
+        self,
+        ring_size: int = 0,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self._ring: Optional[Deque[Dict]] = deque(maxlen=ring_size) if ring_size > 0 else None
+        self._children: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def span(
+        self,
+        phase: str,
+        **attrs,
+    ) -> _Span:
+        return _Span(self, phase, attrs)
+
+    def record(
+        self,
+        phase: str,
+        duration: float,
+        attrs: Optional[Dict] = None,
+        error: bool = False,
+    ):
+        if not self.enabled:
+            return
+        if PHASE_SECONDS is not None:
+            child = self._children.get(phase)
+            if child is None:
+                child = self._children.setdefault(phase, PHASE_SECONDS.labels(phase=phase))
+            child.observe(duration)
+        ring = self._ring
+        if ring is not None:
+            entry = {"phase": phase, "ts": time.time(), "duration": duration}
+            if attrs:
+                entry["attrs"] = attrs
+            if error:
+                entry["error"] = True
+            ring.append(entry)
+
+    def enable_ring(
+        self,
+        size: int = 4096,
+    ):
+        with self._lock:
+            self._ring = deque(self._ring or (), maxlen=size)
+
+    def disable_ring(self):
+        with self._lock:
+            self._ring = None
+
+    def spans(self) -> List[Dict]:
+        ring = self._ring
+        return list(ring) if ring is not None else []
+
+    def dump_json(
+        self,
+        path: Optional[str] = None,
+    ) -> str:
+        data = json.dumps(self.spans(), default=str)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(data)
+        return data
+
+
+# Shared instance used by the cluster, oracle and validator
+tracer = Tracer()
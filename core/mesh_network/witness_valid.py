@@ -36,6 +36,7 @@ try:
 except Exception as exc:
     raise ImportError("Install 'cryptography' package: pip install cryptography") from exc
 import json
+from .tracing import tracer
 
 
 def json_bytes(obj: Dict) -> bytes:
@@ -131,14 +132,15 @@ class WitnessValidator:
         method: str,
         pubkey_or_secret: bytes,
     ):
-        msg = CryptoHelpers.canonical_serialize(report_dict)
-        verified = False
-        if method.lower() == "ecdsa":
-            verified = CryptoHelpers.verify_ecdsa(pubkey_or_secret, signature, msg)
-        elif method.lower() == "hmac":
-            verified = CryptoHelpers.verify_hmac(pubkey_or_secret, signature, msg)
-        else:
-            raise ValueError("Unsupported method: choose 'ecdsa' or 'hmac'")
+        with tracer.span("witness.verify_signature"):
+            msg = CryptoHelpers.canonical_serialize(report_dict)
+            verified = False
+            if method.lower() == "ecdsa":
+                verified = CryptoHelpers.verify_ecdsa(pubkey_or_secret, signature, msg)
+            elif method.lower() == "hmac":
+                verified = CryptoHelpers.verify_hmac(pubkey_or_secret, signature, msg)
+            else:
+                raise ValueError("Unsupported method: choose 'ecdsa' or 'hmac'")
 
         if not verified:
             return ValidationResult(report_dict.get("node_id", "unknown"), False, "invalid_signature", 0.0, {}, 0.0)
@@ -150,7 +152,8 @@ class WitnessValidator:
             biometric_fidelity=report_dict.get("biometric_fidelity"),
             metadata=report_dict.get("metadata"),
         )
-        return self.validate(wr)
+        with tracer.span("witness.validate"):
+            return self.validate(wr)
     
     def validate(
             self,
@@ -203,7 +206,7 @@ class WitnessValidator:
         if not results:
             return {"avg_agreement": 0.0, "avg_trust": 0.0, "num_valid": 0, "num_reports": 0}
         
-        agreements = [r.agreement for r in results]
+        agreements = [r.agreement_rate for r in results]
         trusts = [r.trust_score for r in results]
         num_valid = sum(1 for r in results if r.valid)
         return {
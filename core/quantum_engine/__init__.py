@@ -1,3 +1,3 @@
 from .entanglement_sharding import EntangledShardsSystem 
 from .temporal_locks import TemporalLockManager
-from .biometric_quantum import BiometricEncoder,fidelity
\ No newline at end of file
+from .biometric_quantum import BiometricEncoder,fidelity,fidelity_batch
\ No newline at end of file
@@ -77,6 +77,41 @@ class BiometricEncoder:
         statevector = res.final_state_vector 
 
         return statevector, circuit 
+
+    def encode_batch(
+            self,
+            biometric_vecs
+    ):
+        """
+        Encode many biometric vectors at once, without building circuits.
+        Same states as encode: encode normalizes the full vector, then truncates
+        or pads to 2**nqubits, and state preparation renormalizes what it keeps.
+        The two normalizations only scale the row, so this pads/truncates every
+        row into one (n, 2**nqubits) array and normalizes it once, row-wise.
+        Returns: array of shape (n, 2**nqubits)
+        """
+        n = len(biometric_vecs)
+        states = np.zeros((n, self.dim), dtype=np.complex128)
+        if n and len({len(v) for v in biometric_vecs}) == 1:
+            # equal lengths (the common case): one 2-D array, one slice assignment
+            arr = np.asarray(biometric_vecs, dtype=np.float64)
+            width = min(arr.shape[1], self.dim)
+            states[:, :width] = arr[:, :width]
+            # like encode, reject all-zero vectors before truncating
+            all_zero = np.all(np.isclose(arr, 0), axis=1)
+        else:
+            all_zero = np.zeros(n, dtype=bool)
+            for i, vec in enumerate(biometric_vecs):
+                row = np.asarray(vec, dtype=np.float64)
+                states[i, :min(row.size, self.dim)] = row[:self.dim]
+                all_zero[i] = np.allclose(row, 0)
+        if np.any(all_zero):
+            raise ValueError("Biometric vector cannot be all zeros.")
+        norms = np.linalg.norm(states, axis=1, keepdims=True)
+        if np.any(norms == 0):
+            raise ValueError("Biometric vector has no amplitude within the first 2**nqubits entries.")
+        states /= norms
+        return states
     
 
 def fidelity(
@@ -89,4 +124,16 @@ def fidelity(
     If they are completely different, the fidelity is 0
     """
     overlap = np.vdot(state_a,state_b)
-    return float(np.abs(overlap)**2)
\ No newline at end of file
+    return float(np.abs(overlap)**2)
+
+
+def fidelity_batch(
+        states_a,
+        states_b
+):
+    """
+    Row-wise fidelity |<a_i|b_i>|^2 for two (n, dim) state arrays.
+    A single row on either side is broadcast against all rows of the other.
+    """
+    overlap = np.sum(np.conj(states_a) * states_b, axis=-1)
+    return np.abs(overlap) ** 2
@@ -9,12 +9,20 @@ class TrustAnomalyDetector:
     def __init__(self):
         self.model = IsolationForest(contamination=0.05)
         self.history: List[Dict] = []
+        self.max_history = 1000
 
     def add_record(self, identity_id: str, trust_score: float, entropy: float = 0.0):
         self.history.append({"id": identity_id, "score": trust_score, "entropy": entropy})
-        if len(self.history) > 1000:
+        if len(self.history) > self.max_history:
             self.history.pop(0)
 
+    def add_records(self, identity_ids: List[str], trust_scores, entropies):
+        """Bulk add; only the newest max_history records can survive, so only those are kept."""
+        keep = self.max_history
+        tail = zip(identity_ids[-keep:], trust_scores[-keep:], entropies[-keep:])
+        self.history.extend({"id": i, "score": float(s), "entropy": float(e)} for i, s, e in tail)
+        del self.history[:-keep]
+
     def detect_anomalies(self) -> List[Dict]:
         if len(self.history) < 10:
             return []
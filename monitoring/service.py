@@ -1,8 +1,8 @@
-from fastapi import FastAPI
-from fastapi.responses import Response
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from prometheus_client import Counter, Gauge, generate_latest, CONTENT_TYPE_LATEST
-from typing import List, Dict
-import statistics
+from typing import List, Dict, Optional
+from datetime import datetime
 import time
 import numpy as np
 from sklearn.ensemble import IsolationForest
@@ -12,7 +12,8 @@ from core.identity_core.dynamic_trust import DynamicTrustEngine
 from core.quantum_engine.temporal_locks import TemporalLockManager
 
 # Optional audit repository
-from services.trust_calc.repo import TrustRepo
+from services.trust_calc.repo import AsyncTrustRepo
+from services.fast_response import NDJSON_TYPE, ndjson_lines_async, negotiate, wants_ndjson
 import os
 
 app = FastAPI(title="Monitoring + ML Threat Detection")
@@ -21,7 +22,8 @@ app = FastAPI(title="Monitoring + ML Threat Detection")
 engine = DynamicTrustEngine(decay=0.9)
 temporal_manager = TemporalLockManager()
 DB_URL = os.getenv("DATABASE_URL")
-trust_repo = TrustRepo(DB_URL)
+# async engine: /audit awaits its queries instead of holding a threadpool worker
+trust_repo = AsyncTrustRepo(DB_URL)
 
 # --- Prometheus metrics ---
 TRUST_UPDATES = Counter("trust_updates_total", "Total number of trust score updates")
@@ -71,32 +73,32 @@ def quantum_metrics():
 
 # --- Trust Analytics ---
 @app.get("/trust-analytics")
-def trust_analytics(top: int = 10):
-    all_scores = engine.rank_identities()
-    TRUST_UPDATES.inc(len(all_scores))
+def trust_analytics(request: Request, top: int = 10):
+    # summary straight off the engine's score column; only top/bottom k are sorted
+    scores = engine.scores()
+    TRUST_UPDATES.inc(len(scores))
 
-    if not all_scores:
+    if not len(scores):
         return {"summary": {}, "top": [], "bottom": []}
 
-    scores = [score for _, score in all_scores]
     summary = {
-        "mean": statistics.mean(scores),
-        "median": statistics.median(scores),
-        "variance": statistics.variance(scores) if len(scores) > 1 else 0.0,
+        "mean": float(scores.mean()),
+        "median": float(np.median(scores)),
+        "variance": float(scores.var(ddof=1)) if len(scores) > 1 else 0.0,
         "total_identities": len(scores),
     }
 
-    top_identities = [{"identity_id": k, "trust_score": v} for k, v in all_scores[:top]]
-    bottom_identities = [{"identity_id": k, "trust_score": v} for k, v in all_scores[-top:]]
+    top_identities = [{"identity_id": k, "trust_score": v} for k, v in engine.top(top)]
+    # bottom keeps the descending order of the full ranking's tail
+    bottom_identities = [{"identity_id": k, "trust_score": v} for k, v in reversed(engine.bottom(top))]
 
-    low_alerts = sum(1 for s in scores if s < 0.5)
-    LOW_TRUST_ALERTS.set(low_alerts)
+    LOW_TRUST_ALERTS.set(engine.count_below(0.5))
 
-    # Update ML detector
-    for identity, score in all_scores:
+    # Update ML detector; it only keeps the last 1000 records, i.e. the lowest scores
+    for identity, score in reversed(engine.bottom(1000)):
         ml_detector.add_record(identity, score, 0.0)  # entropy optional
 
-    return {"summary": summary, "top": top_identities, "bottom": bottom_identities}
+    return negotiate(request, {"summary": summary, "top": top_identities, "bottom": bottom_identities})
 
 
 # --- ML Threat Detection Endpoint ---
@@ -106,10 +108,36 @@ def ml_threats():
     return {"total_anomalies": len(anomalies), "anomalies": anomalies}
 
 
+@app.on_event("startup")
+async def init_audit_repo():
+    await trust_repo.init()
+
+
+@app.on_event("shutdown")
+async def close_audit_repo():
+    await trust_repo.close()
+
+
 @app.get("/audit/{identity_id}")
-def audit(identity_id: str):
-    history = trust_repo.fetch_history(identity_id)
-    return {"identity_id": identity_id, "history": history}
+async def audit(
+    request: Request,
+    identity_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    stream: bool = False,
+):
+    # Full history as NDJSON, fetched page by page while the response is written
+    if stream or wants_ndjson(request):
+        rows = trust_repo.iter_history(identity_id, since=since, until=until)
+        return StreamingResponse(ndjson_lines_async(rows), media_type=NDJSON_TYPE)
+
+    try:
+        page = await trust_repo.history_page(identity_id, limit=limit, cursor=cursor, since=since, until=until)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return negotiate(request, {"identity_id": identity_id, **page})
 
 
 @app.get("/metrics")
@@ -0,0 +1,62 @@
+"""
+Serialization cost per hot endpoint: FastAPI's default path (jsonable_encoder +
+json.dumps, what a plain dict return goes through) vs the negotiated fast path.
+
+Usage:
+    python -m services.bench_encoding --rows 10000 --repeat 20
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import random
+import secrets
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from services.fast_response import _default, msgpack, orjson
+
+
+def _payloads(rows: int):
+    rank = {"total": rows, "rank": [{"identity_id": f"id-{i}", "trust_score": random.random()} for i in range(rows)]}
+    bulk = {"results": [
+        {"identity_id": f"id-{i}", "trust_score": random.random(), "entropy": random.random(), "tx_hash": "0x" + secrets.token_hex(32)}
+        for i in range(rows)
+    ]}
+    offers = {"limit": rows, "next_cursor": None, "offers": [
+        {"offer_id": secrets.token_hex(12), "shard_indices": [0, 1, 2], "kind": "ghz", "expected_qubits": 3,
+         "created_at": time.time(), "ttl_seconds": 30, "verification_hint": None}
+        for _ in range(rows)
+    ]}
+    top = [{"identity_id": f"id-{i}", "trust_score": random.random()} for i in range(min(rows, 1000))]
+    analytics = {"summary": {"mean": 0.5, "median": 0.5, "variance": 0.1, "total_identities": rows}, "top": top, "bottom": top}
+    return {"/rank": rank, "/bulk-update": bulk, "/offers": offers, "/trust-analytics": analytics}
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response serialization benchmark")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"rows={args.rows} (best of {args.repeat}, milliseconds)")
+    print(f"{'endpoint':<18} {'default':>9} {'orjson':>9} {'msgpack':>9} {'speedup':>8}")
+    for name, payload in _payloads(args.rows).items():
+        base = _time(lambda: json.dumps(jsonable_encoder(payload)).encode("utf-8"), args.repeat)
+        fast = _time(lambda: orjson.dumps(payload, default=_default), args.repeat) if orjson else float("nan")
+        packed = _time(lambda: msgpack.packb(payload, default=_default, use_bin_type=True), args.repeat) if msgpack else float("nan")
+        print(f"{name:<18} {base * 1e3:>9.2f} {fast * 1e3:>9.2f} {packed * 1e3:>9.2f} {base / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
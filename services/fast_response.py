@@ -0,0 +1,94 @@
+"""
+Content-negotiated fast responses for hot service endpoints.
+
+Endpoints that return large payloads build plain dicts/lists and hand them to
+`negotiate`, which returns a ready Response, so FastAPI skips response-model
+re-validation and the stdlib json encoder:
+
+- Accept: application/msgpack (or application/x-msgpack) -> MessagePack
+- anything else                                            -> JSON via orjson
+
+`ndjson_lines` encodes an iterable of rows lazily, one JSON document per line, for
+StreamingResponse bodies that must not be materialized.
+
+orjson and msgpack are optional; without them responses fall back to the standard
+JSONResponse and JSON respectively.
+"""
+
+from __future__ import annotations
+import datetime
+import decimal
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+NDJSON_TYPE = "application/x-ndjson"
+
+
+def _default(obj: Any):
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "dict"):
+        return obj.dict()
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if hasattr(obj, "tolist"):  # numpy arrays and scalars
+        return obj.tolist()
+    if isinstance(obj, (tuple, set)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return any(t in accept for t in MSGPACK_TYPES)
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_TYPE in request.headers.get("accept", "")
+
+
+def _ndjson_line(row: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(row, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(jsonable_encoder(row)) + "\n").encode("utf-8")
+
+
+def ndjson_lines(rows: Iterable[Any]) -> Iterator[bytes]:
+    for row in rows:
+        yield _ndjson_line(row)
+
+
+async def ndjson_lines_async(rows: AsyncIterable[Any]) -> AsyncIterator[bytes]:
+    async for row in rows:
+        yield _ndjson_line(row)
+
+
+def negotiate(
+    request: Request,
+    payload: Any,
+    status_code: int = 200,
+) -> Response:
+    if msgpack is not None and wants_msgpack(request):
+        body = msgpack.packb(payload, default=_default, use_bin_type=True)
+        return Response(content=body, status_code=status_code, media_type="application/msgpack")
+    if orjson is not None:
+        body = orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        return Response(content=body, status_code=status_code, media_type="application/json")
+    return JSONResponse(content=jsonable_encoder(payload), status_code=status_code)
@@ -0,0 +1,77 @@
+"""
+Buffered entropy pool for the Oracle API.
+
+Random bytes are drawn from the OS CSPRNG in large blocks into one preallocated
+buffer that is refilled in place, instead of one `secrets.token_bytes` call per
+request. Every byte is handed out at most once: a read copies bytes out of the
+buffer (once, into a new buffer the caller owns, returned as a memoryview) and
+advances past them, and the buffer is only reused after a refill.
+"""
+
+from __future__ import annotations
+import secrets
+import threading
+import time
+from typing import Iterator
+
+
+class EntropyPool:
+    def __init__(
+        self,
+        block_size: int = 1 << 20,
+    ):
+        self.block_size = block_size
+        self._buf = bytearray(block_size)
+        self._view = memoryview(self._buf)
+        self._pos = block_size  # empty until first refill
+        self._lock = threading.Lock()
+        self._urandom = None
+        try:
+            self._urandom = open("/dev/urandom", "rb", buffering=0)
+        except OSError:
+            pass
+        self.bytes_served = 0
+        self.refills = 0
+        self.fill_bytes_per_sec = 0.0
+
+    def _refill(self):
+        t0 = time.perf_counter()
+        if self._urandom is not None:
+            filled = 0
+            while filled < self.block_size:
+                filled += self._urandom.readinto(self._view[filled:])
+        else:
+            self._view[:] = secrets.token_bytes(self.block_size)
+        elapsed = time.perf_counter() - t0
+        if elapsed > 0:
+            self.fill_bytes_per_sec = self.block_size / elapsed
+        self._pos = 0
+        self.refills += 1
+
+    def read(
+        self,
+        n: int,
+    ) -> memoryview:
+        out = bytearray(n)
+        got = 0
+        with self._lock:
+            while got < n:
+                if self._pos >= self.block_size:
+                    self._refill()
+                take = min(n - got, self.block_size - self._pos)
+                out[got:got + take] = self._view[self._pos:self._pos + take]
+                self._pos += take
+                got += take
+            self.bytes_served += n
+        return memoryview(out)
+
+    def stream(
+        self,
+        n: int,
+        chunk_size: int = 64 * 1024,
+    ) -> Iterator[memoryview]:
+        remaining = n
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            yield self.read(size)
+            remaining -= size
@@ -0,0 +1,238 @@
+"""
+Database-backed offer repository for the Oracle API.
+
+- SQLAlchemy Core on a pooled engine (pre-ping, recycle); works on MySQL, Postgres
+  and SQLite, so local runs can point DATABASE_URL at sqlite:///...
+- Offers are queued and written by a background thread with one executemany
+  INSERT per batch, as soon as `batch_size` offers are waiting or every
+  `flush_interval` seconds, keeping the DB off the request path. A listing can
+  therefore lag a just-created offer by up to `flush_interval`.
+- While the DB is unreachable batches are re-queued; a batch the DB rejects for
+  its data (e.g. a duplicate offer_id) is retried row by row and the offending
+  rows are dropped and logged, so one bad row cannot wedge the queue.
+- The queue holds at most `max_queued` offers. Beyond that (a long outage, or a
+  writer that cannot keep up) offers go to a JSON-lines spill file shared by the
+  workers (ORACLE_OFFER_SPILL), counted by oracle_offers_spilled_total, and are
+  replayed ahead of the queue once the DB accepts writes again.
+- Listing is keyset-paginated on (created_at, id) with a matching composite index:
+  every page is an index range scan of `limit` rows, so page 10^6 costs the same as
+  page 1. The cursor is an opaque base64 token of the last row's key.
+"""
+
+from __future__ import annotations
+import base64
+import json
+import os
+import queue
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import Counter
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    and_,
+    create_engine,
+    or_,
+    select,
+)
+from sqlalchemy.exc import DisconnectionError, InterfaceError, OperationalError
+
+from services.spill_file import SpillFile
+
+# errors meaning "the database is unreachable", as opposed to a row it rejects
+DB_UNAVAILABLE = (OperationalError, InterfaceError, DisconnectionError)
+
+OFFERS_SPILLED = Counter("oracle_offers_spilled_total", "Offers spilled to disk because the write queue was full")
+
+metadata = MetaData()
+
+offers_table = Table(
+    "oracle_offers",
+    metadata,
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("offer_id", String(32), nullable=False, unique=True),
+    Column("created_at", Float, nullable=False),
+    Column("payload", Text, nullable=False),
+    Index("ix_oracle_offers_created_at_id", "created_at", "id"),
+)
+
+
+def encode_cursor(created_at: float, row_id: int) -> str:
+    raw = json.dumps([created_at, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(created_at), int(row_id)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+class OfferRepo:
+    def __init__(
+        self,
+        db_url: str,
+        pool_size: int = 10,
+        max_overflow: int = 20,
+        batch_size: int = 500,
+        flush_interval: float = 0.2,
+        max_queued: int = 100_000,
+        spill_path: Optional[str] = None,
+    ):
+        kwargs = {"pool_pre_ping": True, "future": True}
+        if db_url.startswith("sqlite"):
+            kwargs["connect_args"] = {"check_same_thread": False}
+        else:
+            kwargs.update(pool_size=pool_size, max_overflow=max_overflow, pool_recycle=1800)
+        self.engine = create_engine(db_url, **kwargs)
+        metadata.create_all(self.engine)
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queued)
+        self.spill_path = spill_path or os.getenv("ORACLE_OFFER_SPILL", "data/oracle_offers.spill.jsonl")
+        self._spill = SpillFile(self.spill_path)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.rejected = 0
+        self._writer = threading.Thread(target=self._run, name="offer-writer", daemon=True)
+        self._writer.start()
+
+    # --- writes --- #
+    def add(
+        self,
+        offer: Dict,
+    ):
+        """Queue an offer dict (must carry offer_id and created_at) for the next batch."""
+        self._enqueue([{
+            "offer_id": offer["offer_id"],
+            "created_at": float(offer["created_at"]),
+            "payload": json.dumps(offer, separators=(",", ":")),
+        }])
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def _enqueue(self, rows: List[Dict]):
+        """Queue `rows`, spilling whatever does not fit under max_queued."""
+        for k, row in enumerate(rows):
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                overflow = rows[k:]
+                self._spill.append(overflow)
+                OFFERS_SPILLED.inc(len(overflow))
+                return
+
+    def _drain(self) -> List[Dict]:
+        rows = []
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _insert(self, rows: List[Dict]):
+        with self.engine.begin() as conn:
+            conn.execute(offers_table.insert(), rows)
+
+    def _insert_each(self, rows: List[Dict]) -> Tuple[int, List[Dict]]:
+        """Row-by-row fallback; returns (rows written, rows left because the DB went away)."""
+        written = 0
+        for k, row in enumerate(rows):
+            try:
+                self._insert([row])
+                written += 1
+            except DB_UNAVAILABLE:
+                return written, rows[k:]
+            except Exception as exc:
+                self.rejected += 1
+                print(f"OfferRepo: dropping offer {row['offer_id']}: {str(exc).splitlines()[0]}")
+        return written, []
+
+    def _write_rows(self, rows: List[Dict]) -> Tuple[int, List[Dict]]:
+        """Batch insert with the row-by-row fallback; returns (written, left because the DB is down)."""
+        try:
+            self._insert(rows)
+            return len(rows), []
+        except DB_UNAVAILABLE as exc:
+            print(f"OfferRepo: database unavailable ({exc}); holding {len(rows)} offers")
+            return 0, rows
+        except Exception as exc:
+            print(f"OfferRepo: batch of {len(rows)} offers rejected ({exc}); retrying row by row")
+            return self._insert_each(rows)
+
+    def flush(self) -> int:
+        """Write everything queued so far (spilled offers first); returns rows written."""
+        written = 0
+        with self._flush_lock:
+            if self._spill.exists():
+                written, drained = self._spill.replay(self._write_rows, self.batch_size)
+                if not drained:
+                    return written
+            while True:
+                rows = self._drain()
+                if not rows:
+                    return written
+                count, left = self._write_rows(rows)
+                written += count
+                if left:
+                    # re-queued up to max_queued, the rest spilled
+                    self._enqueue(left)
+                    return written
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if not self._queue.empty() or self._spill.exists():
+                self.flush()
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self._writer.join(timeout=5.0)
+        self.flush()
+        self.engine.dispose()
+
+    # --- reads --- #
+    def get(
+        self,
+        offer_id: str,
+    ) -> Optional[Dict]:
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(offers_table.c.payload).where(offers_table.c.offer_id == offer_id)
+            ).first()
+        return None if row is None else json.loads(row[0])
+
+    def list_page(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Dict:
+        """Oldest-first page of offers after `cursor`; `next_cursor` is None on the last page."""
+        t = offers_table
+        stmt = select(t.c.id, t.c.created_at, t.c.payload)
+        if cursor:
+            created_at, row_id = decode_cursor(cursor)
+            stmt = stmt.where(or_(t.c.created_at > created_at, and_(t.c.created_at == created_at, t.c.id > row_id)))
+        stmt = stmt.order_by(t.c.created_at, t.c.id).limit(limit + 1)
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+        return {"limit": limit, "next_cursor": next_cursor, "offers": [json.loads(r.payload) for r in rows]}
@@ -3,26 +3,37 @@ Quantum Oracle API (FastAPI mock)
 
 Endpoints:
 - GET  /random-bits?n=128             -> return cryptographically-random bits (hex/base64)
+- GET  /random-bytes/stream?n_bytes=N -> stream N random bytes (application/octet-stream, chunked)
 - POST /create-offer                  -> create entanglement offer metadata
-- GET  /offer/{offer_id}              -> get offer metadata (if not expired)
-- GET  /offers                        -> list persisted offers (pagination)
+- GET  /offer/{offer_id}              -> get offer metadata (410 once expired, 404 if unknown)
+- GET  /offers                        -> list persisted offers (keyset cursor with DATABASE_URL, else page/page_size)
 - POST /fidelity-check                -> compute fidelity between two numeric vectors (uses biometric_quantum if available)
+- POST /fidelity-check/batch          -> fidelities for many (a, b) pairs, or one probe against many candidates
 - POST /issue-nonce                   -> issue a nonce (ttl)
 - POST /verify-nonce                  -> verify a nonce
 """
 
 from __future__ import annotations
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from pydantic import BaseModel, Field
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
+import os
 import time
 import secrets
 from core.identity_core.holographic_identity import HolographicIdentity
-from core.quantum_engine.biometric_quantum import BiometricEncoder, fidelity
+from core.quantum_engine.biometric_quantum import BiometricEncoder, fidelity, fidelity_batch
+from core.mesh_network.offer_ledger import OfferLedger
 import numpy as np
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_client import Gauge, Counter, generate_latest, CONTENT_TYPE_LATEST
 from fastapi import Response
+from fastapi.responses import StreamingResponse
+from prometheus_client import Histogram
+from .entropy import EntropyPool
+from .state import SQLiteStateBackend, make_backend
+from .offer_repo import OfferRepo
+from services.fast_response import negotiate
 
 
 app = FastAPI(title="Quantum Oracle API (mock)", version="0.1")
@@ -46,9 +57,64 @@ class Offer(BaseModel):
     verification_hint: Optional[Dict] = None
 
 
-_OFFERS: Dict[str, Offer] = {}
-_LEDGER: List[Offer] = {}
-_NONCES: Dict[str, float] = {}
+# --- Prometheus metrics ---
+_REQS = Counter("oracle_requests_total", "Total requests", ["route"]) 
+_OFFERS_ACTIVE = Gauge("oracle_offers_active", "Active offers")
+_NONCES_ACTIVE = Gauge("oracle_nonces_active", "Active nonces")
+_RANDOM_BYTES = Counter("oracle_random_bytes_total", "Random bytes served")
+_STREAM_THROUGHPUT = Histogram(
+    "oracle_random_stream_bytes_per_second",
+    "Per-response throughput of /random-bytes/stream",
+    buckets=(1e6, 1e7, 5e7, 1e8, 2.5e8, 5e8, 1e9, 2.5e9),
+)
+
+# shared CSPRNG buffer, refilled in bulk instead of per request
+_ENTROPY = EntropyPool(block_size=int(os.getenv("ORACLE_ENTROPY_BLOCK_BYTES", str(1 << 20))))
+MAX_STREAM_BYTES = 256 * 1024 * 1024
+_ENTROPY_FILL_RATE = Gauge("oracle_entropy_pool_fill_bytes_per_second", "Fill rate of the last entropy pool refill")
+_ENTROPY_SERVED = Gauge("oracle_entropy_pool_bytes_served", "Bytes served from the entropy pool")
+_ENTROPY_FILL_RATE.set_function(lambda: _ENTROPY.fill_bytes_per_sec)
+_ENTROPY_SERVED.set_function(lambda: _ENTROPY.bytes_served)
+
+# offers/nonces expire on their own (background sweeper), not only when read;
+# ORACLE_STATE_BACKEND=sqlite shares them across uvicorn workers on one host
+_STATE = make_backend()
+_OFFERS_ACTIVE.set_function(_STATE.count_offers)
+_NONCES_ACTIVE.set_function(_STATE.count_nonces)
+# offers are persisted to the database when DATABASE_URL is set (batched writes,
+# keyset listing); otherwise to the append-only on-disk ledger below
+DB_URL = os.getenv("DATABASE_URL")
+if isinstance(_STATE, SQLiteStateBackend) and not DB_URL:
+    # the sqlite backend is for `--workers N`, but the ledger is single-writer
+    raise RuntimeError("ORACLE_STATE_BACKEND=sqlite (multiple workers) requires DATABASE_URL for offer persistence")
+_OFFER_REPO = OfferRepo(DB_URL) if DB_URL else None
+
+# append-only on-disk ledger (single worker only; it locks its directory);
+# survives restarts, old segments compacted by age
+_LEDGER = None if _OFFER_REPO is not None else OfferLedger(
+    os.getenv("ORACLE_LEDGER_DIR", "data/offer-ledger"),
+    max_segment_bytes=int(os.getenv("ORACLE_LEDGER_SEGMENT_BYTES", str(64 * 1024 * 1024))),
+)
+LEDGER_RETENTION_SEC = float(os.getenv("ORACLE_LEDGER_RETENTION_SEC", str(30 * 24 * 3600)))
+SWEEP_INTERVAL = float(os.getenv("ORACLE_SWEEP_INTERVAL", "1.0"))
+
+
+@app.on_event("startup")
+def start_sweepers():
+    _STATE.start_sweeper(SWEEP_INTERVAL)
+    if _LEDGER is not None:
+        dropped = _LEDGER.compact(LEDGER_RETENTION_SEC)
+        if dropped:
+            print(f"Compacted {dropped} offers older than {LEDGER_RETENTION_SEC}s from ledger")
+
+
+@app.on_event("shutdown")
+def stop_sweepers():
+    _STATE.stop_sweeper()
+    if _LEDGER is not None:
+        _LEDGER.close()
+    if _OFFER_REPO is not None:
+        _OFFER_REPO.close()
 
 
 # --- Request/response models --- #
@@ -79,6 +145,20 @@ class FidelityResponse(BaseModel):
     method: str
 
 
+class FidelityBatchRequest(BaseModel):
+    # either explicit pairs, or one probe scored against every candidate
+    pairs: Optional[List[FidelityRequest]] = None
+    probe: Optional[List[float]] = None
+    candidates: Optional[List[List[float]]] = None
+
+
+class FidelityBatchResponse(BaseModel):
+    fidelities: List[float]
+    count: int
+    num_qubits: int
+    method: str
+
+
 class NonceRequest(BaseModel):
     ttl_seconds: int = Field(60, ge=1)
 
@@ -90,18 +170,41 @@ def _now() -> float:
     return time.time()
 
 
-def _expire_offer(offer: Offer) -> bool:
-    return (_now() - offer.created_at) > offer.ttl_seconds
-
 @app.get("/random-bits", response_model=RandomBitsResponse)
 def random_bits(n: int = Query(128, ge=1, le=65536)):
     # Use secrets to produce cryptographically secure bits, present as hex string
     n_bytes = (n + 7) // 8
-    raw = secrets.token_bytes(n_bytes)
+    raw = _ENTROPY.read(n_bytes)
+    _RANDOM_BYTES.inc(n_bytes)
     hexstr = raw.hex()
     return RandomBitsResponse(n_bits=n, hex=hexstr)
 
 
+@app.get("/random-bytes/stream")
+def random_bytes_stream(
+    n_bytes: int = Query(1 << 20, ge=1, le=MAX_STREAM_BYTES),
+    chunk_size: int = Query(64 * 1024, ge=1024, le=4 * 1024 * 1024),
+):
+    """
+    Stream `n_bytes` from the shared entropy pool.
+
+    Per-response throughput is only known once the body is sent, so it goes to the
+    oracle_random_stream_bytes_per_second histogram rather than a header; pool
+    statistics are the oracle_entropy_pool_* gauges.
+    """
+    def _body():
+        t0 = time.perf_counter()
+        for chunk in _ENTROPY.stream(n_bytes, chunk_size):
+            _RANDOM_BYTES.inc(len(chunk))
+            yield chunk
+        elapsed = time.perf_counter() - t0
+        if elapsed > 0:
+            _STREAM_THROUGHPUT.observe(n_bytes / elapsed)
+
+    headers = {"X-Random-Bytes": str(n_bytes)}
+    return StreamingResponse(_body(), media_type="application/octet-stream", headers=headers)
+
+
 @app.post("/create-offer", response_model=CreateOfferResponse)
 def create_offer(req: CreateOfferRequest):
     offer_id = secrets.token_hex(12)
@@ -114,33 +217,61 @@ def create_offer(req: CreateOfferRequest):
         ttl_seconds=req.ttl_seconds,
         verification_hint=None,
     )
-    _OFFERS[offer_id] = offer
-    # append to ledger (persist in-memory)
-    _LEDGER.setdefault("offers", []).append(offer)
+    _STATE.put_offer(offer_id, offer.dict(), expires_at=offer.created_at + offer.ttl_seconds)
+    # append to ledger (persisted on disk)
+    if _OFFER_REPO is not None:
+        _OFFER_REPO.add(offer.dict())
+    else:
+        _LEDGER.append(offer.dict())
     print("Created offer %s", offer_id)
     return CreateOfferResponse(offer_id=offer_id, created_at=offer.created_at, ttl_seconds=offer.ttl_seconds)
 
 
 @app.get("/offer/{offer_id}", response_model=Offer)
 def get_offer(offer_id: str):
-    offer = _OFFERS.get(offer_id)
+    """
+    Offer metadata while the offer is live; 410 once it has expired, 404 for an id
+    that was never issued. Expired ids are remembered by the state backend for
+    ORACLE_EXPIRED_OFFER_TTL seconds after their deadline; after that they answer 404.
+    """
+    offer = _STATE.get_offer(offer_id)
     if not offer:
+        if _STATE.offer_expired(offer_id):
+            raise HTTPException(status_code=410, detail="offer expired")
         raise HTTPException(status_code=404, detail="offer not found")
-    if _expire_offer(offer):
-        _OFFERS.pop(offer_id, None)
-        raise HTTPException(status_code=410, detail="offer expired")
-    return offer
+    return Offer(**offer)
 
 
 @app.get("/offers")
-def list_offers(page: int = 1, page_size: int = 20):
-    ledger = _LEDGER.get("offers", [])
-    total = len(ledger)
+def list_offers(
+    request: Request,
+    page: int = 1,
+    page_size: int = Query(20, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
+    if _OFFER_REPO is not None:
+        # keyset pagination: pass back next_cursor to continue; page is ignored
+        try:
+            return negotiate(request, _OFFER_REPO.list_page(limit=page_size, cursor=cursor))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
     page = max(1, int(page))
-    start = (page - 1) * page_size
-    end = start + page_size
-    items = ledger[start:end]
-    return {"page": page, "page_size": page_size, "total": total, "offers": [i.dict() for i in items]}
+    return negotiate(request, {"page": page, "page_size": page_size, "total": len(_LEDGER), "offers": _LEDGER.page(page, page_size)})
+
+
+MAX_FIDELITY_QUBITS = 10
+
+
+def _num_qubits(max_dim: int) -> int:
+    # choose number of qubits to fit the vectors, limited to a reasonable size
+    num_qubits = int(np.ceil(np.log2(max(max_dim, 1))))
+    return min(max(num_qubits, 1), MAX_FIDELITY_QUBITS)
+
+
+@lru_cache(maxsize=MAX_FIDELITY_QUBITS)
+def _encoder(num_qubits: int) -> BiometricEncoder:
+    # encoders are stateless per qubit count; build each one once
+    return BiometricEncoder(nqubits=num_qubits)
 
 
 @app.post("/fidelity-check", response_model=FidelityResponse)
@@ -152,13 +283,9 @@ def fidelity_check(req: FidelityRequest):
 
     # If BiometricQuantumEncoder & fidelity are available, use that
     if BiometricEncoder is not None and fidelity is not None:
-        # choose number of qubits to fit both vectors
-        max_dim = max(a.size, b.size)
-        num_qubits = int(np.ceil(np.log2(max_dim)))
-        # guard: limit qubits to reasonable number (e.g., <= 10)
-        num_qubits = min(max(num_qubits, 1), 10)
+        num_qubits = _num_qubits(max(a.size, b.size))
         try:
-            enc = BiometricEncoder(num_qubits=num_qubits)
+            enc = _encoder(num_qubits)
             sa, _ = enc.encode(a.tolist())
             sb, _ = enc.encode(b.tolist())
             fid = fidelity(sa, sb)
@@ -177,34 +304,48 @@ def fidelity_check(req: FidelityRequest):
     return FidelityResponse(fidelity=proxy_fid, method="cosine-proxy")
 
 
+@app.post("/fidelity-check/batch", response_model=FidelityBatchResponse)
+def fidelity_check_batch(req: FidelityBatchRequest):
+    if req.pairs is not None:
+        left = [p.a for p in req.pairs]
+        right = [p.b for p in req.pairs]
+    elif req.probe is not None and req.candidates is not None:
+        left = [req.probe]
+        right = req.candidates
+    else:
+        raise HTTPException(status_code=400, detail="provide pairs, or probe with candidates")
+    if not right or any(len(v) == 0 for v in left + right):
+        raise HTTPException(status_code=400, detail="empty vectors")
+
+    num_qubits = _num_qubits(max(len(v) for v in left + right))
+    enc = _encoder(num_qubits)
+    try:
+        # one vectorized pass: amplitude-encode every vector, then row-wise overlaps
+        sa = enc.encode_batch(left)
+        sb = enc.encode_batch(right)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="zero-vector encountered")
+    fids = fidelity_batch(sa, sb)
+    return FidelityBatchResponse(fidelities=fids.tolist(), count=int(fids.size), num_qubits=num_qubits, method="quantum-encoder")
+
+
 @app.post("/issue-nonce")
 def issue_nonce(req: NonceRequest):
     n = secrets.token_hex(16)
-    _NONCES[n] = _now() + req.ttl_seconds
-    return {"nonce": n, "expires_at": _NONCES[n]}
+    expires_at = _now() + req.ttl_seconds
+    _STATE.put_nonce(n, expires_at)
+    return {"nonce": n, "expires_at": expires_at}
 
 
 @app.post("/verify-nonce")
 def verify_nonce(req: VerifyNonceRequest):
-    exp = _NONCES.get(req.nonce)
-    if exp is None:
-        return {"valid": False, "reason": "not_found"}
-    if _now() > exp:
-        _NONCES.pop(req.nonce, None)
-        return {"valid": False, "reason": "expired"}
-    # consume
-    _NONCES.pop(req.nonce, None)
+    # consume: pop only succeeds once and only while the nonce is live
+    if not _STATE.consume_nonce(req.nonce):
+        return {"valid": False, "reason": "not_found_or_expired"}
     return {"valid": True}
 
 # --- Prometheus metrics endpoint ---
-_REQS = Counter("oracle_requests_total", "Total requests", ["route"]) 
-_NONCES = Gauge("oracle_nonces_active", "Active nonces")
-
 @app.get("/metrics")
 def metrics():
-    try:
-        _NONCES.set(len(_NONCES._value.get() if hasattr(_NONCES, "_value") else []))
-    except Exception:
-        pass
     data = generate_latest()
     return Response(content=data, media_type=CONTENT_TYPE_LATEST)
\ No newline at end of file
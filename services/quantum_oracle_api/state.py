@@ -0,0 +1,237 @@
+"""
+Pluggable nonce/offer state for the Oracle API.
+
+- MemoryStateBackend : per-process ExpiringMaps (single worker, the old behaviour)
+- SQLiteStateBackend : one WAL-mode SQLite file shared by every worker on the host,
+                       so a nonce issued by one `uvicorn --workers N` process can be
+                       verified by another without a network store. Offer
+                       persistence must then go to DATABASE_URL: the on-disk
+                       OfferLedger is single-writer, and server.py refuses to
+                       start with this backend and no DATABASE_URL
+
+Nonce consumption is a single conditional DELETE, so exactly one caller across all
+processes sees it succeed. Expired offer ids are remembered for EXPIRED_OFFER_TTL
+seconds after their deadline so `offer_expired` can tell them from unknown ids. Select with ORACLE_STATE_BACKEND=memory|sqlite and
+ORACLE_STATE_PATH.
+"""
+
+from __future__ import annotations
+import json
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from core.mesh_network.expiring_map import ExpiringMap
+
+EXPIRED_OFFER_TTL = float(os.getenv("ORACLE_EXPIRED_OFFER_TTL", "3600"))
+
+
+class StateBackend(ABC):
+    """Interface shared by the state backends; sweeper hooks default to no-ops."""
+
+    @abstractmethod
+    def put_offer(self, offer_id: str, data: Dict, expires_at: float):
+        ...
+
+    @abstractmethod
+    def get_offer(self, offer_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def offer_expired(self, offer_id: str) -> bool:
+        """True for an offer that existed but is past its TTL (not for unknown ids)."""
+        ...
+
+    @abstractmethod
+    def put_nonce(self, nonce: str, expires_at: float):
+        ...
+
+    @abstractmethod
+    def consume_nonce(self, nonce: str) -> bool:
+        """Atomically check and delete a live nonce; True for exactly one caller."""
+        ...
+
+    @abstractmethod
+    def sweep(self) -> int:
+        ...
+
+    @abstractmethod
+    def count_offers(self) -> int:
+        ...
+
+    @abstractmethod
+    def count_nonces(self) -> int:
+        ...
+
+    def start_sweeper(self, interval: float = 1.0):
+        pass
+
+    def stop_sweeper(self):
+        pass
+
+
+class MemoryStateBackend(StateBackend):
+    def __init__(self):
+        self.offers = ExpiringMap(remember_expired=EXPIRED_OFFER_TTL)
+        self.nonces = ExpiringMap()
+
+    def put_offer(self, offer_id: str, data: Dict, expires_at: float):
+        self.offers.set(offer_id, data, expires_at=expires_at)
+
+    def get_offer(self, offer_id: str) -> Optional[Dict]:
+        return self.offers.get(offer_id)
+
+    def offer_expired(self, offer_id: str) -> bool:
+        return self.offers.expired(offer_id)
+
+    def put_nonce(self, nonce: str, expires_at: float):
+        self.nonces.set(nonce, True, expires_at=expires_at)
+
+    def consume_nonce(self, nonce: str) -> bool:
+        return self.nonces.pop(nonce, False)
+
+    def sweep(self) -> int:
+        return self.offers.sweep() + self.nonces.sweep()
+
+    def count_offers(self) -> int:
+        return len(self.offers)
+
+    def count_nonces(self) -> int:
+        return len(self.nonces)
+
+    def start_sweeper(self, interval: float = 1.0):
+        self.offers.start_sweeper(interval)
+        self.nonces.start_sweeper(interval)
+
+    def stop_sweeper(self):
+        self.offers.stop_sweeper()
+        self.nonces.stop_sweeper()
+
+
+class SQLiteStateBackend(StateBackend):
+    def __init__(
+        self,
+        path: str,
+    ):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        conn = self._conn()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS offers (offer_id TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS ix_offers_expires_at ON offers (expires_at);
+            CREATE TABLE IF NOT EXISTS expired_offers (offer_id TEXT PRIMARY KEY, forget_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS nonces (nonce TEXT PRIMARY KEY, expires_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS ix_nonces_expires_at ON nonces (expires_at);
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # one connection per thread; autocommit, WAL so readers never block the writer
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put_offer(self, offer_id: str, data: Dict, expires_at: float):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO offers (offer_id, payload, expires_at) VALUES (?, ?, ?)",
+            (offer_id, json.dumps(data), expires_at),
+        )
+        conn.execute("DELETE FROM expired_offers WHERE offer_id=?", (offer_id,))
+
+    def get_offer(self, offer_id: str) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT payload FROM offers WHERE offer_id=? AND expires_at>=?", (offer_id, time.time())
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def offer_expired(self, offer_id: str) -> bool:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT expires_at FROM offers WHERE offer_id=?", (offer_id,)).fetchone()
+        if row is not None:
+            return row[0] < now
+        row = conn.execute(
+            "SELECT 1 FROM expired_offers WHERE offer_id=? AND forget_at>=?", (offer_id, now)
+        ).fetchone()
+        return row is not None
+
+    def put_nonce(self, nonce: str, expires_at: float):
+        self._conn().execute("INSERT OR REPLACE INTO nonces (nonce, expires_at) VALUES (?, ?)", (nonce, expires_at))
+
+    def consume_nonce(self, nonce: str) -> bool:
+        cur = self._conn().execute("DELETE FROM nonces WHERE nonce=? AND expires_at>=?", (nonce, time.time()))
+        return cur.rowcount == 1
+
+    def sweep(self) -> int:
+        now = time.time()
+        conn = self._conn()
+        # move expired offers to expired_offers in one transaction so a concurrent
+        # put_offer cannot land between the copy and the delete
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM expired_offers WHERE forget_at<?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO expired_offers (offer_id, forget_at) "
+                "SELECT offer_id, expires_at + ? FROM offers WHERE expires_at<?",
+                (EXPIRED_OFFER_TTL, now),
+            )
+            removed = conn.execute("DELETE FROM offers WHERE expires_at<?", (now,)).rowcount
+            removed += conn.execute("DELETE FROM nonces WHERE expires_at<?", (now,)).rowcount
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return removed
+
+    def count_offers(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM offers WHERE expires_at>=?", (time.time(),)).fetchone()[0]
+
+    def count_nonces(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM nonces WHERE expires_at>=?", (time.time(),)).fetchone()[0]
+
+    def start_sweeper(self, interval: float = 1.0):
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.wait(interval):
+                try:
+                    self.sweep()
+                except sqlite3.OperationalError as exc:
+                    print(f"State sweep skipped: {exc}")
+
+        self._sweeper = threading.Thread(target=_run, name="oracle-state-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=2.0)
+            self._sweeper = None
+
+
+def make_backend(
+    kind: Optional[str] = None,
+    path: Optional[str] = None,
+) -> StateBackend:
+    kind = (kind or os.getenv("ORACLE_STATE_BACKEND", "memory")).lower()
+    if kind == "memory":
+        return MemoryStateBackend()
+    if kind == "sqlite":
+        return SQLiteStateBackend(path or os.getenv("ORACLE_STATE_PATH", "data/oracle-state.db"))
+    raise ValueError(f"Unknown ORACLE_STATE_BACKEND: {kind}")
@@ -0,0 +1,114 @@
+"""
+JSON-lines spill file for the write-behind repositories.
+
+While the database is unreachable, rows are appended here and replayed ahead of
+new rows once it is back. Several worker processes may share one path, so every
+append and replay holds an exclusive flock on "<path>.lock" (without fcntl only
+threads of one process are serialized). Replay streams the file in `batch_size`
+chunks instead of loading it whole; if the database goes away part way, the
+unwritten rows and the rest of the file are copied to a temp file that replaces
+the spill, so no row is written twice.
+"""
+
+from __future__ import annotations
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: in-process lock only
+    fcntl = None
+
+Row = Dict
+# write(rows) -> (rows written, rows left because the database is unreachable)
+WriteFn = Callable[[List[Row]], Tuple[int, List[Row]]]
+
+
+class SpillFile:
+    def __init__(
+        self,
+        path: str,
+        encode: Optional[Callable[[Row], Dict]] = None,
+        decode: Optional[Callable[[Dict], Row]] = None,
+    ):
+        self.path = path
+        self._encode = encode or (lambda row: row)
+        self._decode = decode or (lambda data: data)
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(f"{self.path}.lock", "a") as lock_fh:
+                if fcntl is not None:
+                    fcntl.flock(lock_fh.fileno(), fcntl.LOCK_EX)
+                yield
+
+    def _write_lines(
+        self,
+        fh: TextIO,
+        rows: List[Row],
+    ):
+        for row in rows:
+            fh.write(json.dumps(self._encode(row)) + "\n")
+
+    def append(
+        self,
+        rows: List[Row],
+    ):
+        if not rows:
+            return
+        with self._locked():
+            with open(self.path, "a", encoding="utf-8") as fh:
+                self._write_lines(fh, rows)
+
+    def _keep(
+        self,
+        left: List[Row],
+        rest: TextIO,
+    ):
+        """Replace the spill with `left` followed by the unread lines of `rest`."""
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as out:
+            self._write_lines(out, left)
+            for line in rest:
+                out.write(line)
+        os.replace(tmp, self.path)
+
+    def replay(
+        self,
+        write: WriteFn,
+        batch_size: int = 500,
+    ) -> Tuple[int, bool]:
+        """Write spilled rows in order; returns (rows written, whether the spill is now empty)."""
+        written = 0
+        with self._locked():
+            if not os.path.exists(self.path):
+                return 0, True
+            with open(self.path, encoding="utf-8") as fh:
+                batch: List[Row] = []
+                for line in fh:
+                    if line.strip():
+                        batch.append(self._decode(json.loads(line)))
+                    if len(batch) >= batch_size:
+                        count, left = write(batch)
+                        written += count
+                        if left:
+                            self._keep(left, fh)
+                            return written, False
+                        batch = []
+                if batch:
+                    count, left = write(batch)
+                    written += count
+                    if left:
+                        self._keep(left, fh)
+                        return written, False
+            os.remove(self.path)
+        return written, True
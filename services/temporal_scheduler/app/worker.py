@@ -11,6 +11,8 @@ from typing import Optional
 from web3 import Web3
 from eth_account import Account
 
+from blockchain.web3.nonce_manager import is_nonce_conflict
+
 redis_conn = redis.from_url(settings.REDIS_URL)
 repo = TimelockRepo(sync_db_url=settings.DATABASE_URL)
 
@@ -26,6 +28,22 @@ temporal_contract = w3.eth.contract(address=TEMPORAL_ADDR, abi=TEMPORAL_ABI)
 
 # Wallet
 issuer = Account.from_key(settings.ETH_PRIVATE_KEY)
+# RQ forks a work horse per job, so an in-process nonce counter would not outlive a
+# job; the issuer's next nonce is a Redis counter shared by every worker instead
+ISSUER_NONCE_KEY = f"eth:nonce:{issuer.address}"
+
+
+def allocate_issuer_nonce() -> int:
+    """Next issuer nonce; the counter is seeded from the node's pending count when missing."""
+    if not redis_conn.exists(ISSUER_NONCE_KEY):
+        redis_conn.set(ISSUER_NONCE_KEY, w3.eth.get_transaction_count(issuer.address, "pending"), nx=True)
+    return redis_conn.incr(ISSUER_NONCE_KEY) - 1
+
+
+def reset_issuer_nonce():
+    """Drop the counter so the next allocation reseeds from the node."""
+    redis_conn.delete(ISSUER_NONCE_KEY)
+
 
 def perform_on_chain_action(payload: dict) -> str:
     """
@@ -34,17 +52,24 @@ def perform_on_chain_action(payload: dict) -> str:
     """
     try:
         cred_id = int(payload["credential_id"])
-        nonce = w3.eth.get_transaction_count(issuer.address)
-
-        tx = temporal_contract.functions.claimCredential(cred_id).build_transaction({
-            "from": issuer.address,
-            "nonce": nonce,
-            "gas": 300000,
-            "gasPrice": w3.to_wei("5", "gwei"),
-        })
 
-        signed = issuer.sign_transaction(tx)
-        tx_hash = w3.eth.send_raw_transaction(signed.rawTransaction)
+        for attempt in range(3):
+            nonce = allocate_issuer_nonce()
+            try:
+                tx = temporal_contract.functions.claimCredential(cred_id).build_transaction({
+                    "from": issuer.address,
+                    "nonce": nonce,
+                    "gas": 300000,
+                    "gasPrice": w3.to_wei("5", "gwei"),
+                })
+                signed = issuer.sign_transaction(tx)
+                tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
+                break
+            except Exception as e:
+                # the nonce is taken or was never used; either way resync from the node
+                reset_issuer_nonce()
+                if not is_nonce_conflict(e) or attempt == 2:
+                    raise
         print("Sent claimCredential(%s) tx=%s", cred_id, tx_hash.hex())
         return tx_hash.hex()
 
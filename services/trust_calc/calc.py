@@ -3,23 +3,41 @@ Trust Calculator service (FastAPI) + Blockchain Oracle.
 
 Endpoints:
 - POST /compute-trust         -> Compute and persist trust score for an identity (pushes on-chain).
-- GET  /trust/{identity_id}   -> Retrieve current trust score for identity (reads from chain).
+- GET  /trust/{identity_id}   -> Retrieve current trust score for identity (reads from chain, cached).
 - GET  /rank                  -> Return ranking of identities by trust (local cache ranking).
 - POST /bulk-update           -> Accept array of measurement events to update many identities.
+                                 Each result carries "queued": true instead of a tx hash; the
+                                 hash is available later from /publish-status/{identity_id}.
+- GET  /publish-status/{identity_id} -> On-chain publication state (pending / last tx hash) for identity.
+- GET  /trust-cache           -> Read cache stats (entries, hit ratio).
+- POST /trust-cache/invalidate/{identity_id} -> Drop a cached chain read (external event feeds).
+
+On-chain pushes are queued to a background TrustPublisher; the HTTP path returns as soon
+as the update is queued. Engine state is snapshotted to TRUST_STATE_DIR every
+TRUST_CHECKPOINT_INTERVAL seconds with an update log in between, and restored on start.
+Set TRUST_CHAIN=local to run against an in-process chain stand-in.
+Chain reads go through a TTL/LRU read-through cache (TRUST_CACHE_TTL, TRUST_CACHE_SIZE),
+invalidated when this process publishes an identity and on TrustUpdated events.
+Set TRUST_EVENT_LOG_DIR to also keep every raw update input for replay (off by default;
+the log grows without bound, so rotate or archive it externally).
 """
 
 from __future__ import annotations
-import os, time
-from fastapi import FastAPI, HTTPException, Response
+import os
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import Dict, List, Optional
+from typing import List, Optional
 
-from core.identity_core.dynamic_trust import DynamicTrustEngine
+from core.identity_core.trust_checkpoint import TrustCheckpointer
+from core.identity_core.sharded_trust import ShardedTrustEngine
+from core.identity_core.event_log import TrustEventLog
 
 from blockchain.web3.trust_fabric_cli import TrustFabricClient
+from blockchain.web3.local_chain import LocalTrustFabric
 from prometheus_client import Counter, Gauge, generate_latest, CONTENT_TYPE_LATEST
 from monitoring.ml import ml_detector
+from services.fast_response import negotiate
 # Prometheus metrics
 TRUST_UPDATES = Counter("trust_updates_total", "Total number of trust score updates")
 LOW_TRUST_ALERTS = Gauge("low_trust_alerts", "Current number of low-trust identities")
@@ -34,12 +52,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-client = TrustFabricClient(
-    rpc_url=os.getenv("ETH_RPC_URL"),
-    private_key=os.getenv("ORACLE_PRIVATE_KEY"),
-    contract_addr=os.getenv("TRUSTFABRIC_CONTRACT"),
-    abi_path="blockchain/contracts/abis/TrustFabric.json"
-)
+if os.getenv("TRUST_CHAIN", "").lower() == "local":
+    client = LocalTrustFabric()
+else:
+    client = TrustFabricClient(
+        rpc_url=os.getenv("ETH_RPC_URL"),
+        private_key=os.getenv("ORACLE_PRIVATE_KEY"),
+        contract_addr=os.getenv("TRUSTFABRIC_CONTRACT"),
+        abi_path="blockchain/contracts/abis/TrustFabric.json"
+    )
 class TrustReq(BaseModel):
     identity_id: str = Field(..., example="alice")
     agreement_rate: float = Field(..., ge=0.0, le=1.0, example=0.98)
@@ -59,22 +80,77 @@ class BulkUpdateItem(BaseModel):
     biometric_fidelity: float
     witness_score: float
 
-_last_updated: Dict[str, float] = {}
-engine = DynamicTrustEngine(decay=0.9)
+# Engine state survives restarts: last snapshot + update log from TRUST_STATE_DIR
+STATE_DIR = os.getenv("TRUST_STATE_DIR", "data/trust_state")
+# TRUST_HALF_LIFE (seconds) turns on time decay: untouched scores halve every half-life
+HALF_LIFE = float(os.getenv("TRUST_HALF_LIFE", "0")) or None
+CHECKPOINT_INTERVAL = float(os.getenv("TRUST_CHECKPOINT_INTERVAL", "60"))
+# TRUST_SHARDS > 1 partitions the engine over that many worker processes
+SHARDS = int(os.getenv("TRUST_SHARDS", "1"))
+if SHARDS > 1:
+    # each shard restores and checkpoints its own partition under STATE_DIR/shard-<i>
+    engine = ShardedTrustEngine(SHARDS, decay=0.9, half_life=HALF_LIFE, state_dir=STATE_DIR, checkpoint_interval=CHECKPOINT_INTERVAL)
+    checkpointer = None
+else:
+    engine = TrustCheckpointer.restore(STATE_DIR, decay=0.9, mmap=os.getenv("TRUST_STATE_MMAP", "") == "1", half_life=HALF_LIFE)
+    checkpointer = TrustCheckpointer(engine, STATE_DIR, interval=CHECKPOINT_INTERVAL)
+# Raw update inputs, for re-deriving scores under new parameters (event_log replay).
+# Opt-in: the log is append-only with no retention, so it is only kept when
+# TRUST_EVENT_LOG_DIR is set. The sharded engine has no event log.
+if SHARDS > 1 and os.getenv("TRUST_EVENT_LOG_DIR"):
+    raise RuntimeError("TRUST_EVENT_LOG_DIR is not supported with TRUST_SHARDS > 1; unset one of them")
+EVENT_LOG_DIR = os.getenv("TRUST_EVENT_LOG_DIR", "")
+event_log = TrustEventLog(EVENT_LOG_DIR) if EVENT_LOG_DIR and SHARDS <= 1 else None
+if event_log is not None:
+    engine.event_log = event_log
+# evaluated at scrape time, so identities decaying below 0.5 are counted too
+LOW_TRUST_ALERTS.set_function(lambda: engine.count_below(0.5))
 
 from .repo import TrustRepo
+from .publisher import TrustPublisher
+from .trust_cache import TrustEventWatcher, TrustReadCache
 
 DB_URL = os.getenv("DATABASE_URL")
 trust_repo = TrustRepo(DB_URL)
 
-def push_trust_on_chain(identity_id: str, score: float, entropy: float) -> Optional[str]:
-    try:
-        tx_hash = client.publish_trust(identity_id, score, entropy)
-        print(f"Pushed trust for {identity_id} (tx={tx_hash})")
-        return tx_hash
-    except Exception as e:
-        print(f"Failed on-chain push for {identity_id}")
-        return None
+trust_cache = TrustReadCache(
+    client.get_trust,
+    ttl=float(os.getenv("TRUST_CACHE_TTL", "5")),
+    max_entries=int(os.getenv("TRUST_CACHE_SIZE", "10000")),
+)
+trust_events = TrustEventWatcher(client, trust_cache, interval=float(os.getenv("TRUST_EVENT_POLL", "2")))
+
+publisher = TrustPublisher(
+    client,
+    batch_size=int(os.getenv("TRUST_PUBLISH_BATCH", "50")),
+    interval=float(os.getenv("TRUST_PUBLISH_INTERVAL", "0.5")),
+    on_published=lambda identity_id, tx_hash: trust_cache.invalidate(identity_id),
+)
+
+
+@app.on_event("startup")
+def start_publisher():
+    publisher.start()
+    trust_events.start()
+    trust_repo.start()
+    if checkpointer is not None:
+        checkpointer.start()
+
+
+@app.on_event("shutdown")
+def stop_publisher():
+    trust_events.stop()
+    # drain whatever is still queued before the process exits
+    publisher.stop(flush=True)
+    # write out buffered audit rows (spilling to disk if the DB is gone)
+    trust_repo.close()
+    # final snapshot so the next start only has to load it
+    if checkpointer is not None:
+        checkpointer.stop(checkpoint=True)
+    else:
+        engine.close()
+    if event_log is not None:
+        event_log.close()
 
 
 @app.post("/compute-trust", response_model=TrustRes)
@@ -83,26 +159,24 @@ def compute(req: TrustReq):
         new_score, entropy = engine.update_trust(
             req.identity_id, req.agreement_rate, req.biometric_fidelity, req.witness_score
         )
-        _last_updated[req.identity_id] = time.time()
 
         # Update Prometheus metrics
         TRUST_UPDATES.inc()
-        if new_score < 0.5:
-            LOW_TRUST_ALERTS.inc()
 
         # Update ML detector
         ml_detector.add_record(req.identity_id, new_score, entropy)
 
-        # Push to blockchain
-        tx_hash = push_trust_on_chain(req.identity_id, new_score, entropy)
-        if tx_hash:
-            print("On-chain tx hash:", tx_hash)
+        # Queue for on-chain publication (tx hash via /publish-status)
+        publisher.enqueue(req.identity_id, new_score, entropy)
+
+        # Audit trail, written behind the request by the repo's flusher
+        trust_repo.record_audit(req.identity_id, new_score, entropy)
 
         return TrustRes(
             identity_id=req.identity_id,
             trust_score=float(new_score),
             entropy=float(entropy),
-            updated_at=_last_updated[req.identity_id],
+            updated_at=engine.last_updated(req.identity_id),
         )
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
@@ -110,60 +184,80 @@ def compute(req: TrustReq):
 @app.get("/trust/{identity_id}", response_model=TrustRes)
 def fetch_trust(identity_id: str):
     try:
-        # Always resolve from chain (source of truth)
-        trust_data = client.fetch_trust(identity_id)
-        if not trust_data:
-            raise HTTPException(status_code=404, detail="identity not found")
-
-        score, entropy, updated_at = trust_data
-        return TrustRes(
-            identity_id=identity_id,
-            trust_score=float(score),
-            entropy=float(entropy),
-            updated_at=updated_at,
-        )
+        # Resolve from chain (source of truth) through the read-through cache
+        trust_data = trust_cache.get(identity_id)
     except Exception as exc:
         print("Fetch trust failed")
         raise HTTPException(status_code=500, detail=str(exc))
+    # the contract returns zeros for identities it has never seen
+    if not trust_data or not trust_data[2]:
+        raise HTTPException(status_code=404, detail="identity not found")
+
+    score, entropy, updated_at = trust_data
+    return TrustRes(
+        identity_id=identity_id,
+        trust_score=score / 1e6,
+        entropy=entropy / 1e6,
+        updated_at=updated_at,
+    )
+
+
+@app.get("/trust-cache")
+def trust_cache_stats():
+    return trust_cache.stats()
+
+
+@app.post("/trust-cache/invalidate/{identity_id}")
+def invalidate_trust(identity_id: str):
+    trust_cache.invalidate(identity_id)
+    return {"identity_id": identity_id, "invalidated": True}
 
 
 @app.get("/rank")
-def rank(top: Optional[int] = None):
-    ranked = engine.rank_identities()
-    if top is not None:
-        ranked = ranked[:int(top)]
-    return {"total": len(ranked), "rank": [{"identity_id": k, "trust_score": v} for k, v in ranked]}
+def rank(request: Request, top: Optional[int] = None):
+    ranked = engine.top(top)
+    return negotiate(request, {"total": len(ranked), "rank": [{"identity_id": k, "trust_score": v} for k, v in ranked]})
+
+@app.get("/rank/{identity_id}")
+def rank_of(identity_id: str):
+    position = engine.rank_of(identity_id)
+    if position is None:
+        raise HTTPException(status_code=404, detail="identity not found")
+    return {"identity_id": identity_id, "rank": position, "total": len(engine), "trust_score": engine.get_trust(identity_id)}
 
 @app.post("/bulk-update")
-def bulk_update(items: List[BulkUpdateItem]):
-    results = []
-    for it in items:
-        try:
-            score, entropy = engine.update_trust(
-                it.identity_id, it.agreement_rate, it.biometric_fidelity, it.witness_score
-            )
-            _last_updated[it.identity_id] = time.time()
-
-            # Update Prometheus metrics
-            TRUST_UPDATES.inc()
-            if score < 0.5:
-                LOW_TRUST_ALERTS.inc()
-
-            # Update ML detector
-            ml_detector.add_record(it.identity_id, score, entropy)
-
-            # Push to blockchain
-            tx_hash = push_trust_on_chain(it.identity_id, score, entropy)
-
-            results.append({
-                "identity_id": it.identity_id,
-                "trust_score": float(score),
-                "entropy": float(entropy),
-                "tx_hash": tx_hash,
-            })
-        except Exception as exc:
-            results.append({"identity_id": it.identity_id, "error": str(exc)})
-    return {"results": results}
+def bulk_update(request: Request, items: List[BulkUpdateItem]):
+    ids = [it.identity_id for it in items]
+    try:
+        # one vectorized pass over the whole batch (repeated ids applied in order)
+        scores, entropies = engine.update_many(
+            ids,
+            [it.agreement_rate for it in items],
+            [it.biometric_fidelity for it in items],
+            [it.witness_score for it in items],
+        )
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+    # Update Prometheus metrics
+    TRUST_UPDATES.inc(len(ids))
+
+    # Update ML detector
+    ml_detector.add_records(ids, scores, entropies)
+
+    # Queue for on-chain publication; repeated ids coalesce to the latest score
+    publisher.enqueue_many(ids, scores, entropies)
+    trust_repo.record_audits(ids, scores, entropies)
+
+    results = [
+        {"identity_id": i, "trust_score": s, "entropy": e, "queued": True}
+        for i, s, e in zip(ids, scores.tolist(), entropies.tolist())
+    ]
+    return negotiate(request, {"results": results})
+
+@app.get("/publish-status/{identity_id}")
+def publish_status(identity_id: str):
+    return publisher.status(identity_id)
 
 @app.get("/metrics")
 def metrics():
@@ -0,0 +1,244 @@
+"""
+Background on-chain publisher for trust updates.
+
+The HTTP path only enqueues (identity_id, score, entropy) and returns. Pending
+updates are coalesced per identity, so an identity updated ten times before the
+next batch costs one transaction carrying its latest score. A worker thread takes
+up to `batch_size` identities every `interval` seconds (pacing), publishes them
+through the client's `update_trust_many` when it has one (nonces are assigned
+locally and the batch is sent without waiting for receipts; otherwise one
+`update_trust` per identity), retries failures with exponential backoff, and
+records each identity's latest tx hash for asynchronous lookup (an LRU map capped
+at `max_tx_hashes` identities). Every
+`gap_check_interval` seconds it asks the client to fill nonce gaps left by
+dropped transactions, which would otherwise stall everything sent after them.
+Batches are published under a lock, so a shutdown flush never overlaps a batch the
+worker thread is still sending (which would hand out nonces from two places).
+"""
+
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from prometheus_client import Counter, Gauge
+
+PUBLISH_QUEUE = Gauge("trust_publish_queue_size", "Identities waiting for on-chain publication")
+PUBLISHED = Counter("trust_published_total", "Trust updates published on-chain")
+PUBLISH_FAILURES = Counter("trust_publish_failures_total", "Failed on-chain publication attempts")
+COALESCED = Counter("trust_publish_coalesced_total", "Queued updates superseded before publication")
+
+
+@dataclass
+class PendingUpdate:
+    identity_id: str
+    score: float
+    entropy: float
+    enqueued_at: float
+    attempts: int = 0
+    not_before: float = 0.0
+
+
+class TrustPublisher:
+    def __init__(
+        self,
+        client,
+        batch_size: int = 50,
+        interval: float = 0.5,
+        max_attempts: int = 5,
+        backoff: float = 1.0,
+        on_published: Optional[Callable[[str, str], None]] = None,
+        gap_check_interval: float = 30.0,
+        max_tx_hashes: int = 100_000,
+    ):
+        self.client = client
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.on_published = on_published
+        self.gap_check_interval = gap_check_interval
+        self._last_gap_check = time.time()
+        self._pending: "OrderedDict[str, PendingUpdate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.max_tx_hashes = max_tx_hashes
+        self.tx_hashes: "OrderedDict[str, str]" = OrderedDict()
+        self._publish_lock = threading.Lock()
+
+    def enqueue(
+        self,
+        identity_id: str,
+        score: float,
+        entropy: float,
+    ):
+        with self._lock:
+            if identity_id in self._pending:
+                COALESCED.inc()
+            # keep only the latest value; it keeps its place in the queue
+            self._pending[identity_id] = PendingUpdate(identity_id, float(score), float(entropy), time.time())
+            PUBLISH_QUEUE.set(len(self._pending))
+
+    def enqueue_many(
+        self,
+        identity_ids,
+        scores,
+        entropies,
+    ):
+        """Bulk enqueue under one lock; later entries for an id win."""
+        now = time.time()
+        with self._lock:
+            for identity_id, score, entropy in zip(identity_ids, scores, entropies):
+                if identity_id in self._pending:
+                    COALESCED.inc()
+                self._pending[identity_id] = PendingUpdate(identity_id, float(score), float(entropy), now)
+            PUBLISH_QUEUE.set(len(self._pending))
+
+    def status(
+        self,
+        identity_id: str,
+    ) -> Dict:
+        with self._lock:
+            pending = self._pending.get(identity_id)
+            tx_hash = self.tx_hashes.get(identity_id)
+        return {
+            "identity_id": identity_id,
+            "pending": pending is not None,
+            "attempts": pending.attempts if pending else 0,
+            "tx_hash": tx_hash,
+        }
+
+    def queued(self) -> int:
+        return len(self._pending)
+
+    def _take_batch(self):
+        now = time.time()
+        ready = []
+        with self._lock:
+            # walk only as far as needed; items backing off are skipped in place
+            for identity_id, upd in self._pending.items():
+                if len(ready) >= self.batch_size:
+                    break
+                if upd.not_before <= now:
+                    ready.append(identity_id)
+            batch = [self._pending.pop(identity_id) for identity_id in ready]
+            PUBLISH_QUEUE.set(len(self._pending))
+        return batch
+
+    def _retry(
+        self,
+        upd: PendingUpdate,
+    ):
+        upd.attempts += 1
+        if upd.attempts >= self.max_attempts:
+            print(f"Giving up on-chain push for {upd.identity_id} after {upd.attempts} attempts")
+            return
+        upd.not_before = time.time() + self.backoff * (2 ** (upd.attempts - 1))
+        with self._lock:
+            # a newer value queued meanwhile supersedes the failed one
+            self._pending.setdefault(upd.identity_id, upd)
+            PUBLISH_QUEUE.set(len(self._pending))
+
+    def _record(
+        self,
+        identity_id: str,
+        tx_hash: str,
+    ):
+        with self._lock:
+            self.tx_hashes[identity_id] = tx_hash
+            self.tx_hashes.move_to_end(identity_id)
+            while len(self.tx_hashes) > self.max_tx_hashes:
+                self.tx_hashes.popitem(last=False)
+
+    def publish_batch(self) -> int:
+        """Publish one batch synchronously; returns the number of successful txs."""
+        with self._publish_lock:
+            return self._publish_batch_locked()
+
+    def _publish_batch_locked(self) -> int:
+        published = 0
+        batch = self._take_batch()
+        update_many = getattr(self.client, "update_trust_many", None)
+        if batch and update_many is not None:
+            try:
+                tx_hashes = update_many([(u.identity_id, u.score, u.entropy) for u in batch])
+            except Exception as exc:
+                print(f"On-chain batch push of {len(batch)} updates raised: {exc}")
+                tx_hashes = [None] * len(batch)
+        else:
+            tx_hashes = []
+            for upd in batch:
+                try:
+                    tx_hashes.append(self.client.update_trust(upd.identity_id, upd.score, upd.entropy))
+                except Exception as exc:
+                    print(f"On-chain push for {upd.identity_id} raised: {exc}")
+                    tx_hashes.append(None)
+        for upd, tx_hash in zip(batch, tx_hashes):
+            if not tx_hash:
+                PUBLISH_FAILURES.inc()
+                self._retry(upd)
+                continue
+            published += 1
+            PUBLISHED.inc()
+            self._record(upd.identity_id, tx_hash)
+            if self.on_published is not None:
+                self.on_published(upd.identity_id, tx_hash)
+        return published
+
+    def flush(
+        self,
+        timeout: float = 30.0,
+    ):
+        """Publish until the queue is empty (or `timeout` passes); used on shutdown."""
+        deadline = time.time() + timeout
+        while self._pending and time.time() < deadline:
+            if not self.publish_batch():
+                time.sleep(min(self.interval, 0.1))
+
+    def check_gaps(self) -> int:
+        fill = getattr(self.client, "fill_nonce_gaps", None)
+        self._last_gap_check = time.time()
+        if fill is None:
+            return 0
+        try:
+            filled = fill()
+        except Exception as exc:
+            print(f"Nonce gap check failed: {exc}")
+            return 0
+        if filled:
+            print(f"Filled {filled} nonce gap(s) on the publishing account")
+        return filled
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.publish_batch()
+            if time.time() - self._last_gap_check >= self.gap_check_interval:
+                self.check_gaps()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="trust-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(
+        self,
+        flush: bool = True,
+    ):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            if self._thread.is_alive():
+                print("Trust publisher thread still sending; flush waits for its batch")
+            self._thread = None
+        if flush:
+            # publish_batch holds the publish lock, so this waits out an in-flight batch
+            self.flush()
@@ -1,48 +1,430 @@
-from typing import Optional, List
-import psycopg2
+"""
+Trust audit repository.
+
+SQLAlchemy Core over a pooled engine (sized pool, pre-ping, recycle), so the same
+code runs on MySQL (docker-compose), Postgres and SQLite, and every call checks a
+connection out of the pool instead of sharing one socket across the threadpool.
+
+- TrustRepo: sync; audit rows are written behind the request path by a flusher
+  thread (multi-row INSERT per batch, JSON-lines spill file while the DB is down;
+  the spill is flock-guarded, so uvicorn workers can share one path).
+- AsyncTrustRepo: the same table on an asyncio engine (aiosqlite / asyncpg /
+  aiomysql drivers); the monitoring service's async /audit endpoint reads
+  through it, so history queries never block its event loop.
+
+History reads are keyset-paginated newest-first on (updated_at, id) within one
+identity, backed by a composite (identity_id, updated_at, id) index: a page is one
+index range scan of `limit` rows however long the history is. `iter_history`
+walks the same pages for streaming, one short query per chunk.
+"""
+
+from typing import AsyncIterator, Dict, Iterator, Optional, List, Tuple
+import base64
+import json
 import os
+import threading
 from datetime import datetime
 
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table,
+    and_,
+    create_engine,
+    or_,
+    select,
+)
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DisconnectionError, InterfaceError, OperationalError
+
+from services.spill_file import SpillFile
+
+DEFAULT_DB_URL = "sqlite:///data/trust_audit.db"
+
+metadata = MetaData()
+
+trust_audit = Table(
+    "trust_audit",
+    metadata,
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("identity_id", String(64), nullable=False),
+    Column("trust_score", Numeric(10, 6, asdecimal=False), nullable=False),
+    Column("entropy", Numeric(10, 6, asdecimal=False), nullable=False),
+    Column("updated_at", DateTime, nullable=False, default=datetime.utcnow),
+    Column("tx_hash", String(66)),
+    Index("ix_trust_audit_identity_updated", "identity_id", "updated_at", "id"),
+)
+
+# errors meaning "the database is unreachable", as opposed to a row it rejects
+DB_UNAVAILABLE = (OperationalError, InterfaceError, DisconnectionError)
+
+# async driver per sync dialect
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+
+def _engine_kwargs(
+    db_url: str,
+    pool_size: int,
+    max_overflow: int,
+) -> Dict:
+    kwargs = {"pool_pre_ping": True}
+    if make_url(db_url).get_backend_name() == "sqlite":
+        kwargs["connect_args"] = {"check_same_thread": False}
+        database = make_url(db_url).database
+        if database and database != ":memory:":
+            os.makedirs(os.path.dirname(database) or ".", exist_ok=True)
+    else:
+        kwargs.update(pool_size=pool_size, max_overflow=max_overflow, pool_recycle=1800)
+    return kwargs
+
+
+def async_url(db_url: str) -> str:
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db, mysql+pymysql://... -> mysql+aiomysql://..."""
+    url = make_url(db_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        return db_url
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+
+def _audit_row(identity_id: str, trust_score: float, entropy: float, updated_at: datetime, tx_hash: Optional[str]) -> Dict:
+    return {
+        "identity_id": identity_id,
+        "trust_score": float(trust_score),
+        "entropy": float(entropy),
+        "updated_at": updated_at,
+        "tx_hash": tx_hash,
+    }
+
+
+def _spill_encode(row: Dict) -> Dict:
+    return dict(row, updated_at=row["updated_at"].isoformat())
+
+
+def _spill_decode(data: Dict) -> Dict:
+    return dict(data, updated_at=datetime.fromisoformat(data["updated_at"]))
+
+
+def encode_cursor(updated_at: datetime, row_id: int) -> str:
+    raw = json.dumps([updated_at.isoformat(), row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        updated_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(updated_at), int(row_id)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def _history_query(
+    identity_id: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """Newest-first rows strictly after `cursor`, with since <= updated_at < until."""
+    t = trust_audit
+    stmt = select(t.c.id, t.c.trust_score, t.c.entropy, t.c.updated_at, t.c.tx_hash).where(t.c.identity_id == identity_id)
+    if since is not None:
+        stmt = stmt.where(t.c.updated_at >= since)
+    if until is not None:
+        stmt = stmt.where(t.c.updated_at < until)
+    if cursor:
+        updated_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(t.c.updated_at < updated_at, and_(t.c.updated_at == updated_at, t.c.id < row_id)))
+    stmt = stmt.order_by(t.c.updated_at.desc(), t.c.id.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def _history_dict(r) -> Dict:
+    return {"trust_score": r.trust_score, "entropy": r.entropy, "updated_at": r.updated_at, "tx_hash": r.tx_hash}
+
+
+def _history_page(rows, limit: int) -> Dict:
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].updated_at, rows[-1].id) if has_more else None
+    return {"limit": limit, "next_cursor": next_cursor, "history": [_history_dict(r) for r in rows]}
+
+
 class TrustRepo:
-    def __init__(self, db_url: str):
-        self.db_url = db_url
-        self.conn = psycopg2.connect(db_url)
-        self.conn.autocommit = True
+    """
+    Audit rows are written behind the request path: `record_audit` appends to an
+    in-memory buffer and a flusher thread writes it with one multi-row INSERT
+    whenever `batch_size` rows are waiting or `flush_interval` seconds pass. If the
+    DB is unreachable the batch is appended to a local JSON-lines spill file, which
+    is replayed ahead of new rows once the DB is back. A batch the DB rejects for
+    its data (integrity / data errors) is retried row by row and the rows that still
+    fail go to a quarantine file, so one bad row never blocks the rest. `close()`
+    flushes.
+    """
+
+    def __init__(
+        self,
+        db_url: Optional[str] = None,
+        pool_size: int = 10,
+        max_overflow: int = 20,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        spill_path: Optional[str] = None,
+        quarantine_path: Optional[str] = None,
+    ):
+        self.db_url = db_url or DEFAULT_DB_URL
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path or os.getenv("TRUST_AUDIT_SPILL", "data/trust_audit.spill.jsonl")
+        self.quarantine_path = quarantine_path or os.getenv("TRUST_AUDIT_QUARANTINE", "data/trust_audit.quarantine.jsonl")
+        self._spill_file = SpillFile(self.spill_path, encode=_spill_encode, decode=_spill_decode)
+        self._buffer: List[Dict] = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self.engine = create_engine(self.db_url, **_engine_kwargs(self.db_url, pool_size, max_overflow))
         self._ensure_table()
 
     def _ensure_table(self):
         """Create the trust_audit table if it does not exist."""
-        with self.conn.cursor() as cur:
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS trust_audit (
-                    id SERIAL PRIMARY KEY,
-                    identity_id VARCHAR(64) NOT NULL,
-                    trust_score NUMERIC(10,6) NOT NULL,
-                    entropy NUMERIC(10,6) NOT NULL,
-                    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
-                    tx_hash VARCHAR(66)
-                );
-            """)
+        metadata.create_all(self.engine)
+        # create_all only builds indexes with new tables; add it to pre-existing ones
+        for index in trust_audit.indexes:
+            index.create(self.engine, checkfirst=True)
         print("TrustRepo: table 'trust_audit' ensured.")
 
     def insert_audit(self, identity_id: str, trust_score: float, entropy: float, tx_hash: Optional[str] = None):
-        with self.conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO trust_audit (identity_id, trust_score, entropy, updated_at, tx_hash)
-                VALUES (%s, %s, %s, %s, %s)
-                """,
-                (identity_id, trust_score, entropy, datetime.utcnow(), tx_hash)
-            )
-
-    def fetch_history(self, identity_id: str) -> List[dict]:
-        with self.conn.cursor() as cur:
-            cur.execute(
-                "SELECT trust_score, entropy, updated_at, tx_hash FROM trust_audit WHERE identity_id=%s ORDER BY updated_at DESC",
-                (identity_id,)
-            )
-            rows = cur.fetchall()
-            return [
-                {"trust_score": r[0], "entropy": r[1], "updated_at": r[2], "tx_hash": r[3]}
-                for r in rows
-            ]
+        """Synchronous single-row insert (bypasses the write-behind buffer)."""
+        with self.engine.begin() as conn:
+            conn.execute(trust_audit.insert(), _audit_row(identity_id, trust_score, entropy, datetime.utcnow(), tx_hash))
+
+    # --- write-behind audit --- #
+    def record_audit(self, identity_id: str, trust_score: float, entropy: float, tx_hash: Optional[str] = None):
+        self.record_audits([identity_id], [trust_score], [entropy], tx_hash)
+
+    def record_audits(self, identity_ids, trust_scores, entropies, tx_hash: Optional[str] = None):
+        """Buffer one audit row per update; never touches the DB on the caller's thread."""
+        now = datetime.utcnow()
+        rows = [_audit_row(i, s, e, now, tx_hash) for i, s, e in zip(identity_ids, trust_scores, entropies)]
+        with self._buffer_lock:
+            self._buffer.extend(rows)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def _write(self, rows: List[Dict]):
+        with self.engine.begin() as conn:
+            for start in range(0, len(rows), self.batch_size):
+                conn.execute(trust_audit.insert(), rows[start:start + self.batch_size])
+
+    def _write_rows(self, rows: List[Dict]) -> Tuple[int, List[Dict]]:
+        """
+        Write `rows`; returns (rows written, rows left because the DB is unreachable).
+        A batch rejected for any other reason is retried one row at a time and the
+        rows that still fail are quarantined.
+        """
+        try:
+            self._write(rows)
+            return len(rows), []
+        except DB_UNAVAILABLE:
+            return 0, rows
+        except Exception as exc:
+            print(f"TrustRepo: audit batch of {len(rows)} rows rejected ({exc}); retrying row by row")
+        written = 0
+        rejected: List[Tuple[Dict, str]] = []
+        for k, row in enumerate(rows):
+            try:
+                self._write([row])
+                written += 1
+            except DB_UNAVAILABLE:
+                self._quarantine(rejected)
+                return written, rows[k:]
+            except Exception as exc:
+                rejected.append((row, str(exc).splitlines()[0]))
+        self._quarantine(rejected)
+        return written, []
+
+    def _spill(self, rows: List[Dict]):
+        self._spill_file.append(rows)
+
+    def _quarantine(self, rejected: List[Tuple[Dict, str]]):
+        if not rejected:
+            return
+        SpillFile(self.quarantine_path, encode=_spill_encode).append([dict(row, error=error) for row, error in rejected])
+        print(f"TrustRepo: quarantined {len(rejected)} audit rows the DB rejected to {self.quarantine_path} (first error: {rejected[0][1]})")
+
+    def _replay_spill(self) -> Tuple[int, bool]:
+        """Write spilled rows first; returns (rows written, whether the spill is now empty)."""
+        written, drained = self._spill_file.replay(self._write_rows, self.batch_size)
+        if written:
+            print(f"TrustRepo: replayed {written} spilled audit rows.")
+        return written, drained
+
+    def flush(self) -> int:
+        """Write everything buffered so far (spilling while the DB is down); returns rows written to the DB."""
+        with self._flush_lock:
+            with self._buffer_lock:
+                rows, self._buffer = self._buffer, []
+            # spilled rows are older, so they go in first
+            written, drained = self._replay_spill()
+            left = rows
+            if rows and drained:
+                count, left = self._write_rows(rows)
+                written += count
+            if left:
+                print(f"TrustRepo: database unavailable; spilling {len(left)} audit rows to {self.spill_path}")
+                self._spill(left)
+            return written
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._buffer or self._spill_file.exists():
+                self.flush()
+
+    def start(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        self._stop.clear()
+        self._flusher = threading.Thread(target=self._run, name="trust-audit-flusher", daemon=True)
+        self._flusher.start()
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5.0)
+            self._flusher = None
+        self.flush()
+        self.engine.dispose()
+
+    def fetch_history(
+        self,
+        identity_id: str,
+        limit: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[dict]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(_history_query(identity_id, limit, None, since, until)).all()
+        return [_history_dict(r) for r in rows]
+
+    def history_page(
+        self,
+        identity_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict:
+        """One newest-first page; pass `next_cursor` back for the next one (None on the last page)."""
+        with self.engine.connect() as conn:
+            rows = conn.execute(_history_query(identity_id, limit + 1, cursor, since, until)).all()
+        return _history_page(rows, limit)
+
+    def iter_history(
+        self,
+        identity_id: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        chunk: int = 1000,
+    ) -> Iterator[dict]:
+        """All matching rows, newest first, fetched `chunk` at a time."""
+        cursor = None
+        while True:
+            page = self.history_page(identity_id, chunk, cursor, since, until)
+            yield from page["history"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+
+
+class AsyncTrustRepo:
+    """Same table on an asyncio engine; call `await repo.init()` once before use."""
+
+    def __init__(
+        self,
+        db_url: Optional[str] = None,
+        pool_size: int = 10,
+        max_overflow: int = 20,
+    ):
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        self.db_url = async_url(db_url or DEFAULT_DB_URL)
+        kwargs = _engine_kwargs(db_url or DEFAULT_DB_URL, pool_size, max_overflow)
+        kwargs.pop("connect_args", None)
+        self.engine = create_async_engine(self.db_url, **kwargs)
+
+    async def init(self):
+        async with self.engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+            for index in trust_audit.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
+
+    async def insert_audit(self, identity_id: str, trust_score: float, entropy: float, tx_hash: Optional[str] = None):
+        await self.insert_audits([identity_id], [trust_score], [entropy], tx_hash)
+
+    async def insert_audits(self, identity_ids, trust_scores, entropies, tx_hash: Optional[str] = None):
+        now = datetime.utcnow()
+        rows = [_audit_row(i, s, e, now, tx_hash) for i, s, e in zip(identity_ids, trust_scores, entropies)]
+        if not rows:
+            return
+        async with self.engine.begin() as conn:
+            await conn.execute(trust_audit.insert(), rows)
+
+    async def fetch_history(
+        self,
+        identity_id: str,
+        limit: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[dict]:
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(_history_query(identity_id, limit, None, since, until))).all()
+        return [_history_dict(r) for r in rows]
+
+    async def history_page(
+        self,
+        identity_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict:
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(_history_query(identity_id, limit + 1, cursor, since, until))).all()
+        return _history_page(rows, limit)
+
+    async def iter_history(
+        self,
+        identity_id: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        chunk: int = 1000,
+    ) -> AsyncIterator[dict]:
+        """All matching rows, newest first, fetched `chunk` at a time."""
+        cursor = None
+        while True:
+            page = await self.history_page(identity_id, chunk, cursor, since, until)
+            for row in page["history"]:
+                yield row
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+
+    async def close(self):
+        await self.engine.dispose()
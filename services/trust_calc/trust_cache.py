@@ -0,0 +1,176 @@
+"""
+Read-through cache for on-chain trust reads.
+
+`GET /trust/{identity_id}` costs an eth_call per request; hot identities are read
+far more often than they change. TrustReadCache sits in front of the loader:
+
+- entries expire `ttl` seconds after they were loaded and the cache is bounded to
+  `max_entries` with LRU eviction;
+- concurrent misses for the same key are coalesced: one caller loads, the rest
+  wait on its result;
+- `invalidate(key)` drops an entry; it is called when this process publishes an
+  update (TrustPublisher.on_published) and by TrustEventWatcher for TrustUpdated
+  events emitted by anyone else. A load that was already in flight when its key
+  was invalidated is returned to its waiters but not stored.
+"""
+
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+CACHE_HITS = Counter("trust_cache_hits_total", "Trust reads served from cache")
+CACHE_MISSES = Counter("trust_cache_misses_total", "Trust reads that went to the chain")
+CACHE_COALESCED = Counter("trust_cache_coalesced_total", "Trust misses that waited on an in-flight load")
+CACHE_INVALIDATIONS = Counter("trust_cache_invalidations_total", "Trust cache entries invalidated")
+CACHE_HIT_RATIO = Gauge("trust_cache_hit_ratio", "Trust cache hit ratio since start")
+
+
+class TrustReadCache:
+    def __init__(
+        self,
+        loader: Callable[[Hashable], Any],
+        ttl: float = 5.0,
+        max_entries: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._generation: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        CACHE_HIT_RATIO.set_function(self.hit_ratio)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hit_ratio(),
+        }
+
+    def get(
+        self,
+        key: Hashable,
+    ) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                CACHE_HITS.inc()
+                return entry[1]
+            self.misses += 1
+            CACHE_MISSES.inc()
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                self._inflight[key] = fut
+                generation = self._generation.get(key, 0)
+            else:
+                CACHE_COALESCED.inc()
+
+        if not owner:
+            return fut.result()
+
+        try:
+            value = self.loader(key)
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+            fut.set_exception(exc)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+            if self._generation.get(key, 0) == generation:
+                self._entries[key] = (self.clock() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        fut.set_result(value)
+        return value
+
+    def invalidate(
+        self,
+        key: Hashable,
+    ):
+        with self._lock:
+            self._entries.pop(key, None)
+            if key in self._inflight:
+                # the in-flight load may have read the old value; don't store it
+                self._generation[key] = self._generation.get(key, 0) + 1
+            else:
+                self._generation.pop(key, None)
+        CACHE_INVALIDATIONS.inc()
+
+    def clear(self):
+        with self._lock:
+            for key in self._inflight:
+                self._generation[key] = self._generation.get(key, 0) + 1
+            self._entries.clear()
+
+
+class TrustEventWatcher:
+    """
+    Polls the client for TrustUpdated events and invalidates the affected keys, so
+    updates published by other oracles are not served stale for a full TTL.
+    """
+
+    def __init__(
+        self,
+        client,
+        cache: TrustReadCache,
+        interval: float = 2.0,
+    ):
+        self.client = client
+        self.cache = cache
+        self.interval = interval
+        self._cursor: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> int:
+        """One poll; returns the number of identities invalidated."""
+        ids, self._cursor = self.client.poll_trust_updates(self._cursor)
+        for identity_id in set(ids):
+            self.cache.invalidate(identity_id)
+        return len(ids)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as exc:
+                print(f"TrustEventWatcher: poll failed: {exc}")
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="trust-event-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from core.quantum_engine.biometric_quantum import BiometricEncoder, fidelity, fidelity_batch
+
+
+def test_batch_matches_single_on_oversized_vectors():
+    enc = BiometricEncoder(2)
+    rng = np.random.default_rng(7)
+    lefts = [rng.normal(size=enc.dim + 5) for _ in range(4)]
+    rights = [rng.normal(size=enc.dim + 3) for _ in range(4)]
+
+    batch = fidelity_batch(enc.encode_batch(lefts), enc.encode_batch(rights))
+    single = [fidelity(enc.encode(a)[0], enc.encode(b)[0]) for a, b in zip(lefts, rights)]
+
+    assert np.allclose(batch, single, atol=1e-6)
+    for vec, state in zip(lefts, enc.encode_batch(lefts)):
+        assert np.allclose(state, enc.encode(vec)[0], atol=1e-6)
+
+
+def test_batch_rejects_zero_vectors():
+    enc = BiometricEncoder(2)
+    with pytest.raises(ValueError):
+        enc.encode_batch([[0.0] * enc.dim])
+    with pytest.raises(ValueError):
+        enc.encode_batch([[0.0] * enc.dim + [5.0]])
+
+
+def test_batch_handles_ragged_and_short_vectors():
+    enc = BiometricEncoder(3)
+    vecs = [[0.3, 0.1], [0.2] * 3, list(range(1, enc.dim + 4))]
+    states = enc.encode_batch(vecs)
+    assert states.shape == (3, enc.dim)
+    assert np.allclose(np.linalg.norm(states, axis=1), 1.0)
+    for vec, state in zip(vecs, states):
+        assert np.allclose(state, enc.encode(vec)[0], atol=1e-6)
+    assert enc.encode_batch([]).shape == (0, enc.dim)
@@ -0,0 +1,32 @@
+from core.mesh_network.consensus_cluster import ConsensusCluster, PreparedRound
+
+
+def _round(cluster, n):
+    offer = cluster.oracle.create_offer(tuple(range(n)), kind="ghz", ttl_sec=30)
+    prepared = PreparedRound(
+        offer=offer,
+        shard_indxs=tuple(range(n)),
+        locked_nodes=set(),
+        sample_list=["0" * n] * 64 + ["1" * n] * 64,
+    )
+    return prepared, cluster.sign_round(prepared)
+
+
+def test_tree_mode_matches_flat_and_keeps_reports():
+    n = 12
+    flat = ConsensusCluster(n, signing_method="hmac")
+    tree = ConsensusCluster(n, signing_method="hmac", aggregation="tree", fan_out=4, agg_workers=3)
+    try:
+        prepared, reports = _round(tree, n)
+        tree_decision = tree.finalize_round(prepared, reports)
+        flat_decision = flat.finalize_round(prepared, reports)
+
+        assert tree_decision.metrics["partials"] == 4
+        assert tree_decision.achieved == flat_decision.achieved
+        assert [r["node_id"] for r in tree_decision.raw_reports] == [f"node-{i}" for i in range(n)]
+        assert tree_decision.raw_reports == flat_decision.raw_reports
+        assert tree_decision.metrics["aggregate"]["num_reports"] == n
+        assert tree._agg_pool is not None
+    finally:
+        flat.shutdown()
+        tree.shutdown()
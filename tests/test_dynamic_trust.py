@@ -0,0 +1,139 @@
+import threading
+import types
+
+import numpy as np
+import pytest
+
+from core.identity_core import dynamic_trust
+from core.identity_core.dynamic_trust import DynamicTrustEngine
+
+
+def _run_threads(target, n_threads):
+    barrier = threading.Barrier(n_threads)
+
+    def run(t):
+        barrier.wait()
+        target(t)
+
+    threads = [threading.Thread(target=run, args=(t,)) for t in range(n_threads)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+
+def test_concurrent_new_identities_get_distinct_slots():
+    engine = DynamicTrustEngine(capacity=4)
+    n_threads, per_thread = 8, 3000
+    results = {}
+
+    def worker(t):
+        for i in range(per_thread):
+            identity_id = f"t{t}-{i}"
+            a = (t * per_thread + i) / (n_threads * per_thread)
+            results[identity_id] = engine.update_trust(identity_id, a, 0.5, 0.25)[0]
+
+    _run_threads(worker, n_threads)
+
+    assert len(engine) == n_threads * per_thread
+    assert len(set(engine._index.values())) == n_threads * per_thread
+    for identity_id, slot in engine._index.items():
+        assert engine._ids[slot] == identity_id
+        assert engine.get_trust(identity_id) == results[identity_id]
+    assert len(engine.ranking) == n_threads * per_thread
+
+
+def test_concurrent_update_many_keeps_every_write():
+    engine = DynamicTrustEngine(capacity=4)
+    n_threads, batches, batch = 8, 20, 150
+
+    def worker(t):
+        rng = np.random.default_rng(t)
+        for b in range(batches):
+            ids = [f"t{t}-{b}-{i}" for i in range(batch)]
+            engine.update_many(ids, *rng.random((3, batch)))
+
+    _run_threads(worker, n_threads)
+
+    total = n_threads * batches * batch
+    assert len(engine) == total
+    assert len(set(engine._index.values())) == total
+    # a write into a column that _reserve swapped out would leave NaN behind
+    assert not np.isnan(engine.scores()).any()
+
+
+def test_update_many_matches_sequential_updates():
+    ids = ["a", "b", "a", "c", "a", "b"]
+    values = np.random.default_rng(0).random((3, len(ids)))
+    batched = DynamicTrustEngine()
+    scores, _ = batched.update_many(ids, *values)
+    sequential = DynamicTrustEngine()
+    expected = [sequential.update_trust(i, *values[:, k])[0] for k, i in enumerate(ids)]
+    np.testing.assert_allclose(scores, expected)
+
+
+class _Clock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def _fixed_clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(dynamic_trust, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+def test_score_halves_every_half_life(monkeypatch):
+    clock = _fixed_clock(monkeypatch)
+    engine = DynamicTrustEngine(half_life=100.0)
+    score, _ = engine.update_trust("a", 0.9, 0.8, 0.7)
+    t0 = clock.now
+    for k in range(1, 5):
+        assert engine.get_trust("a", now=t0 + 100.0 * k) == pytest.approx(score / 2 ** k)
+    clock.now = t0 + 250.0
+    assert engine.top(1)[0][1] == pytest.approx(score / 2 ** 2.5)
+    assert engine.scores()[0] == pytest.approx(score / 2 ** 2.5)
+
+
+def test_decayed_rank_order_matches_eager_recomputation(monkeypatch):
+    clock = _fixed_clock(monkeypatch)
+    rng = np.random.default_rng(5)
+    engine = DynamicTrustEngine(half_life=60.0)
+    ids = [f"id-{i}" for i in range(200)]
+    # updates spread over several half-lives, so stale high scores fall behind fresh ones
+    for step in range(40):
+        clock.now += float(rng.uniform(1.0, 30.0))
+        batch = [ids[k] for k in rng.integers(0, len(ids), size=15)]
+        engine.update_many(batch, *rng.random((3, len(batch))))
+    now = clock.now + 45.0
+
+    eager = {
+        i: engine._score[engine._index[i]] * 0.5 ** ((now - engine.last_updated(i)) / 60.0)
+        for i in engine._ids
+    }
+    expected = sorted(eager, key=lambda i: -eager[i])
+    assert [i for i, _ in engine.top(now=now)] == expected
+    for i, s in engine.top(20, now=now):
+        assert s == pytest.approx(eager[i])
+    assert [i for i, _ in engine.bottom(5, now=now)] == expected[::-1][:5]
+    assert [engine.rank_of(i) for i in expected[:10]] == list(range(1, 11))
+    values = sorted(eager.values())
+    # thresholds between neighbouring scores; an exact tie would compare rounding, not order
+    mids = [(values[k] + values[k + 1]) / 2 for k in (0, len(values) // 4, len(values) // 2, len(values) - 2)]
+    for threshold in mids + [0.0, 1.0]:
+        assert engine.count_below(threshold, now=now) == sum(v < threshold for v in eager.values())
+        assert engine.count_above(threshold, now=now) == sum(v > threshold for v in eager.values())
+
+
+def test_rank_index_keys_live_in_the_engine_column():
+    engine = DynamicTrustEngine(capacity=2)
+    engine.update_many(["a", "b", "c"], [0.9, 0.1, 0.5], [0.9, 0.1, 0.5], [0.9, 0.1, 0.5])
+    engine.update_trust("b", 1.0, 1.0, 1.0)
+    assert not isinstance(engine.ranking._scores, dict)
+    n = len(engine)
+    assert np.array_equal(engine._rank_key[:n], engine._score[:n])
+    assert [i for i, _ in engine.top()] == [i for i, _ in engine.rank_identities()]
+    assert engine.rank_of("a") == 1 and engine.rank_of("missing") is None
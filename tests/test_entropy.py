@@ -0,0 +1,25 @@
+from services.quantum_oracle_api.entropy import EntropyPool
+
+
+def test_reads_span_refills_and_never_repeat_bytes():
+    pool = EntropyPool(block_size=4096)
+    first = pool.read(3000)
+    second = pool.read(3000)
+    assert len(first) == len(second) == 3000
+    assert pool.refills == 2
+    assert bytes(first) != bytes(second)
+    assert pool.bytes_served == 6000
+
+
+def test_read_result_is_not_overwritten_by_a_refill():
+    pool = EntropyPool(block_size=1024)
+    out = pool.read(512)
+    kept = bytes(out)
+    pool.read(4096)
+    assert bytes(out) == kept
+
+
+def test_stream_yields_exactly_n_bytes():
+    pool = EntropyPool(block_size=4096)
+    chunks = list(pool.stream(10_000, chunk_size=3000))
+    assert [len(c) for c in chunks] == [3000, 3000, 3000, 1000]
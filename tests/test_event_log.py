@@ -0,0 +1,73 @@
+import types
+
+import numpy as np
+import pytest
+
+from core.identity_core import dynamic_trust
+from core.identity_core.dynamic_trust import DynamicTrustEngine
+from core.identity_core.event_log import TrustEventLog, TrustParams, open_events, read_ids, replay
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(dynamic_trust, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+def _drive(engine, clock, rng, n_ids=40, steps=30):
+    """Mixed single and batched updates (with repeated ids) at irregular times."""
+    ids = [f"id-{i}" for i in range(n_ids)]
+    for step in range(steps):
+        clock.now += float(rng.uniform(0.5, 20.0))
+        if step % 3 == 0:
+            i = ids[int(rng.integers(n_ids))]
+            engine.update_trust(i, *rng.random(3).tolist())
+        else:
+            batch = [ids[k] for k in rng.integers(0, n_ids, size=12)]
+            a, b, w = rng.random((3, len(batch)))
+            engine.update_many(batch, a, b, w)
+    return sorted(set(engine._ids))
+
+
+@pytest.mark.parametrize("half_life", [None, 30.0])
+@pytest.mark.parametrize("chunk", [7, 1_000_000])
+def test_replay_matches_live_engine(tmp_path, clock, half_life, chunk):
+    live = DynamicTrustEngine(decay=0.8, half_life=half_life)
+    log = TrustEventLog(str(tmp_path))
+    live.event_log = log
+    seen = _drive(live, clock, np.random.default_rng(3))
+    log.close()
+
+    replayed = replay(str(tmp_path), TrustParams(decay=0.8, half_life=half_life), chunk=chunk)
+    now = clock.now + 5.0
+    assert len(replayed) == len(live)
+    for i in seen:
+        assert replayed.get_trust(i, now=now) == pytest.approx(live.get_trust(i, now=now), rel=1e-9)
+        assert replayed.get_entropy(i) == pytest.approx(live.get_entropy(i))
+        assert replayed.last_updated(i) == live.last_updated(i)
+    assert [i for i, _ in replayed.top(10, now=now)] == [i for i, _ in live.top(10, now=now)]
+
+
+def test_reopen_keeps_ids_and_drops_torn_record(tmp_path):
+    log = TrustEventLog(str(tmp_path))
+    log.append(["a", "b"], [0.1, 0.2], [0.3, 0.4], [0.5, 0.6], [1.0, 2.0])
+    log.close()
+    with open(tmp_path / "events.bin", "ab") as fh:
+        fh.write(b"\x01\x02\x03")
+
+    log = TrustEventLog(str(tmp_path))
+    log.append(["b", "c"], [0.7, 0.8], [0.9, 1.0], [0.1, 0.2], [3.0, 4.0])
+    log.close()
+    assert read_ids(str(tmp_path)) == ["a", "b", "c"]
+    events = open_events(str(tmp_path))
+    assert events["identity"].tolist() == [0, 1, 1, 2]
+    assert events["ts"].tolist() == [1.0, 2.0, 3.0, 4.0]
@@ -0,0 +1,70 @@
+from core.mesh_network.expiring_map import ExpiringMap
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_values_skip_expired_entries_before_sweep():
+    clock = Clock()
+    m = ExpiringMap(clock=clock)
+    m.set("short", "a", ttl=5)
+    m.set("long", "b", ttl=60)
+    assert sorted(m.values()) == ["a", "b"]
+
+    clock.now += 10
+    assert list(m.values()) == ["b"]
+    assert m.get("short") is None
+    assert m.sweep() == 0
+    assert list(m.values()) == ["b"]
+
+
+def test_sweep_evicts_in_expiry_order():
+    clock = Clock()
+    m = ExpiringMap(clock=clock)
+    for i in range(10):
+        m.set(i, i, ttl=i + 1)
+    m.set(3, "renewed", ttl=100)
+    clock.now += 5.5
+    assert m.sweep() == 4
+    assert 3 in m and m.get(3) == "renewed"
+    assert sorted(k for k in range(10) if k in m) == [3, 5, 6, 7, 8, 9]
+
+
+def test_expired_keys_are_told_apart_from_unknown_ones():
+    clock = Clock()
+    m = ExpiringMap(clock=clock, remember_expired=30)
+    m.set("read", 1, ttl=5)
+    m.set("swept", 2, ttl=5)
+    m.set("consumed", 3, ttl=5)
+    assert m.pop("consumed") == 3
+    assert not m.expired("read")
+
+    clock.now += 10
+    assert m.expired("read") and m.expired("swept")
+    assert m.get("read") is None
+    assert m.sweep() == 1
+    assert m.expired("read") and m.expired("swept")
+    assert not m.expired("consumed") and not m.expired("never")
+
+    m.set("read", "again", ttl=5)
+    assert not m.expired("read")
+
+    clock.now += 30
+    m.sweep()
+    assert not m.expired("swept")
+    assert m.expired("read")
+
+
+def test_expired_keys_are_not_remembered_by_default():
+    clock = Clock()
+    m = ExpiringMap(clock=clock)
+    m.set("k", 1, ttl=5)
+    clock.now += 10
+    assert m.expired("k")
+    assert m.sweep() == 1
+    assert not m.expired("k")
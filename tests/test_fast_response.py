@@ -0,0 +1,61 @@
+import datetime
+import json
+
+import numpy as np
+import pytest
+from fastapi import Request
+
+from services import fast_response
+from services.fast_response import ndjson_lines, negotiate
+
+PAYLOAD = {
+    "scores": np.array([0.25, 0.5]),
+    "top": np.float64(0.75),
+    "when": datetime.datetime(2024, 1, 2, 3, 4, 5),
+    "ids": ("a", "b"),
+}
+EXPECTED = {"scores": [0.25, 0.5], "top": 0.75, "when": "2024-01-02T03:04:05", "ids": ["a", "b"]}
+
+
+def _request(accept=None):
+    headers = [(b"accept", accept.encode())] if accept else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+
+
+@pytest.mark.parametrize("accept", [None, "application/json", "text/html, */*"])
+def test_json_via_orjson_by_default(accept):
+    pytest.importorskip("orjson")
+    resp = negotiate(_request(accept), PAYLOAD, status_code=201)
+    assert resp.status_code == 201
+    assert resp.media_type == "application/json"
+    assert json.loads(resp.body) == EXPECTED
+
+
+@pytest.mark.parametrize("accept", ["application/msgpack", "application/x-msgpack", "application/json, application/msgpack;q=0.9"])
+def test_msgpack_when_accepted(accept):
+    msgpack = pytest.importorskip("msgpack")
+    resp = negotiate(_request(accept), PAYLOAD)
+    assert resp.media_type == "application/msgpack"
+    assert msgpack.unpackb(resp.body, raw=False) == EXPECTED
+
+
+def test_msgpack_request_falls_back_to_json_without_msgpack(monkeypatch):
+    monkeypatch.setattr(fast_response, "msgpack", None)
+    resp = negotiate(_request("application/msgpack"), {"a": 1})
+    assert resp.media_type == "application/json"
+    assert json.loads(resp.body) == {"a": 1}
+
+
+def test_stdlib_json_fallback_without_orjson(monkeypatch):
+    monkeypatch.setattr(fast_response, "orjson", None)
+    monkeypatch.setattr(fast_response, "msgpack", None)
+    resp = negotiate(_request(), {"when": PAYLOAD["when"], "ids": ["a"]})
+    assert resp.media_type == "application/json"
+    assert json.loads(resp.body) == {"when": "2024-01-02T03:04:05", "ids": ["a"]}
+    assert b"".join(ndjson_lines([{"k": 1}, {"k": 2}])) == b'{"k": 1}\n{"k": 2}\n'
+
+
+def test_ndjson_lines_one_document_per_row():
+    lines = list(ndjson_lines([{"k": 1, "v": np.float64(0.5)}, {"k": 2, "v": None}]))
+    assert [json.loads(line) for line in lines] == [{"k": 1, "v": 0.5}, {"k": 2, "v": None}]
+    assert all(line.endswith(b"\n") for line in lines)
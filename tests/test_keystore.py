@@ -0,0 +1,59 @@
+import pytest
+
+from core.mesh_network.keystore import NodeKeyStore, generate_key
+
+
+def _store(path, passphrase, monkeypatch):
+    monkeypatch.delenv("NODE_KEYSTORE_PASSPHRASE", raising=False)
+    return NodeKeyStore(str(path), passphrase=passphrase)
+
+
+def test_roundtrip_with_passphrase(tmp_path, monkeypatch):
+    path = tmp_path / "keys.db"
+    ks = _store(path, "s3cret", monkeypatch)
+    key = generate_key("hmac")
+    ks.save("node-0", "hmac", key)
+    ks.close()
+
+    ks = _store(path, "s3cret", monkeypatch)
+    assert ks.load("node-0", "hmac") == key
+    ks.close()
+
+
+def test_wrong_passphrase_fails_at_open(tmp_path, monkeypatch):
+    path = tmp_path / "keys.db"
+    _store(path, "s3cret", monkeypatch).close()
+    with pytest.raises(ValueError, match="Wrong passphrase"):
+        _store(path, "other", monkeypatch)
+
+
+def test_encrypted_store_requires_passphrase(tmp_path, monkeypatch):
+    path = tmp_path / "keys.db"
+    _store(path, "s3cret", monkeypatch).close()
+    with pytest.raises(ValueError, match="encrypted"):
+        _store(path, None, monkeypatch)
+
+
+def test_plaintext_store_warns_and_rejects_passphrase(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "keys.db"
+    ks = _store(path, None, monkeypatch)
+    assert "plaintext" in capsys.readouterr().out
+    ks.save("node-0", "hmac", generate_key("hmac"))
+    ks.close()
+    with pytest.raises(ValueError, match="plaintext"):
+        _store(path, "s3cret", monkeypatch)
+
+
+def test_store_without_marker_checks_existing_rows(tmp_path, monkeypatch):
+    path = tmp_path / "keys.db"
+    ks = _store(path, "s3cret", monkeypatch)
+    ks.save("node-0", "ecdsa", generate_key("ecdsa"))
+    ks._conn.execute("DELETE FROM keystore_meta WHERE k='check'")
+    ks._conn.commit()
+    ks.close()
+
+    with pytest.raises(ValueError, match="Wrong passphrase"):
+        _store(path, "other", monkeypatch)
+    ks = _store(path, "s3cret", monkeypatch)
+    assert ks.load("node-0", "ecdsa") is not None
+    ks.close()
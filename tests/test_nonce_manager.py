@@ -0,0 +1,111 @@
+import threading
+
+from eth_account import Account
+from hexbytes import HexBytes
+from web3 import Web3
+
+from blockchain.web3.local_chain import LocalTrustFabric
+from blockchain.web3.nonce_manager import NonceManager
+from blockchain.web3.trust_fabric_cli import TrustFabricClient
+
+
+def test_concurrent_senders_never_share_a_nonce():
+    chain = LocalTrustFabric()
+
+    def worker(t):
+        for i in range(50):
+            assert chain.update_trust(f"id-{t}-{i}", 0.5, 0.1)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(8)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    assert len(chain.records) == 400
+    assert chain.account_nonces[chain.address] == 400
+
+
+def test_resyncs_after_another_sender_uses_the_account():
+    chain = LocalTrustFabric()
+    assert all(chain.update_trust_many([(f"b{i}", 0.7, 0.2) for i in range(10)]))
+    chain.send_raw_transaction((chain.address, 10, "noop"))
+    assert chain.update_trust("x", 0.1, 0.1)
+    assert chain.account_nonces[chain.address] == 12
+    assert chain.nonces.resyncs == 1
+
+
+def test_dropped_transactions_are_detected_and_filled():
+    chain = LocalTrustFabric(drop_rate=0.1)
+    assert all(chain.update_trust_many([(f"d{i}", 0.3, 0.2) for i in range(200)]))
+    assert chain.nonces.gaps()
+    for _ in range(20):
+        if not chain.nonces.gaps():
+            break
+        chain.fill_nonce_gaps()
+    assert chain.account_nonces[chain.address] == 200
+    assert len(chain.records) == 200
+
+
+def test_released_nonce_is_filled_with_a_noop():
+    chain = LocalTrustFabric()
+    nonces = chain.nonces
+    first, second = nonces.allocate(), nonces.allocate()
+    nonces.release(first)
+    raw = chain._sign(second, "updateTrust", "k", 1, 1)
+    chain.send_raw_transaction(raw)
+    nonces.sent(second, raw)
+    assert chain.account_nonces.get(chain.address, 0) == 0
+    assert chain.fill_nonce_gaps() == 1
+    assert chain.account_nonces[chain.address] == 2
+
+
+class _FakeCall:
+    def __init__(self, args):
+        self.args = args
+
+    def build_transaction(self, params):
+        return dict(params, to="0x" + "11" * 20, data="0x", chainId=1)
+
+
+class _FakeFunctions:
+    def updateTrust(self, *args):
+        return _FakeCall(args)
+
+
+class _FakeContract:
+    functions = _FakeFunctions()
+
+
+class _FakeEth:
+    def __init__(self):
+        self.sent = []
+        self.chain_id = 1
+
+    def get_transaction_count(self, address, block_identifier="latest"):
+        return 7
+
+    def send_raw_transaction(self, raw):
+        self.sent.append(raw)
+        return HexBytes(Web3.keccak(raw))
+
+
+class _FakeW3:
+    def __init__(self):
+        self.eth = _FakeEth()
+
+    to_wei = staticmethod(Web3.to_wei)
+
+
+def test_client_signs_with_local_nonces():
+    client = TrustFabricClient("http://127.0.0.1:1", None, None, "unused.json")
+    client.w3 = _FakeW3()
+    client.oracle = Account.create()
+    client.contract = _FakeContract()
+    client.nonces = NonceManager(client.w3.eth.get_transaction_count, client.oracle.address)
+
+    assert client.update_trust("alice", 0.5, 0.1)
+    hashes = client.update_trust_many([("bob", 0.4, 0.1), ("carol", 0.3, 0.1)])
+    assert all(hashes)
+    signers = [Account.recover_transaction(raw) for raw in client.w3.eth.sent]
+    assert signers == [client.oracle.address] * 3
+    assert sorted(client.nonces._sent) == [7, 8, 9]
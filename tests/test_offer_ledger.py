@@ -0,0 +1,118 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from core.mesh_network.offer_ledger import OfferLedger
+
+
+def _fill(ledger, n, start=0):
+    return [ledger.append({"offer_id": f"o{i}", "pad": "x" * 40}) for i in range(start, start + n)]
+
+
+def _ids(ledger, start, limit):
+    return [json.loads(raw)["offer_id"] for raw in ledger.read_range(start, limit)]
+
+
+def test_rollover_and_read_across_segments(tmp_path):
+    ledger = OfferLedger(str(tmp_path), max_segment_bytes=500, index_interval=4)
+    try:
+        assert _fill(ledger, 40) == list(range(40))
+        assert len(ledger._segments) > 3
+        assert len(ledger) == 40
+        # windows that start between sparse index entries and span segment boundaries
+        for start in (0, 3, 5, 9, 17, 33):
+            assert _ids(ledger, start, 11) == [f"o{i}" for i in range(start, min(start + 11, 40))]
+        assert _ids(ledger, 38, 10) == ["o38", "o39"]
+        assert ledger.read_range(40, 5) == []
+        assert [r["offer_id"] for r in ledger.page(3, 7)] == [f"o{i}" for i in range(14, 21)]
+    finally:
+        ledger.close()
+
+
+def test_reopen_rebuilds_index_and_continues(tmp_path):
+    ledger = OfferLedger(str(tmp_path), max_segment_bytes=500, index_interval=4)
+    _fill(ledger, 25)
+    ledger.close()
+    # a lost index file is rebuilt from the log
+    os.remove(os.path.join(str(tmp_path), f"{0:020d}.idx"))
+
+    ledger = OfferLedger(str(tmp_path), max_segment_bytes=500, index_interval=4)
+    try:
+        assert len(ledger) == 25
+        assert ledger.append({"offer_id": "o25"}) == 25
+        assert _ids(ledger, 0, 30) == [f"o{i}" for i in range(26)]
+    finally:
+        ledger.close()
+
+
+def test_torn_trailing_record_is_truncated_on_reopen(tmp_path):
+    ledger = OfferLedger(str(tmp_path), index_interval=4)
+    _fill(ledger, 6)
+    log_path = ledger._segments[-1].log_path
+    good_size = ledger._segments[-1].size
+    ledger.close()
+    with open(log_path, "ab") as f:
+        f.write(b"\x40\x00\x00\x00{\"offer_id\":\"o6\"")  # length says 64, payload cut short
+
+    ledger = OfferLedger(str(tmp_path), index_interval=4)
+    try:
+        assert len(ledger) == 6
+        assert os.path.getsize(log_path) == good_size
+        assert ledger.append({"offer_id": "o6"}) == 6
+        assert _ids(ledger, 4, 10) == ["o4", "o5", "o6"]
+    finally:
+        ledger.close()
+
+
+def test_compact_drops_old_closed_segments(tmp_path):
+    ledger = OfferLedger(str(tmp_path), max_segment_bytes=500, index_interval=4)
+    try:
+        _fill(ledger, 40)
+        old = ledger._segments[:-2]
+        dropped_records = sum(seg.count for seg in old)
+        stale = time.time() - 3600
+        for seg in old:
+            os.utime(seg.log_path, (stale, stale))
+
+        assert ledger.compact(60) == dropped_records
+        assert not any(os.path.exists(seg.log_path) for seg in old)
+        assert len(ledger) == 40 - dropped_records
+        assert _ids(ledger, 0, 3) == [f"o{i}" for i in range(dropped_records, dropped_records + 3)]
+        # the active segment is never compacted
+        assert ledger.compact(-1) > 0
+        assert len(ledger._segments) == 1
+    finally:
+        ledger.close()
+
+
+def test_directory_is_single_writer(tmp_path):
+    ledger = OfferLedger(str(tmp_path))
+    with pytest.raises(RuntimeError, match="already open"):
+        OfferLedger(str(tmp_path))
+    ledger.close()
+    OfferLedger(str(tmp_path)).close()
+
+
+def test_second_process_cannot_open_a_held_directory(tmp_path):
+    pytest.importorskip("fcntl")
+    ledger = OfferLedger(str(tmp_path))
+    try:
+        code = (
+            "import sys\n"
+            "from core.mesh_network.offer_ledger import OfferLedger\n"
+            "try:\n"
+            "    OfferLedger(sys.argv[1])\n"
+            "except RuntimeError as exc:\n"
+            "    print(exc)\n"
+            "    sys.exit(3)\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        proc = subprocess.run([sys.executable, "-c", code, str(tmp_path)], cwd=root, capture_output=True, text=True)
+        assert proc.returncode == 3, proc.stderr
+        assert "single-writer" in proc.stdout
+    finally:
+        ledger.close()
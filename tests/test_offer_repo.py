@@ -0,0 +1,104 @@
+import os
+import time
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from services.quantum_oracle_api.offer_repo import OFFERS_SPILLED, OfferRepo
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = OfferRepo(
+        f"sqlite:///{tmp_path / 'offers.db'}",
+        batch_size=50,
+        flush_interval=60.0,
+        max_queued=120,
+        spill_path=str(tmp_path / "offers.spill.jsonl"),
+    )
+    yield repo
+    repo.close()
+
+
+def _offer(k, created_at=None):
+    return {"offer_id": f"offer-{k}", "created_at": 1000.0 + k if created_at is None else created_at, "kind": "ghz"}
+
+
+def test_keyset_pages_cover_every_offer_once(repo):
+    # ties on created_at are broken by id
+    for k in range(45):
+        repo.add(_offer(k, created_at=1000.0 + k // 10))
+    repo.flush()
+    seen, cursor = [], None
+    while True:
+        page = repo.list_page(limit=8, cursor=cursor)
+        seen.extend(o["offer_id"] for o in page["offers"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"offer-{k}" for k in range(45)]
+    assert repo.get("offer-7")["created_at"] == 1000.0
+    assert repo.get("missing") is None
+    with pytest.raises(ValueError):
+        repo.list_page(cursor="not-a-cursor")
+
+
+def test_full_batch_is_written_without_waiting_for_the_timer(repo):
+    for k in range(50):
+        repo.add(_offer(k))
+    deadline = time.time() + 5.0
+    while repo.list_page(limit=100)["offers"] == [] and time.time() < deadline:
+        time.sleep(0.02)
+    assert len(repo.list_page(limit=100)["offers"]) == 50
+
+
+def test_duplicate_offer_is_dropped_not_retried_forever(repo):
+    repo.add(_offer(1))
+    repo.flush()
+    repo.add(_offer(2))
+    repo.add(_offer(1))
+    repo.add(_offer(3))
+    assert repo.flush() == 2
+    assert repo.rejected == 1
+    assert repo._queue.empty()
+    assert [o["offer_id"] for o in repo.list_page()["offers"]] == ["offer-1", "offer-2", "offer-3"]
+
+
+def test_batches_are_requeued_while_the_db_is_down(repo, monkeypatch):
+    def unavailable(rows):
+        raise OperationalError("INSERT", {}, Exception("connection refused"))
+
+    repo.add(_offer(1))
+    monkeypatch.setattr(repo, "_insert", unavailable)
+    assert repo.flush() == 0
+    assert repo._queue.qsize() == 1
+    monkeypatch.undo()
+    assert repo.flush() == 1
+
+
+def test_queue_is_capped_and_overflow_spills_while_the_db_is_down(repo, monkeypatch):
+    def unavailable(rows):
+        raise OperationalError("INSERT", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(repo, "_insert", unavailable)
+    spilled_before = OFFERS_SPILLED._value.get()
+    for k in range(300):
+        repo.add(_offer(k))
+        if k % 50 == 0:
+            repo.flush()
+    repo.flush()
+    assert repo._queue.qsize() <= 120
+    assert os.path.exists(repo.spill_path)
+    assert OFFERS_SPILLED._value.get() - spilled_before == 300 - repo._queue.qsize()
+
+    monkeypatch.undo()
+    assert repo.flush() == 300
+    assert not os.path.exists(repo.spill_path)
+    seen, cursor = [], None
+    while True:
+        page = repo.list_page(limit=100, cursor=cursor)
+        seen.extend(o["offer_id"] for o in page["offers"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(f"offer-{k}" for k in range(300))
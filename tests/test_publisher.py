@@ -0,0 +1,63 @@
+import threading
+import time
+
+from services.trust_calc.publisher import TrustPublisher
+
+
+class SlowClient:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.active = 0
+        self.overlaps = 0
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def update_trust_many(self, updates):
+        with self._lock:
+            self.active += 1
+            if self.active > 1:
+                self.overlaps += 1
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+            self.sent.extend(u[0] for u in updates)
+        return [f"0x{identity_id}" for identity_id, _, _ in updates]
+
+
+def test_tx_hashes_are_capped_lru():
+    pub = TrustPublisher(SlowClient(), batch_size=10, max_tx_hashes=3)
+    pub.enqueue_many(["a", "b", "c", "d"], [0.1] * 4, [0.0] * 4)
+    pub.publish_batch()
+    assert list(pub.tx_hashes) == ["b", "c", "d"]
+    assert pub.status("a")["tx_hash"] is None
+    assert pub.status("d")["tx_hash"] == "0xd"
+
+    pub.enqueue("b", 0.2, 0.0)
+    pub.publish_batch()
+    assert list(pub.tx_hashes) == ["c", "d", "b"]
+
+
+def test_stop_flush_never_overlaps_worker_batch():
+    client = SlowClient(delay=0.05)
+    pub = TrustPublisher(client, batch_size=5, interval=0.01)
+    pub.enqueue_many([f"id{i}" for i in range(40)], [0.5] * 40, [0.0] * 40)
+    pub.start()
+    time.sleep(0.02)
+    pub.stop(flush=True)
+
+    assert client.overlaps == 0
+    assert sorted(client.sent) == sorted(f"id{i}" for i in range(40))
+    assert pub.queued() == 0
+
+
+def test_concurrent_publish_batches_are_serialized():
+    client = SlowClient(delay=0.02)
+    pub = TrustPublisher(client, batch_size=2)
+    pub.enqueue_many([f"id{i}" for i in range(8)], [0.5] * 8, [0.0] * 8)
+    threads = [threading.Thread(target=pub.publish_batch) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert client.overlaps == 0
+    assert len(client.sent) == 8
@@ -0,0 +1,45 @@
+import threading
+
+from core.mesh_network import quantum_oracle
+from core.mesh_network.quantum_oracle import QuantumOracle
+
+
+def test_async_verified_offer_reaches_the_ledger_with_its_final_hint(tmp_path, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def fake_verify(num_shards, repetitions=128):
+        calls.append(num_shards)
+        release.wait(5.0)
+        return {"agreement_rate": 1.0, "sample_histogram": {}}
+
+    monkeypatch.setattr(quantum_oracle, "quick_verify", fake_verify)
+    oracle = QuantumOracle(ledger_dir=str(tmp_path / "ledger"))
+    try:
+        ghz = oracle.create_offer((0, 1), kind="ghz", run_quick_verify=True, async_verify=True)
+        bell = oracle.create_offer((2, 3), kind="bell", run_quick_verify=True, async_verify=True)
+        assert ghz.verification_hint == {"status": "pending"}
+        # nothing is persisted while verification is pending
+        assert len(oracle.ledger) == 0
+
+        release.set()
+        assert oracle.await_verification(ghz.offer_id, timeout=5.0)["agreement_rate"] == 1.0
+        assert oracle.await_verification(bell.offer_id, timeout=5.0)["agreement_rate"] == 1.0
+        # quick_verify only depends on the shard count, so both kinds share one run
+        assert calls == [2]
+        records = oracle.ledger.page(1, 10)
+        assert sorted(r["offer_id"] for r in records) == sorted([ghz.offer_id, bell.offer_id])
+        assert all(r["verification_hint"] == {"agreement_rate": 1.0, "sample_histogram": {}} for r in records)
+    finally:
+        oracle.shutdown()
+        oracle.ledger.close()
+
+
+def test_offer_without_verification_is_persisted_at_once(tmp_path):
+    oracle = QuantumOracle(ledger_dir=str(tmp_path / "ledger"))
+    try:
+        offer = oracle.create_offer((0, 1, 2))
+        assert [r["offer_id"] for r in oracle.ledger.page(1, 10)] == [offer.offer_id]
+    finally:
+        oracle.shutdown()
+        oracle.ledger.close()
@@ -0,0 +1,81 @@
+import pytest
+
+from core.identity_core.rank_index import RankIndex
+
+
+def _index(pairs):
+    idx = RankIndex()
+    for identity_id, score in pairs:
+        idx.update(identity_id, score)
+    return idx
+
+
+def test_insert_update_and_order():
+    idx = _index([("a", 0.5), ("b", 0.9), ("c", 0.1)])
+    assert idx.top() == [("b", 0.9), ("a", 0.5), ("c", 0.1)]
+    assert idx.bottom(2) == [("c", 0.1), ("a", 0.5)]
+
+    idx.update("c", 0.95)
+    assert len(idx) == 3
+    assert idx.top(2) == [("c", 0.95), ("b", 0.9)]
+    assert idx.bottom(1) == [("a", 0.5)]
+    assert [idx.rank_of(i) for i in "cba"] == [1, 2, 3]
+
+
+def test_ties_order_by_id_and_rank_distinct_positions():
+    idx = _index([("b", 0.5), ("a", 0.5), ("c", 0.5), ("d", 0.7)])
+    # equal scores sort by id ascending, so descending order lists them in reverse
+    assert idx.top() == [("d", 0.7), ("c", 0.5), ("b", 0.5), ("a", 0.5)]
+    assert idx.bottom(4)[:3] == [("a", 0.5), ("b", 0.5), ("c", 0.5)]
+    assert sorted(idx.rank_of(i) for i in "abcd") == [1, 2, 3, 4]
+    assert idx.count_below(0.5) == 0
+    assert idx.count_above(0.5) == 1
+
+
+def test_update_many_later_entries_win_and_large_batches_rebuild():
+    idx = _index([("a", 0.1), ("b", 0.2), ("c", 0.3), ("d", 0.4), ("e", 0.5)])
+    # small batch: in-place path
+    idx.update_many(["a"], [0.9])
+    assert idx.top(1) == [("a", 0.9)]
+    # large batch (more than a quarter of the index): rebuild path, repeated id
+    idx.update_many(["b", "c", "b", "f"], [0.6, 0.05, 0.01, 0.7])
+    assert len(idx) == 6
+    assert idx.top() == [("a", 0.9), ("f", 0.7), ("e", 0.5), ("d", 0.4), ("c", 0.05), ("b", 0.01)]
+    assert idx.rank_of("b") == 6
+    assert "f" in idx and "z" not in idx
+
+
+def test_rebuild_replaces_contents():
+    idx = _index([("old", 0.3)])
+    idx.rebuild(["x", "y", "z"], [0.2, 0.8, 0.5])
+    assert "old" not in idx and idx.rank_of("old") is None
+    assert idx.top() == [("y", 0.8), ("z", 0.5), ("x", 0.2)]
+    idx.update("x", 0.9)
+    assert idx.rank_of("x") == 1
+
+
+@pytest.mark.parametrize(
+    "threshold, below, above",
+    [
+        (0.0, 0, 4),
+        (0.1, 0, 3),
+        (0.10000001, 1, 3),
+        (0.5, 1, 1),
+        (0.9, 3, 0),
+        (1.0, 4, 0),
+    ],
+)
+def test_count_below_and_above_at_boundaries(threshold, below, above):
+    idx = _index([("a", 0.1), ("b", 0.5), ("c", 0.5), ("d", 0.9)])
+    assert idx.count_below(threshold) == below
+    assert idx.count_above(threshold) == above
+
+
+def test_empty_index_and_k_bounds():
+    idx = RankIndex()
+    assert len(idx) == 0
+    assert idx.top() == [] and idx.bottom(3) == []
+    assert idx.rank_of("a") is None
+    assert idx.count_below(0.5) == 0 and idx.count_above(0.5) == 0
+    idx.update("a", 0.5)
+    assert idx.top(0) == [] and idx.top(-1) == [] and idx.bottom(10) == [("a", 0.5)]
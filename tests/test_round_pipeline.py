@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from core.mesh_network.round_pipeline import RoundPipeline
+
+
+class GatedCluster:
+    """Stand-in cluster whose prepare stage waits until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def prepare_round(self, shard_indxs, **kwargs):
+        self.release.wait(5.0)
+        return shard_indxs
+
+    def sign_round(self, prepared):
+        return []
+
+    def finalize_round(self, prepared, reports):
+        return ("decided", prepared)
+
+
+def test_decisions_in_submission_order():
+    cluster = GatedCluster()
+    cluster.release.set()
+    with RoundPipeline(cluster, max_in_flight=2) as pipe:
+        decisions = list(pipe.run({"shard_indxs": [i]} for i in range(5)))
+    assert decisions == [("decided", (i,)) for i in range(5)]
+
+
+def test_close_without_wait_fails_pending_decision():
+    cluster = GatedCluster()
+    pipe = RoundPipeline(cluster)
+    decision = pipe.submit([0, 1])
+    pipe.close(wait=False)
+    cluster.release.set()
+    with pytest.raises(RuntimeError):
+        decision.result(timeout=5.0)
@@ -0,0 +1,18 @@
+import numpy as np
+
+from core.identity_core.dynamic_trust import DynamicTrustEngine
+from core.identity_core.sharded_trust import ShardedTrustEngine
+
+
+def test_sharded_matches_single_engine():
+    ids = [f"id-{i}" for i in range(500)]
+    values = np.random.default_rng(1).random((3, len(ids)))
+    single = DynamicTrustEngine()
+    single.update_many(ids, *values)
+    with ShardedTrustEngine(n_shards=3) as sharded:
+        sharded.update_many(ids, *values)
+        assert len(sharded) == len(single) == len(ids)
+        assert [i for i, _ in sharded.top(10)] == [i for i, _ in single.top(10)]
+        for identity_id in ids[:20]:
+            assert sharded.rank_of(identity_id) == single.rank_of(identity_id)
+        assert sharded.count_below(0.5) == single.count_below(0.5)
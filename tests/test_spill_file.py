@@ -0,0 +1,57 @@
+import json
+import multiprocessing
+
+from services.spill_file import SpillFile
+
+
+def _append_many(path, worker, n):
+    spill = SpillFile(path)
+    for k in range(n):
+        spill.append([{"worker": worker, "k": k, "pad": "x" * 200}])
+
+
+def test_replay_concurrent_with_other_processes_appending_loses_nothing(tmp_path):
+    path = str(tmp_path / "spill.jsonl")
+    procs = [multiprocessing.Process(target=_append_many, args=(path, w, 300)) for w in range(3)]
+    for p in procs:
+        p.start()
+    spill = SpillFile(path)
+    replayed = []
+
+    def write(rows):
+        replayed.extend((r["worker"], r["k"]) for r in rows)
+        return len(rows), []
+
+    while any(p.is_alive() for p in procs):
+        spill.replay(write, batch_size=50)
+    for p in procs:
+        p.join()
+    spill.replay(write, batch_size=50)
+
+    assert len(replayed) == 900
+    for w in range(3):
+        assert [k for worker, k in replayed if worker == w] == list(range(300))
+
+
+def test_replay_streams_in_batches_and_keeps_the_unwritten_tail(tmp_path):
+    spill = SpillFile(str(tmp_path / "spill.jsonl"))
+    spill.append([{"k": k} for k in range(10)])
+    batches = []
+
+    def write_until_down(rows):
+        batches.append([r["k"] for r in rows])
+        if len(batches) == 2:
+            # DB goes away after one row of the second batch
+            return 1, rows[1:]
+        return len(rows), []
+
+    written, drained = spill.replay(write_until_down, batch_size=3)
+    assert (written, drained) == (4, False)
+    assert batches == [[0, 1, 2], [3, 4, 5]]
+
+    seen = []
+    written, drained = spill.replay(lambda rows: (seen.extend(r["k"] for r in rows) or len(rows), []), batch_size=4)
+    assert (written, drained) == (6, True)
+    assert seen == [4, 5, 6, 7, 8, 9]
+    assert not spill.exists()
+    assert spill.replay(lambda rows: (len(rows), []), batch_size=4) == (0, True)
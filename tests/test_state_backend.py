@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from services.quantum_oracle_api.state import EXPIRED_OFFER_TTL, StateBackend, make_backend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    return make_backend(request.param, str(tmp_path / "state.db"))
+
+
+def test_incomplete_backend_fails_at_construction():
+    class Partial(StateBackend):
+        def put_offer(self, offer_id, data, expires_at):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_nonce_is_consumed_exactly_once(backend):
+    backend.put_nonce("n1", time.time() + 60)
+    assert backend.count_nonces() == 1
+    assert backend.consume_nonce("n1") is True
+    assert backend.consume_nonce("n1") is False
+
+
+def test_expired_entries_are_not_served(backend):
+    backend.put_offer("live", {"offer_id": "live"}, time.time() + 60)
+    backend.put_offer("gone", {"offer_id": "gone"}, time.time() - 1)
+    backend.put_nonce("old", time.time() - 1)
+    assert backend.get_offer("live") == {"offer_id": "live"}
+    assert backend.get_offer("gone") is None
+    assert backend.consume_nonce("old") is False
+
+
+def test_expired_offer_is_told_apart_from_unknown(backend):
+    backend.put_offer("live", {"offer_id": "live"}, time.time() + 60)
+    backend.put_offer("gone", {"offer_id": "gone"}, time.time() - 1)
+    assert backend.offer_expired("gone") is True
+    assert backend.offer_expired("live") is False
+    assert backend.offer_expired("never") is False
+
+    backend.sweep()
+    assert backend.get_offer("gone") is None
+    assert backend.offer_expired("gone") is True
+    assert backend.count_offers() == 1
+
+    backend.put_offer("gone", {"offer_id": "gone"}, time.time() + 60)
+    assert backend.offer_expired("gone") is False
+    assert backend.get_offer("gone") == {"offer_id": "gone"}
+
+
+def test_expired_offer_is_forgotten_after_the_grace_period(backend):
+    backend.put_offer("old", {"offer_id": "old"}, time.time() - EXPIRED_OFFER_TTL - 1)
+    backend.sweep()
+    assert backend.offer_expired("old") is False
@@ -0,0 +1,56 @@
+import json
+import time
+
+import pytest
+
+from core.mesh_network.tracing import PHASE_SECONDS, Tracer
+
+
+def _histogram_count(phase):
+    for metric in PHASE_SECONDS.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_count") and sample.labels.get("phase") == phase:
+                return sample.value
+    return 0.0
+
+
+def test_ring_keeps_only_the_most_recent_spans():
+    tracer = Tracer(ring_size=3)
+    for k in range(5):
+        tracer.record(f"phase-{k}", 0.001 * k, {"k": k})
+    assert [s["phase"] for s in tracer.spans()] == ["phase-2", "phase-3", "phase-4"]
+    assert [s["attrs"]["k"] for s in tracer.spans()] == [2, 3, 4]
+
+    # resizing keeps the newest entries that fit
+    tracer.enable_ring(2)
+    assert [s["phase"] for s in tracer.spans()] == ["phase-3", "phase-4"]
+    assert [s["phase"] for s in json.loads(tracer.dump_json())] == ["phase-3", "phase-4"]
+    tracer.disable_ring()
+    assert tracer.spans() == []
+
+
+@pytest.mark.skipif(PHASE_SECONDS is None, reason="prometheus_client not installed")
+def test_timed_span_records_duration_and_histogram():
+    tracer = Tracer(ring_size=10)
+    before = _histogram_count("test.timed_stage")
+    with tracer.span("test.timed_stage", shards=3):
+        time.sleep(0.01)
+    assert _histogram_count("test.timed_stage") == before + 1
+    (span,) = tracer.spans()
+    assert span["phase"] == "test.timed_stage"
+    assert span["attrs"] == {"shards": 3}
+    assert span["duration"] >= 0.01
+    assert "error" not in span
+
+
+def test_failed_span_is_marked_and_disabled_tracer_records_nothing():
+    tracer = Tracer(ring_size=10)
+    with pytest.raises(RuntimeError):
+        with tracer.span("test.failing"):
+            raise RuntimeError("boom")
+    assert tracer.spans()[-1]["error"] is True
+
+    off = Tracer(ring_size=10, enabled=False)
+    with off.span("test.off"):
+        pass
+    assert off.spans() == []
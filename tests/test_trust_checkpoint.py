@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pytest
+
+from core.identity_core.dynamic_trust import DynamicTrustEngine
+from core.identity_core.trust_checkpoint import SNAPSHOT_NAME, TrustCheckpointer, _log_generations
+
+
+def _updates(engine, rng, start, n_ids=50, n=200):
+    ids = [f"id-{start + k}" for k in rng.integers(0, n_ids, size=n)]
+    a, b, w = rng.random((3, n))
+    engine.update_many(ids, a, b, w)
+    for i in ids[:10]:
+        engine.update_trust(i, *rng.random(3).tolist())
+
+
+def _assert_same(restored, live):
+    assert len(restored) == len(live)
+    for i in live._ids:
+        assert restored.get_trust(i, now=0.0) == live.get_trust(i, now=0.0)
+        assert restored.get_entropy(i) == live.get_entropy(i)
+        assert restored.last_updated(i) == live.last_updated(i)
+    assert restored.top(5) == live.top(5)
+
+
+def test_restore_after_crash_from_snapshot_plus_log(tmp_path):
+    rng = np.random.default_rng(0)
+    engine = DynamicTrustEngine()
+    cp = TrustCheckpointer(engine, str(tmp_path))
+    _updates(engine, rng, 0)
+    cp.checkpoint()
+    # updates after the snapshot, some for new identities, then a crash mid-write
+    _updates(engine, rng, 25)
+    log_path = cp._log.path
+    with open(log_path, "ab") as fh:
+        fh.write(b"\x05\x00\x00\x00\x10\x00")
+
+    restored = TrustCheckpointer.restore(str(tmp_path))
+    _assert_same(restored, engine)
+
+
+def test_restore_from_log_only(tmp_path):
+    engine = DynamicTrustEngine()
+    TrustCheckpointer(engine, str(tmp_path))
+    _updates(engine, np.random.default_rng(1), 0)
+    assert not os.path.exists(tmp_path / SNAPSHOT_NAME)
+    _assert_same(TrustCheckpointer.restore(str(tmp_path)), engine)
+
+
+def test_checkpoint_rotates_and_drops_covered_logs(tmp_path):
+    rng = np.random.default_rng(2)
+    engine = DynamicTrustEngine()
+    cp = TrustCheckpointer(engine, str(tmp_path))
+    assert _log_generations(str(tmp_path)) == [0]
+    _updates(engine, rng, 0)
+    cp.checkpoint()
+    assert _log_generations(str(tmp_path)) == [1]
+    assert os.path.getsize(tmp_path / "updates-1.log") == 0
+    assert DynamicTrustEngine.load(str(tmp_path / SNAPSHOT_NAME)).snapshot_meta["log_gen"] == 1
+
+    _updates(engine, rng, 10)
+    cp.checkpoint()
+    assert _log_generations(str(tmp_path)) == [2]
+    cp.stop(checkpoint=False)
+
+    # a new process continues with the next generation
+    restored = TrustCheckpointer.restore(str(tmp_path))
+    _assert_same(restored, engine)
+    cp2 = TrustCheckpointer(restored, str(tmp_path))
+    assert cp2._gen == 3
+    cp2.stop()
+
+
+def test_mmap_restore_is_copy_on_write(tmp_path):
+    rng = np.random.default_rng(3)
+    engine = DynamicTrustEngine()
+    cp = TrustCheckpointer(engine, str(tmp_path))
+    _updates(engine, rng, 0)
+    cp.stop(checkpoint=True)
+    snap = tmp_path / SNAPSHOT_NAME
+    before = snap.read_bytes()
+
+    restored = TrustCheckpointer.restore(str(tmp_path), mmap=True)
+    assert isinstance(restored._score, np.memmap)
+    _assert_same(restored, engine)
+
+    # writes stay private to the process; growth turns the columns into plain arrays
+    restored.update_trust(restored._ids[0], 1.0, 1.0, 1.0)
+    assert snap.read_bytes() == before
+    for k in range(len(restored) + 5):
+        restored.update_trust(f"new-{k}", 0.5, 0.5, 0.5)
+    assert not isinstance(restored._score, np.memmap)
+    assert restored.get_trust(restored._ids[1], now=0.0) == engine.get_trust(restored._ids[1], now=0.0)
+
+
+def test_restore_switches_half_life(tmp_path):
+    engine = DynamicTrustEngine()
+    cp = TrustCheckpointer(engine, str(tmp_path))
+    _updates(engine, np.random.default_rng(4), 0)
+    cp.stop(checkpoint=True)
+
+    restored = TrustCheckpointer.restore(str(tmp_path), half_life=60.0)
+    assert restored.half_life == 60.0
+    i = restored._ids[0]
+    t = restored.last_updated(i)
+    assert restored.get_trust(i, now=t + 60.0) == pytest.approx(engine.get_trust(i) / 2)
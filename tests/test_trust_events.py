@@ -0,0 +1,88 @@
+from blockchain.web3.trust_fabric_cli import TrustFabricClient
+from services.trust_calc.trust_cache import TrustEventWatcher, TrustReadCache
+
+
+class _FakeEvent:
+    def __init__(self, chain):
+        self.chain = chain
+
+    # web3 >= 7 signature; the v6 names (fromBlock/toBlock) raise TypeError here
+    def get_logs(self, argument_filters=None, from_block=None, to_block=None, block_hash=None):
+        return [
+            {"args": {"identityId": identity_id}}
+            for block, identity_id in self.chain.logs
+            if from_block <= block <= to_block
+        ]
+
+
+class _FakeEvents:
+    def __init__(self, chain):
+        self.chain = chain
+
+    def TrustUpdated(self):
+        return _FakeEvent(self.chain)
+
+
+class _FakeContract:
+    def __init__(self):
+        self.logs = []
+        self.block_number = 10
+        self.events = _FakeEvents(self)
+
+
+class _FakeEth:
+    def __init__(self, contract):
+        self.contract = contract
+
+    @property
+    def block_number(self):
+        return self.contract.block_number
+
+
+class _FakeW3:
+    def __init__(self, contract):
+        self.eth = _FakeEth(contract)
+
+
+def _client(contract):
+    client = TrustFabricClient("http://127.0.0.1:1", None, None, "unused.json")
+    client.contract = contract
+    client.w3 = _FakeW3(contract)
+    return client
+
+
+def test_poll_trust_updates_reads_new_blocks_only():
+    contract = _FakeContract()
+    client = _client(contract)
+    ids, cursor = client.poll_trust_updates(None)
+    assert ids == [] and cursor == 11
+
+    contract.logs += [(11, "alice"), (12, "bob")]
+    contract.block_number = 12
+    ids, cursor = client.poll_trust_updates(cursor)
+    assert ids == ["alice", "bob"] and cursor == 13
+
+    ids, cursor = client.poll_trust_updates(cursor)
+    assert ids == [] and cursor == 13
+
+
+def test_event_watcher_invalidates_cached_reads():
+    contract = _FakeContract()
+    values = {"alice": (1, 0, 1)}
+    loads = []
+
+    def loader(identity_id):
+        loads.append(identity_id)
+        return values[identity_id]
+
+    cache = TrustReadCache(loader, ttl=3600)
+    watcher = TrustEventWatcher(_client(contract), cache)
+    watcher.poll()
+    assert cache.get("alice") == (1, 0, 1)
+
+    values["alice"] = (2, 0, 2)
+    contract.logs.append((11, "alice"))
+    contract.block_number = 11
+    assert watcher.poll() == 1
+    assert cache.get("alice") == (2, 0, 2)
+    assert loads == ["alice", "alice"]
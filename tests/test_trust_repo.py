@@ -0,0 +1,139 @@
+import json
+import os
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from services.trust_calc.repo import TrustRepo
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = TrustRepo(
+        f"sqlite:///{tmp_path / 'audit.db'}",
+        spill_path=str(tmp_path / "spill.jsonl"),
+        quarantine_path=str(tmp_path / "quarantine.jsonl"),
+    )
+    yield repo
+    repo.engine.dispose()
+
+
+def _go_down(repo, monkeypatch):
+    def unavailable(rows):
+        raise OperationalError("INSERT", {}, Exception("connection refused"))
+    monkeypatch.setattr(repo, "_write", unavailable)
+
+
+def test_rejected_row_is_quarantined_and_does_not_block_later_batches(repo):
+    repo.record_audits(["alice", None, "bob"], [0.5, 0.6, 0.7], [0.1, 0.1, 0.1])
+    assert repo.flush() == 2
+    with open(repo.quarantine_path) as fh:
+        quarantined = [json.loads(line) for line in fh]
+    assert [row["identity_id"] for row in quarantined] == [None]
+    assert "NOT NULL" in quarantined[0]["error"]
+    assert not os.path.exists(repo.spill_path)
+
+    repo.record_audit("carol", 0.4, 0.2)
+    assert repo.flush() == 1
+    assert len(repo.fetch_history("carol")) == 1
+
+
+def test_spills_while_down_and_replays_in_order(repo, monkeypatch):
+    repo.record_audit("alice", 0.1, 0.1)
+    _go_down(repo, monkeypatch)
+    assert repo.flush() == 0
+    repo.record_audit("alice", 0.2, 0.1)
+    assert repo.flush() == 0
+    with open(repo.spill_path) as fh:
+        assert len(fh.readlines()) == 2
+
+    monkeypatch.undo()
+    # replayed rows count even when there is nothing new buffered
+    assert repo.flush() == 2
+    assert not os.path.exists(repo.spill_path)
+    assert [r["trust_score"] for r in repo.fetch_history("alice")] == [0.2, 0.1]
+
+
+def test_spilled_poison_row_does_not_stop_replay(repo, monkeypatch):
+    _go_down(repo, monkeypatch)
+    repo.record_audits(["alice", None], [0.5, 0.6], [0.1, 0.1])
+    repo.flush()
+    monkeypatch.undo()
+
+    repo.record_audit("bob", 0.3, 0.1)
+    assert repo.flush() == 2
+    assert not os.path.exists(repo.spill_path)
+    assert len(repo.fetch_history("alice")) == 1
+    assert len(repo.fetch_history("bob")) == 1
+
+
+def test_pooled_engine_settings():
+    from services.trust_calc.repo import _engine_kwargs, async_url
+
+    kwargs = _engine_kwargs("mysql+pymysql://u:p@db/trust", pool_size=7, max_overflow=3)
+    assert kwargs == {"pool_pre_ping": True, "pool_size": 7, "max_overflow": 3, "pool_recycle": 1800}
+    assert async_url("mysql+pymysql://u:p@db/trust") == "mysql+aiomysql://u:p@db/trust"
+    assert async_url("sqlite:///data/x.db") == "sqlite+aiosqlite:///data/x.db"
+
+
+def test_concurrent_inserts_and_reads_share_the_pool(repo):
+    import threading
+
+    errors = []
+
+    def worker(t):
+        try:
+            for i in range(25):
+                repo.insert_audit(f"id-{t % 4}", i / 25, 0.1)
+                repo.history_page(f"id-{t % 4}", limit=10)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(8)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    assert errors == []
+    assert sum(len(repo.fetch_history(f"id-{k}")) for k in range(4)) == 200
+
+
+def test_history_pages_cover_every_row_once(repo):
+    # one batch shares a timestamp, so pages must break ties on id
+    repo.record_audits(["alice"] * 25, [k / 100 for k in range(25)], [0.1] * 25)
+    repo.flush()
+    seen, cursor = [], None
+    while True:
+        page = repo.history_page("alice", limit=7, cursor=cursor)
+        seen.extend(row["trust_score"] for row in page["history"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted((k / 100 for k in range(25)), reverse=True)
+    assert [row["trust_score"] for row in repo.iter_history("alice", chunk=4)] == seen
+    with pytest.raises(ValueError):
+        repo.history_page("alice", cursor="not-a-cursor")
+
+
+def test_async_repo_insert_and_history(tmp_path):
+    import asyncio
+
+    from services.trust_calc.repo import AsyncTrustRepo
+
+    async def run():
+        repo = AsyncTrustRepo(f"sqlite:///{tmp_path / 'audit.db'}")
+        await repo.init()
+        try:
+            await repo.insert_audits(["alice"] * 5, [k / 10 for k in range(5)], [0.1] * 5)
+            await repo.insert_audit("bob", 0.9, 0.2)
+            first = await repo.history_page("alice", limit=2)
+            second = await repo.history_page("alice", limit=2, cursor=first["next_cursor"])
+            streamed = [row["trust_score"] async for row in repo.iter_history("alice", chunk=2)]
+            return first, second, streamed, await repo.fetch_history("bob")
+        finally:
+            await repo.close()
+
+    first, second, streamed, bob = asyncio.run(run())
+    assert [r["trust_score"] for r in first["history"] + second["history"]] == [0.4, 0.3, 0.2, 0.1]
+    assert streamed == [0.4, 0.3, 0.2, 0.1, 0.0]
+    assert [r["trust_score"] for r in bob] == [0.9]